@@ -0,0 +1,96 @@
+"""
+Benchmark for --scan-mode async on a high-latency filesystem.
+
+Network filesystems (NFS, Lustre, S3-FUSE) turn every directory listing and stat into a round
+trip. This benchmark emulates that on a local synthetic dataset by adding a fixed delay to each
+os.scandir and os.stat call made by redmane/async_scanner.py. It then runs scan_dataset at
+increasing concurrency limits. Throughput should grow roughly linearly with concurrency until the
+local disk or the Python side becomes the bottleneck. Every run is checked to produce the same
+records as the threaded walker.
+
+Usage:
+    python3 benchmarks/bench_async_scan.py --files 2000 --latency-ms 2 --concurrency 1 4 16 64
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import synth
+from redmane import async_scanner
+from redmane.params import ORGANIZATION, SAMPLE_TO_PATIENT
+from redmane.config import find_config_path, load_config, normalize_and_validate_config, normalize_scan_options
+from redmane.auxiliary import scan_dataset
+
+def with_latency(fn, seconds):
+    # Wraps a blocking filesystem call so that it waits like a network round trip (GIL released).
+    def slow(*args, **kwargs):
+        time.sleep(seconds)
+        return fn(*args, **kwargs)
+    return slow
+
+def scan(data_dir, file_types, sample_to_patient, config_raw, **settings):
+    # settings: ScanOptions fields (workers, scan_mode, concurrency)
+    with contextlib.redirect_stdout(io.StringIO()):
+        return scan_dataset(data_dir, file_types, {}, sample_to_patient, ORGANIZATION, None, normalize_scan_options(config_raw, **settings))
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure async scan throughput against injected filesystem latency.")
+    parser.add_argument("--dataset", help="Existing dataset to scan (default: generate one in a temporary directory).")
+    synth.add_arguments(parser)
+    parser.add_argument("--latency-ms", type=float, default=2.0, help="Delay added to every listing and stat call.")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16, 64], help="Concurrency limits to compare.")
+    parser.add_argument("--output", help="Write results JSON to this file.")
+    parser.set_defaults(files=2000)
+    args = parser.parse_args()
+
+    with open(SAMPLE_TO_PATIENT) as f:
+        sample_to_patient = json.load(f)
+
+    with tempfile.TemporaryDirectory(prefix="redmane-bench-") as tmp:
+        if args.dataset:
+            data_dir = Path(args.dataset).resolve()
+        else:
+            data_dir = Path(tmp) / "dataset"
+            synth.generate_dataset(data_dir, **synth.dataset_kwargs(args))
+        config_raw = load_config(find_config_path(data_dir))
+        file_types = normalize_and_validate_config(config_raw)
+
+        # Reference records, without injected latency
+        expected = scan(data_dir, file_types, sample_to_patient, config_raw, workers=1)
+        files = sum(len(records) for records in expected.values())
+
+        scandir, stat = async_scanner._scandir, async_scanner._stat
+        async_scanner._scandir = with_latency(scandir, args.latency_ms / 1000)
+        async_scanner._stat = with_latency(stat, args.latency_ms / 1000)
+        results = []
+        try:
+            print(f"{files} files, {args.latency_ms} ms per listing/stat")
+            print(f"{'concurrency':>11} {'seconds':>9} {'files/s':>9} {'speedup':>8}")
+            for concurrency in args.concurrency:
+                start = time.perf_counter()
+                records = scan(data_dir, file_types, sample_to_patient, config_raw, scan_mode="async", concurrency=concurrency)
+                seconds = time.perf_counter() - start
+                if records != expected:
+                    print(f"ERROR: records at concurrency {concurrency} differ from the threaded walker")
+                    sys.exit(1)
+                results.append({"concurrency": concurrency, "seconds": round(seconds, 4), "files_per_sec": round(files / seconds, 1)})
+                speedup = results[0]["seconds"] / seconds
+                print(f"{concurrency:>11} {seconds:>9.3f} {files / seconds:>9.1f} {speedup:>7.1f}x")
+        finally:
+            async_scanner._scandir, async_scanner._stat = scandir, stat
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"files": files, "latency_ms": args.latency_ms, "runs": results}, f, indent=4)
+        print(f"Benchmark results written to {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+Micro-benchmark: per-file cost of extension classification.
+
+Compares the former per-file linear suffix loop (plus extract_sample_id re-sorting the
+extension list for every file) with the precompiled ExtensionClassifier, for a growing
+number of configured extensions including compound suffixes such as .fastq.gz.
+
+Usage:
+    python3 benchmarks/bench_classifier.py [--files 20000] [--extensions 10 1000 10000]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from redmane.auxiliary import extract_sample_id
+from redmane.classifier import ExtensionClassifier
+
+REAL_EXTENSIONS = {
+    "raw": [".fastq", ".fastq.gz", ".fq.gz", ".czi", ".nd2"],
+    "processed": [".bam", ".cram", ".ome.tif", ".ome.tiff"],
+    "summarised": [".vcf", ".vcf.gz", ".maf", ".csv", ".tsv"]
+}
+
+def make_file_types(n_extensions, rng):
+    # Pads the realistic extensions with synthetic single and compound suffixes.
+    file_types = {cat: list(exts) for cat, exts in REAL_EXTENSIONS.items()}
+    categories = list(file_types)
+    i = 0
+    while sum(len(v) for v in file_types.values()) < n_extensions:
+        ext = f".x{i}" if i % 2 else f".x{i}.gz"
+        file_types[categories[i % len(categories)]].append(ext)
+        i += 1
+    return file_types
+
+def make_names(n_files, file_types, rng):
+    all_exts = [ext for exts in file_types.values() for ext in exts]
+    names = []
+    for i in range(n_files):
+        if i % 10 == 0:
+            names.append(f"LC_Sample{i}.unknown")  # unmatched file
+        else:
+            names.append(f"LC_Sample{rng.randint(1, 500)}_L00{i % 4}{rng.choice(all_exts)}")
+    return names
+
+def linear_match(names, file_types):
+    # The former scan_dataset logic, inlined.
+    ext_to_cat = {}
+    all_extensions = []
+    for cat, extensions in file_types.items():
+        for ext in extensions:
+            ext_to_cat[ext.lower()] = cat
+            all_extensions.append(ext)
+    sorted_exts_match = sorted(ext_to_cat.keys(), key=len, reverse=True)
+    results = []
+    for file_name in names:
+        name = file_name.lower()
+        category = None
+        for ext in sorted_exts_match:
+            if name.endswith(ext):
+                category = ext_to_cat[ext]
+                break
+        if category is None:
+            results.append(None)
+            continue
+        results.append((category, extract_sample_id(file_name, all_extensions)))
+    return results
+
+def compiled_match(names, file_types):
+    classifier = ExtensionClassifier(file_types)
+    return [classifier.match(name) for name in names]
+
+def time_it(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return time.perf_counter() - start, result
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark extension classification per file.")
+    parser.add_argument("--files", type=int, default=20000, help="Number of file names to classify.")
+    parser.add_argument("--extensions", type=int, nargs="+", default=[15, 1000, 10000], help="Configured extension counts to test.")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    print(f"{'extensions':>10} {'linear us/file':>15} {'compiled us/file':>17} {'speedup':>8}")
+    for n_ext in args.extensions:
+        file_types = make_file_types(n_ext, rng)
+        names = make_names(args.files, file_types, rng)
+        # The linear path is O(files x extensions); sample it at large extension counts
+        linear_names = names if n_ext <= 1000 else names[:max(200, args.files // 50)]
+        t_lin, r_lin = time_it(linear_match, linear_names, file_types)
+        t_cmp, r_cmp = time_it(compiled_match, names, file_types)
+        assert r_cmp[:len(r_lin)] == r_lin, "classifier disagrees with the linear matcher"
+        us_lin = t_lin / len(linear_names) * 1e6
+        us_cmp = t_cmp / len(names) * 1e6
+        print(f"{n_ext:>10} {us_lin:>15.2f} {us_cmp:>17.2f} {us_lin / us_cmp:>7.0f}x")
+
+if __name__ == "__main__":
+    main()
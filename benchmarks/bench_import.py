@@ -0,0 +1,99 @@
+"""
+Import-time benchmark and regression check for the redmane-ingest entry point.
+
+Runs `python -X importtime -c "import redmane.generator"` in fresh interpreters and reports
+the median cumulative import time of redmane.generator, the slowest modules it pulls in, and
+the wall time of `redmane-ingest --help`. Heavy dependencies (pandas, numpy, rocrate, pyarrow,
+asyncio) are imported only on the code paths that need them. The benchmark exits with
+status 1 if any of them is loaded at startup, or if the median exceeds --max-ms, so it can run
+as a CI check.
+
+Usage:
+    python3 benchmarks/bench_import.py [--runs 5] [--max-ms 150] [--output results.json]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+# Top-level packages that must not be imported by `import redmane.generator`
+HEAVY_MODULES = ["pandas", "numpy", "rocrate", "pyarrow", "asyncio"]
+
+def importtime(module):
+    # Returns {module name: cumulative microseconds} of `module` and of everything it imported,
+    # for one fresh interpreter (modules loaded by the interpreter itself, e.g. site, are left out).
+    env = dict(os.environ, PYTHONPATH=ROOT + os.pathsep + os.environ.get("PYTHONPATH", ""))
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                            env=env, capture_output=True, text=True, check=True)
+    # Lines are "import time: self [us] | cumulative | imported package", children indented and
+    # listed before their parent
+    block = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        if not cumulative.strip().isdigit():
+            continue
+        block[name.strip()] = int(cumulative)
+        if not name[1:].startswith(" "):
+            # Top level: the end of one import tree
+            if name.strip() == module:
+                return block
+            block = {}
+    raise RuntimeError(f"{module} not found in -X importtime output")
+
+def help_seconds():
+    env = dict(os.environ, PYTHONPATH=ROOT + os.pathsep + os.environ.get("PYTHONPATH", ""))
+    start = time.perf_counter()
+    subprocess.run([sys.executable, "-m", "redmane.generator", "--help"], env=env, capture_output=True, check=True)
+    return time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure and check the import time of redmane.generator.")
+    parser.add_argument("--runs", type=int, default=5, help="Fresh interpreters to measure (the median is reported).")
+    parser.add_argument("--max-ms", type=float, help="Fail if the median import time of redmane.generator exceeds this.")
+    parser.add_argument("--top", type=int, default=10, help="Slowest modules to list.")
+    parser.add_argument("--output", help="Write results JSON to this file.")
+    args = parser.parse_args()
+
+    runs = [importtime("redmane.generator") for _ in range(args.runs)]
+    median_ms = statistics.median(run["redmane.generator"] for run in runs) / 1000
+    help_ms = statistics.median(help_seconds() for _ in range(args.runs)) * 1000
+    last = runs[-1]
+    heavy = [name for name in HEAVY_MODULES if name in last]
+
+    print(f"import redmane.generator: {median_ms:.1f} ms (median of {args.runs})")
+    print(f"redmane-ingest --help:    {help_ms:.1f} ms wall (median, including interpreter startup)")
+    print("Slowest modules (cumulative):")
+    slowest = sorted((item for item in last.items() if item[0] != "redmane.generator"), key=lambda item: item[1], reverse=True)
+    for name, us in slowest[:args.top]:
+        print(f"  {us / 1000:>8.1f} ms  {name}")
+
+    failures = []
+    if heavy:
+        failures.append(f"heavy modules imported at startup: {', '.join(heavy)}")
+    if args.max_ms is not None and median_ms > args.max_ms:
+        failures.append(f"import time {median_ms:.1f} ms exceeds --max-ms {args.max_ms:g}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({
+                "import_ms": round(median_ms, 2),
+                "help_ms": round(help_ms, 2),
+                "heavy_modules_imported": heavy,
+                "modules_ms": {name: round(us / 1000, 2) for name, us in last.items()}
+            }, f, indent=4)
+        print(f"Benchmark results written to {args.output}")
+
+    for failure in failures:
+        print(f"ERROR: {failure}")
+    if failures:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,188 @@
+"""
+Benchmark harness for the redmane-ingest pipeline.
+
+Generates (or reuses) a synthetic dataset with benchmarks/synth.py and times each stage of
+generate_json separately: config load, walk, classify, summary parse, crate build and JSON write.
+It then times a full end-to-end run. Results are written as JSON so runs from different versions
+can be compared with --compare.
+
+Usage:
+    python3 benchmarks/bench_ingest.py --files 100000 --output bench.json
+    python3 benchmarks/bench_ingest.py --dataset /tmp/synth --compare bench.json
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import synth
+from redmane import __version__
+from redmane.params import METADATA, SAMPLE_TO_PATIENT, ORGANIZATION, SCAN_WORKERS
+from redmane.config import find_config_path, load_config, normalize_and_validate_config, normalize_scan_options, compile_classifier
+from redmane.scanner import walk_dataset
+from redmane.summaries import extract_table_sample_ids, extract_vcf_sample_ids, is_vcf
+from redmane.auxiliary import scan_dataset
+from redmane.crate import MetadataOnlyCrate
+from redmane.writers import open_writer
+from redmane.metadata_store import MetadataStore
+from redmane.generator import generate_json
+
+def timed(results, stage, fn, items_of=len):
+    # Runs fn once, records its wall time and throughput under results[stage], returns its result.
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        value = fn()
+    seconds = time.perf_counter() - start
+    items = items_of(value) if items_of else None
+    results[stage] = {
+        "seconds": round(seconds, 6),
+        "items": items,
+        "items_per_sec": round(items / seconds, 1) if items and seconds > 0 else None
+    }
+    return value
+
+def run_stages(data_dir, workers, rocrate_mode, output_format, work_dir):
+    results = {}
+
+    def load_stage():
+        # Same mapping as the CLI: the indexed MetadataStore, looked up on demand
+        config_raw = load_config(find_config_path(data_dir))
+        file_types = normalize_and_validate_config(config_raw)
+        return file_types, compile_classifier(file_types), normalize_scan_options(config_raw, workers=workers), MetadataStore(METADATA).mapping(SAMPLE_TO_PATIENT)
+    file_types, classifier, scan_options, sample_to_patient = timed(results, "config_load", load_stage, items_of=None)
+
+    # Walk + stat every non-hidden file, without classification
+    walked = timed(results, "walk", lambda: [entry for entry, _ in walk_dataset(data_dir, lambda name: True, workers)])
+    results["walk"]["bytes_stat"] = sum(entry.stat().st_size for entry in walked)
+
+    matches = timed(results, "classify", lambda: [(entry, classifier.match(entry.name)) for entry in walked])
+    summarised = [Path(entry.path) for entry, match in matches if match and match[0] == "summarised"]
+
+    def parse_stage():
+        ids = []
+        for path in summarised:
+            try:
+                if is_vcf(path.name):
+                    ids.append(extract_vcf_sample_ids(path))
+                elif path.suffix.lower() in (".csv", ".tsv", ".maf"):
+                    ids.append(extract_table_sample_ids(path, scan_options.sample_id_columns.get(path.suffix.lower(), 0)))
+            except Exception:
+                pass
+        return ids
+    timed(results, "summary_parse", parse_stage)
+
+    # Records as produced by a full scan, reused by the crate and write stages
+    files_map = timed(results, "scan_records", lambda: scan_dataset(data_dir, file_types, {}, sample_to_patient, ORGANIZATION, None, scan_options, classifier=classifier), items_of=lambda m: sum(len(v) for v in m.values()))
+    records = [(cat, record) for cat, recs in files_map.items() for record in recs]
+
+    def crate_stage():
+        if rocrate_mode == "metadata":
+            crate = MetadataOnlyCrate("Research Object", f"Benchmark of {data_dir}")
+        else:
+            from rocrate.rocrate import ROCrate
+            crate = ROCrate()
+        for cat, record in records:
+            crate.add_file(data_dir / record["directory"], properties={"sample_id": record["sample_id"], "patient_id": record["patient_id"]})
+        crate.write(work_dir / "rocrate")
+        return records
+    timed(results, "crate_build", crate_stage)
+
+    def write_stage():
+        writer = open_writer(output_format, work_dir / f"stage_output.{output_format}", data_dir, file_types)
+        for cat, record in records:
+            writer.add(cat, record)
+        writer.close()
+        return records
+    timed(results, "json_write", write_stage)
+    results["json_write"]["bytes_written"] = (work_dir / f"stage_output.{output_format}").stat().st_size
+
+    def end_to_end():
+        generate_json(data_dir, work_dir / f"output.{output_format}", workers=workers, use_cache=False, output_format=output_format, rocrate_mode=rocrate_mode)
+        return records
+    timed(results, "end_to_end", end_to_end)
+    return results
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, cwd=os.path.dirname(__file__)).stdout.strip() or None
+    except OSError:
+        return None
+
+def compare(current, baseline):
+    # Prints per-stage wall time of the baseline run vs this run.
+    print(f"\n{'stage':<15} {'baseline s':>11} {'current s':>10} {'ratio':>7}")
+    for stage, result in current["stages"].items():
+        old = baseline.get("stages", {}).get(stage)
+        if not old:
+            continue
+        ratio = result["seconds"] / old["seconds"] if old["seconds"] else float("inf")
+        flag = "  <-- slower" if ratio > 1.1 else ""
+        print(f"{stage:<15} {old['seconds']:>11.3f} {result['seconds']:>10.3f} {ratio:>6.2f}x{flag}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark each stage of the ingest pipeline on a synthetic dataset.")
+    parser.add_argument("--dataset", help="Existing dataset to benchmark (default: generate one in a temporary directory).")
+    synth.add_arguments(parser)
+    parser.add_argument("--workers", type=int, default=SCAN_WORKERS, help="Scanner threads.")
+    parser.add_argument("--rocrate-mode", choices=["copy", "metadata"], default="metadata", help="RO-Crate mode for the crate stage.")
+    parser.add_argument("--output-format", choices=["json", "jsonl", "parquet", "arrow"], default="json")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per stage; the fastest is reported.")
+    parser.add_argument("--output", help="Write results JSON to this file (default: stdout).")
+    parser.add_argument("--compare", help="Results JSON of a previous run to compare against.")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="redmane-bench-") as tmp:
+        tmp = Path(tmp)
+        if args.dataset:
+            data_dir = Path(args.dataset).resolve()
+            dataset = {"root": str(data_dir)}
+        else:
+            data_dir = tmp / "dataset"
+            dataset = synth.generate_dataset(data_dir, **synth.dataset_kwargs(args))
+        work_dir = tmp / "work"
+        work_dir.mkdir()
+        # Keep the fastest of --repeat runs per stage to reduce noise
+        runs = [run_stages(data_dir, args.workers, args.rocrate_mode, args.output_format, work_dir) for _ in range(args.repeat)]
+        stages = {stage: min((run[stage] for run in runs), key=lambda r: r["seconds"]) for stage in runs[0]}
+
+    result = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "redmane_version": __version__,
+            "git_revision": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "workers": args.workers,
+            "rocrate_mode": args.rocrate_mode,
+            "output_format": args.output_format,
+            "repeat": args.repeat
+        },
+        "dataset": dataset,
+        "stages": stages
+    }
+
+    text = json.dumps(result, indent=4)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+        print(f"Benchmark results written to {args.output}")
+    else:
+        print(text)
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(result, json.load(f))
+
+if __name__ == "__main__":
+    main()
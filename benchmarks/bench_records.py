@@ -0,0 +1,113 @@
+"""
+Memory benchmark for the in-memory record store (redmane/records.py).
+
+Builds the records of a synthetic scan with the scanner's own _build_record (Raw/ and
+Processed/ files spread over nested directories, sample IDs from sample_to_patient.json) and
+keeps them twice: as the {category: [dict, ...]} lists scan_dataset used to return, and in a
+RecordStore. Reports the memory retained by each (tracemalloc), the time to fill them and to
+read every record back as a dict, and checks that both hold the same records.
+
+Usage:
+    python3 benchmarks/bench_records.py --files 200000 [--output results.json]
+"""
+import argparse
+import gc
+import json
+import os
+import random
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from redmane.params import ORGANIZATION, SAMPLE_TO_PATIENT
+from redmane.auxiliary import _build_record
+from redmane.records import RecordStore
+
+LAYOUT = [("raw", "Raw", ".fastq.gz"), ("processed", "Processed", ".bam")]
+
+def synthetic_records(files, sample_to_patient, depth, fanout, seed):
+    # Yields (category, record) like a scan of `files` files would, built one at a time.
+    rng = random.Random(seed)
+    sample_ids = list(sample_to_patient)
+    for i in range(files):
+        category, folder, ext = LAYOUT[i % len(LAYOUT)]
+        sample_id = f"{rng.choice(sample_ids)}_{i}"
+        rel_path = Path(folder, *(f"d{rng.randrange(fanout)}" for _ in range(depth)), sample_id + ext)
+        size_bytes = int(rng.lognormvariate(20, 2))
+        yield category, _build_record(Path("/data") / rel_path, rel_path, category, sample_id, size_bytes, sample_to_patient, ORGANIZATION)
+
+def measure(fill):
+    # Returns (retained object, bytes retained, seconds) for one way of holding the records.
+    # Timed in a separate, untraced run: tracemalloc slows allocations down several times.
+    gc.collect()
+    start = time.perf_counter()
+    fill()
+    seconds = time.perf_counter() - start
+    gc.collect()
+    tracemalloc.start()
+    held = fill()
+    gc.collect()
+    retained = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return held, retained, seconds
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the memory of record dicts with the compact RecordStore.")
+    parser.add_argument("--files", type=int, default=200000, help="Records to hold.")
+    parser.add_argument("--depth", type=int, default=3, help="Directory levels below Raw/ and Processed/.")
+    parser.add_argument("--fanout", type=int, default=8, help="Subdirectories per level.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write results JSON to this file.")
+    args = parser.parse_args()
+
+    with open(SAMPLE_TO_PATIENT) as f:
+        sample_to_patient = json.load(f)
+    records = lambda: synthetic_records(args.files, sample_to_patient, args.depth, args.fanout, args.seed)
+
+    def fill_dicts():
+        files_by_category = {category: [] for category, _, _ in LAYOUT}
+        for category, record in records():
+            files_by_category[category].append(record)
+        return files_by_category
+
+    def fill_store():
+        store = RecordStore([category for category, _, _ in LAYOUT])
+        for category, record in records():
+            store.add(category, record)
+        return store
+
+    dicts, dict_bytes, dict_seconds = measure(fill_dicts)
+    store, store_bytes, store_seconds = measure(fill_store)
+
+    start = time.perf_counter()
+    for category in store:
+        for _record in store[category]:
+            pass
+    read_seconds = time.perf_counter() - start
+    if store != dicts:
+        print("ERROR: the RecordStore does not return the records it was given")
+        sys.exit(1)
+
+    print(f"{args.files} records")
+    print(f"{'':>12} {'MB':>9} {'bytes/rec':>10} {'fill s':>8}")
+    print(f"{'dicts':>12} {dict_bytes / 2**20:>9.1f} {dict_bytes / args.files:>10.0f} {dict_seconds:>8.2f}")
+    print(f"{'RecordStore':>12} {store_bytes / 2**20:>9.1f} {store_bytes / args.files:>10.0f} {store_seconds:>8.2f}")
+    print(f"RecordStore uses {store_bytes / dict_bytes:.0%} of the memory; reading every record back: {read_seconds:.2f}s")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({
+                "files": args.files,
+                "dict_bytes": dict_bytes,
+                "store_bytes": store_bytes,
+                "dict_fill_seconds": round(dict_seconds, 4),
+                "store_fill_seconds": round(store_seconds, 4),
+                "store_read_seconds": round(read_seconds, 4)
+            }, f, indent=4)
+        print(f"Benchmark results written to {args.output}")
+
+if __name__ == "__main__":
+    main()
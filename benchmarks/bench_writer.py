@@ -0,0 +1,104 @@
+"""
+Write-time benchmark for the streaming output.json writer (redmane/writers.py).
+
+Builds the records of a synthetic scan (see bench_records.py) and writes the same manifest
+twice: with json.dump(output_data, f, indent=4) over the whole document, as the generator did
+before streaming, and through StreamingJSONWriter with the default indentation. Also times the
+--compact writer. Checks that the streamed document is byte-identical to json.dump's, and
+exits with status 1 if the default (indented) streaming write is slower than the baseline by
+more than --max-ratio, so it can run as a CI check.
+
+Usage:
+    python3 benchmarks/bench_writer.py --files 100000 [--runs 3] [--max-ratio 1.0] [--output results.json]
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from redmane.params import FILE_SIZE_UNIT, SAMPLE_TO_PATIENT
+from redmane.writers import StreamingJSONWriter
+from bench_records import LAYOUT, synthetic_records
+
+def write_baseline(path, location, files_by_category):
+    # The pre-streaming writer: the whole document in memory, dumped with indent=4.
+    output_data = {"data": {"location": location, "file_size_unit": FILE_SIZE_UNIT, "files": files_by_category}}
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(output_data, f, indent=4)
+
+def write_streaming(path, location, files_by_category, indent):
+    writer = StreamingJSONWriter(path, location, list(files_by_category), indent=indent)
+    for category, records in files_by_category.items():
+        for record in records:
+            writer.add(category, record)
+    writer.close()
+
+def timed(runs, write):
+    # Median seconds of `runs` writes.
+    seconds = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        write()
+        seconds.append(time.perf_counter() - start)
+    return statistics.median(seconds)
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the streaming output.json writer with json.dump of the whole document.")
+    parser.add_argument("--files", type=int, default=100000, help="Records to write.")
+    parser.add_argument("--depth", type=int, default=3, help="Directory levels below Raw/ and Processed/.")
+    parser.add_argument("--fanout", type=int, default=8, help="Subdirectories per level.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--runs", type=int, default=3, help="Writes per writer; the median is reported.")
+    parser.add_argument("--max-ratio", type=float, default=1.0, help="Fail if the indented streaming write takes longer than this times the baseline.")
+    parser.add_argument("--output", help="Write results JSON to this file.")
+    args = parser.parse_args()
+
+    with open(SAMPLE_TO_PATIENT) as f:
+        sample_to_patient = json.load(f)
+    files_by_category = {category: [] for category, _, _ in LAYOUT}
+    for category, record in synthetic_records(args.files, sample_to_patient, args.depth, args.fanout, args.seed):
+        files_by_category[category].append(record)
+    location = "/data"
+
+    with tempfile.TemporaryDirectory(prefix="redmane-bench-writer-") as tmp:
+        baseline_path = os.path.join(tmp, "baseline.json")
+        streamed_path = os.path.join(tmp, "output.json")
+        compact_path = os.path.join(tmp, "compact.json")
+        baseline = timed(args.runs, lambda: write_baseline(baseline_path, location, files_by_category))
+        streamed = timed(args.runs, lambda: write_streaming(streamed_path, location, files_by_category, 4))
+        compact = timed(args.runs, lambda: write_streaming(compact_path, location, files_by_category, None))
+        with open(baseline_path, "rb") as a, open(streamed_path, "rb") as b:
+            identical = a.read() == b.read()
+        sizes = {name: os.path.getsize(path) for name, path in [("baseline", baseline_path), ("streaming", streamed_path), ("compact", compact_path)]}
+
+    print(f"{args.files} records, median of {args.runs} writes")
+    print(f"{'':>22} {'s':>7} {'records/s':>10} {'MB':>7}")
+    for name, seconds, size in [("json.dump indent=4", baseline, sizes["baseline"]), ("streaming (default)", streamed, sizes["streaming"]), ("streaming --compact", compact, sizes["compact"])]:
+        print(f"{name:>22} {seconds:>7.2f} {args.files / seconds:>10.0f} {size / 2**20:>7.1f}")
+    print(f"Streaming writes the default document in {streamed / baseline:.0%} of the baseline time")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({
+                "files": args.files,
+                "baseline_seconds": round(baseline, 4),
+                "streaming_seconds": round(streamed, 4),
+                "compact_seconds": round(compact, 4),
+                "identical": identical
+            }, f, indent=4)
+        print(f"Benchmark results written to {args.output}")
+
+    if not identical:
+        print("ERROR: the streamed output.json differs from json.dump(indent=4)")
+        sys.exit(1)
+    if streamed > baseline * args.max_ratio:
+        print(f"ERROR: streaming write is slower than {args.max_ratio:g} x the baseline")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
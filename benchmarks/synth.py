@@ -0,0 +1,170 @@
+"""
+Synthetic dataset generator for the ingest benchmarks.
+
+Builds a REDMANE-style tree (Raw/, Processed/, Summarised/ plus config.json) whose sample IDs
+come from redmane/sample_metadata/sample_to_patient.json (LC_Sample1..LC_Sample500). Summarised
+count matrices follow the mimic_rawfiles_generator.ipynb scheme: one row per sample, 'gene_<i>'
+columns and uniform values in [0, 10) rounded to 2 decimals. A MAF with a Tumor_Sample_Barcode
+column and a multi-sample VCF are added too.
+
+Data files are created sparse (truncate), so large size distributions cost no disk space or write I/O.
+
+Usage:
+    python3 benchmarks/synth.py /tmp/synth --files 100000 --depth 3 --fanout 8
+"""
+import argparse
+import json
+import math
+import os
+import random
+import sys
+from pathlib import Path
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from redmane.params import SAMPLE_TO_PATIENT
+
+CONFIG = {
+    "raw_file_extensions": [".fastq", ".fastq.gz", ".czi"],
+    "processed_file_extensions": [".bam", ".ome.tif"],
+    "summarised_file_extensions": [".csv", ".tsv", ".maf", ".vcf", ".vcf.gz"],
+    "sample_id_columns": {".maf": "Tumor_Sample_Barcode"}
+}
+
+# Share of data files per category and the extensions drawn for each
+LAYOUT = [
+    ("Raw", 0.5, [".fastq.gz", ".fastq", ".czi"]),
+    ("Processed", 0.5, [".bam", ".ome.tif"])
+]
+
+def load_sample_ids():
+    with open(SAMPLE_TO_PATIENT) as f:
+        return list(json.load(f))
+
+def draw_size(rng, distribution, mean_size):
+    # Returns a file size in bytes for the chosen distribution.
+    if distribution == "fixed":
+        return mean_size
+    if distribution == "uniform":
+        return rng.randint(0, 2 * mean_size)
+    # lognormal with the requested mean: many small files and a long tail of large ones
+    sigma = 1.5
+    mu = math.log(max(mean_size, 1)) - sigma ** 2 / 2
+    return int(rng.lognormvariate(mu, sigma))
+
+def leaf_dirs(base, depth, fanout):
+    # All directories at the given depth below base, e.g. base/d00/d03 for depth 2.
+    dirs = [base]
+    for level in range(depth):
+        dirs = [d / f"d{i:02d}" for d in dirs for i in range(fanout)]
+    return dirs
+
+def write_counts_table(path, sample_ids, cols, rng, sep=","):
+    # Mimic counts matrix: samples as rows, gene_<i> as columns.
+    with open(path, "w") as f:
+        f.write(sep.join([""] + [f"gene_{i}" for i in range(cols)]) + "\n")
+        for sample in sample_ids:
+            values = (f"{rng.uniform(0.0, 10.0):.2f}" for _ in range(cols))
+            f.write(sep.join([sample, *values]) + "\n")
+
+def write_maf(path, sample_ids, rows, rng):
+    with open(path, "w") as f:
+        f.write("#version 2.4\n")
+        f.write("Hugo_Symbol\tEntrez_Gene_Id\tCenter\tNCBI_Build\tTumor_Sample_Barcode\n")
+        for i in range(rows):
+            f.write(f"GENE{i % 1000}\t{10000 + i}\tCenterX\t37\t{rng.choice(sample_ids)}\n")
+
+def write_vcf(path, sample_ids, rows, rng):
+    with open(path, "w") as f:
+        f.write("##fileformat=VCFv4.2\n")
+        f.write("\t".join(["#CHROM", "POS", "ID", "REF", "ALT", "QUAL", "FILTER", "INFO", "FORMAT", *sample_ids]) + "\n")
+        for i in range(rows):
+            genotypes = "\t".join(rng.choice(("0/0", "0/1", "1/1")) for _ in sample_ids)
+            f.write(f"1\t{1000 + i}\t.\tA\tT\t50\tPASS\t.\tGT\t{genotypes}\n")
+
+def generate_dataset(root, files=10000, depth=2, fanout=4, size_distribution="lognormal", mean_size=1 << 20,
+                     tables=2, table_rows=100, table_cols=100, seed=0):
+    # Creates the synthetic dataset under root and returns a description of what was generated.
+    rng = random.Random(seed)
+    root = Path(root)
+    root.mkdir(parents=True, exist_ok=True)
+    sample_ids = load_sample_ids()
+
+    with open(root / "config.json", "w") as f:
+        json.dump(CONFIG, f, indent=4)
+
+    total_bytes = 0
+    n = 0
+    for top, share, extensions in LAYOUT:
+        dirs = leaf_dirs(root / top, depth, fanout)
+        for d in dirs:
+            d.mkdir(parents=True, exist_ok=True)
+        count = int(files * share)
+        for i in range(count):
+            sample = rng.choice(sample_ids)
+            path = dirs[i % len(dirs)] / f"{sample}_L{i:07d}{rng.choice(extensions)}"
+            size = draw_size(rng, size_distribution, mean_size)
+            with open(path, "wb") as f:
+                f.truncate(size)
+            total_bytes += size
+            n += 1
+
+    summarised = root / "Summarised"
+    summarised.mkdir(exist_ok=True)
+    for i in range(tables):
+        table_samples = rng.sample(sample_ids, min(table_rows, len(sample_ids)))
+        write_counts_table(summarised / f"counts_dataset{i + 1}.csv", table_samples, table_cols, rng)
+    write_maf(summarised / "cohort.maf", sample_ids, table_rows * 10, rng)
+    write_vcf(summarised / "cohort.vcf", sample_ids[:table_cols], table_rows, rng)
+    for p in summarised.iterdir():
+        total_bytes += p.stat().st_size
+        n += 1
+
+    return {
+        "root": str(root),
+        "files": n,
+        "bytes": total_bytes,
+        "depth": depth,
+        "fanout": fanout,
+        "size_distribution": size_distribution,
+        "mean_size": mean_size,
+        "tables": tables,
+        "table_rows": table_rows,
+        "table_cols": table_cols,
+        "seed": seed
+    }
+
+def add_arguments(parser):
+    parser.add_argument("--files", type=int, default=10000, help="Number of raw/processed data files.")
+    parser.add_argument("--depth", type=int, default=2, help="Directory depth below Raw/ and Processed/.")
+    parser.add_argument("--fanout", type=int, default=4, help="Subdirectories per directory level.")
+    parser.add_argument("--size-distribution", choices=["fixed", "uniform", "lognormal"], default="lognormal")
+    parser.add_argument("--mean-size", type=int, default=1 << 20, help="Mean file size in bytes (files are sparse).")
+    parser.add_argument("--tables", type=int, default=2, help="Number of summarised count matrices.")
+    parser.add_argument("--table-rows", type=int, default=100, help="Samples (rows) per count matrix.")
+    parser.add_argument("--table-cols", type=int, default=100, help="Genes (columns) per count matrix.")
+    parser.add_argument("--seed", type=int, default=0)
+
+def dataset_kwargs(args):
+    return {
+        "files": args.files,
+        "depth": args.depth,
+        "fanout": args.fanout,
+        "size_distribution": args.size_distribution,
+        "mean_size": args.mean_size,
+        "tables": args.tables,
+        "table_rows": args.table_rows,
+        "table_cols": args.table_cols,
+        "seed": args.seed
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic REDMANE dataset.")
+    parser.add_argument("root", help="Directory to create the dataset in.")
+    add_arguments(parser)
+    args = parser.parse_args()
+    info = generate_dataset(args.root, **dataset_kwargs(args))
+    print(json.dumps(info, indent=4))
+
+if __name__ == "__main__":
+    main()
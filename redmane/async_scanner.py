@@ -0,0 +1,146 @@
+import asyncio
+import os
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from .params import SCAN_CONCURRENCY
+from .containers import measure_container
+from .scanner import ScannedFile, list_dir
+
+# Blocking filesystem calls, looked up at call time so benchmarks can inject latency
+_scandir = os.scandir
+_stat = os.stat
+
+# Files whose stat/prepare run ahead of the consumer, per unit of concurrency
+WINDOW_PER_SLOT = 4
+
+# Directory listings read ahead of the consumer, per unit of concurrency
+READ_AHEAD_PER_SLOT = 4
+
+# Results handed from the event loop to the synchronous caller per loop run
+BATCH_SIZE = 256
+
+class _AsyncWalk:
+    # One walk: directory listings, stats and `prepare` calls are blocking, so each runs on a
+    # thread of the executor. At most `concurrency` of them are in flight at once (semaphore), and
+    # they overlap freely: listings read ahead through the tree while the stats and prepares of
+    # the next files in walk order are pending. Results come out in Path.rglob pre-order.
+    # At most READ_AHEAD_PER_SLOT * concurrency listings are pending or waiting to be consumed,
+    # so a wide tree is not held in memory.
+
+    def __init__(self, root, classify, concurrency, prepare, classify_container=None, shallow_containers=False, path_filter=None):
+        self.root = root
+        self.classify = classify
+        self.classify_container = classify_container
+        self.shallow_containers = shallow_containers
+        self.path_filter = path_filter
+        self.concurrency = concurrency
+        self.prepare = prepare
+        self.loop = None
+        self.executor = None
+        self.semaphore = None
+        self.listings = {}
+        self.read_ahead_limit = concurrency * READ_AHEAD_PER_SLOT
+
+    async def _blocking(self, fn, *args):
+        async with self.semaphore:
+            return await self.loop.run_in_executor(self.executor, fn, *args)
+
+    async def _list(self, path):
+        files, subdirs = await self._blocking(list_dir, path, self.classify, self.classify_container, self.path_filter, _scandir)
+        # Read ahead: list the subdirectories while the caller is still on this one
+        self._read_ahead(subdirs)
+        return files, subdirs
+
+    def _read_ahead(self, paths):
+        # Starts listings of `paths` in order until the read-ahead limit.
+        for path in paths:
+            if len(self.listings) >= self.read_ahead_limit:
+                break
+            if path not in self.listings:
+                self.listings[path] = self.loop.create_task(self._list(path))
+
+    async def _stat_and_prepare(self, entry, match, is_container):
+        path, name = entry.path, entry.name
+        try:
+            if is_container:
+                st = await self._blocking(measure_container, path, self.shallow_containers)
+            else:
+                # Through the module-level _stat rather than entry.stat, so benchmarks can inject latency
+                st = await self._blocking(_stat, path)
+        except OSError:
+            # Vanished between listing and stat
+            return None
+        prepared = None
+        if self.prepare is not None:
+            prepared = await self._blocking(self.prepare, path, name, match, st)
+        return ScannedFile(path, name, st), match, prepared
+
+    async def _ordered_files(self):
+        # (DirEntry, match, is_container) of every matched file and container, in pre-order.
+        self._read_ahead([self.root])
+        stack = [self.root]
+        while stack:
+            path = stack.pop()
+            task = self.listings.pop(path, None)
+            files, subdirs = await (task if task is not None else self._list(path))
+            stack.extend(reversed(subdirs))
+            self._read_ahead(reversed(stack[-self.read_ahead_limit:]))
+            for item in files:
+                yield item
+
+    async def _results(self):
+        # Keeps a window of stat/prepare tasks running ahead, yielding them in order.
+        self.semaphore = asyncio.Semaphore(self.concurrency)
+        window = deque()
+        limit = self.concurrency * WINDOW_PER_SLOT
+        async for item in self._ordered_files():
+            window.append(self.loop.create_task(self._stat_and_prepare(*item)))
+            while len(window) >= limit:
+                result = await window.popleft()
+                if result is not None:
+                    yield result
+        while window:
+            result = await window.popleft()
+            if result is not None:
+                yield result
+
+    async def _next_batch(self, results):
+        batch = []
+        try:
+            while len(batch) < BATCH_SIZE:
+                batch.append(await results.__anext__())
+        except StopAsyncIteration:
+            pass
+        return batch
+
+    def __iter__(self):
+        self.loop = asyncio.new_event_loop()
+        self.executor = ThreadPoolExecutor(max_workers=self.concurrency)
+        results = self._results()
+        try:
+            while True:
+                batch = self.loop.run_until_complete(self._next_batch(results))
+                yield from batch
+                if len(batch) < BATCH_SIZE:
+                    return
+        finally:
+            # The caller may stop early: cancel the read-ahead and close the loop
+            pending = [task for task in asyncio.all_tasks(self.loop) if not task.done()]
+            for task in pending:
+                task.cancel()
+            if pending:
+                self.loop.run_until_complete(asyncio.gather(*pending, return_exceptions=True))
+            self.loop.run_until_complete(results.aclose())
+            self.loop.run_until_complete(self.loop.shutdown_asyncgens())
+            self.loop.close()
+            self.executor.shutdown(wait=True)
+
+def walk_dataset_async(root, classify, concurrency=SCAN_CONCURRENCY, prepare=None, classify_container=None, shallow_containers=False, path_filter=None):
+    # asyncio counterpart of scanner.walk_dataset for high-latency (network) filesystems, where
+    # every listing and stat is a round trip. Yields (ScannedFile, match, prepared) for the same
+    # files and in the same order as walk_dataset. prepare(path, name, match, st), if given, is
+    # extra blocking per-file work (e.g. reading a summary file's header) that is pipelined with
+    # the walk; its return value is passed through as `prepared`.
+    # Container directories and path_filter are handled as in walk_dataset; measuring a container
+    # is a single blocking call.
+    return iter(_AsyncWalk(os.fspath(root), classify, max(1, concurrency), prepare, classify_container, shallow_containers, path_filter))
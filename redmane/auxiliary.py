@@ -1,8 +1,22 @@
 
+import logging
 import os
+import time
 from pathlib import Path
-import pandas as pd
-from .params import CONVERT_FROM_BYTES, FILE_SIZE_UNIT
+from .params import FILE_SIZE_UNIT
+from .config import ScanOptions
+from .scanner import walk_dataset
+from .classifier import ExtensionClassifier, container_matcher
+from .checksums import CHECKSUM_ALGORITHMS
+from .summaries import has_sample_ids, read_summary_sample_ids
+from .metrics import Metrics
+from .resolver import PatientResolver
+from .containers import ContainerStat
+from .records import RecordStore
+from .patterns import compile_path_filter
+from .units import convert_size, format_size
+
+logger = logging.getLogger(__name__)
 
 def extract_sample_id(filename: str, extensions: list) -> str:
     # Extracts sample ID from filename by removing known extensions (longest match first).
@@ -17,123 +31,245 @@ def extract_sample_id(filename: str, extensions: list) -> str:
     # Fallback: simple splitext
     return os.path.splitext(filename)[0]
 
-def scan_dataset(data_dir: Path, file_types: dict, metadata_dict: dict, sample_to_patient: dict, organization: str, crate):
+def scan_dataset(data_dir: Path, file_types: dict, metadata_dict: dict, sample_to_patient: dict, organization: str, crate, options: ScanOptions = None, cache=None, writer=None, checksums=None, classifier=None, metrics=None, resolver=None, pool=None):
     # Recursively scans the dataset directory, categorizes files, and registers them in the RO-Crate.
-    files_by_category = {cat: [] for cat in file_types}
-    
-    print(f" | Scanning {data_dir} recursively...")
+    # `options` (a ScanOptions, see config.py) holds the scan settings named below (workers, scan_mode,
+    # sample_id_columns, ...); the other arguments are the objects the scan works with.
+    # Records are handed to `writer` (see writers.py) as soon as they are built. Without a writer they are
+    # collected in a RecordStore (see records.py), a compact {category: [record, ...]} mapping.
+    # Directories are listed by a pool of `workers` threads (see scanner.py); the output is identical to a serial walk.
+    # In batch mode the listings run on the shared executor `pool` instead.
+    # scan_mode "async" walks with asyncio instead (see async_scanner.py): up to `concurrency` listings,
+    # stats and summary file reads overlap, which suits high-latency network filesystems. Same records.
+    # With a ScanCache (see cache.py), unchanged files reuse their record from the previous scan.
+    # With a ChecksumPipeline (see checksums.py), file contents are hashed on a thread pool.
+    # With attach_metadata, the clinical fields of each file's patients are looked up in
+    # metadata_dict (a dict or an indexed MetadataStore.patients view) and added to the record.
+    # Sample IDs of summarised tables are mapped to patients in one batch by `resolver` (see resolver.py);
+    # samples missing from the mapping are listed in the record and reported at the end of the scan.
+    # Directories with a container extension (e.g. .zarr stores) are one record each, with the total
+    # size and number of their files (file_count); their chunks are not listed. With shallow_containers
+    # they are not walked at all: their size is unknown, so file_size, file_size_bytes and file_count
+    # are null and they are left out of the size total.
+    # Directories matching an `exclude` pattern are pruned before they are listed, and with `include`
+    # only matching files are kept (gitignore-style, see patterns.py); the skipped counts are reported.
+    # Records keep the exact size in bytes (file_size_bytes); file_size and the printed total are
+    # rendered in `size_unit` (see units.py) from exact values, so rounding never accumulates.
+    # Walk, summary parse, crate and write times and counters are accumulated in `metrics` (see metrics.py).
+    if options is None:
+        options = ScanOptions()
+    workers, scan_mode, concurrency, size_unit = options.workers, options.scan_mode, options.concurrency, options.size_unit
+    sample_id_columns, attach_metadata, shallow_containers = options.sample_id_columns, options.attach_metadata, options.shallow_containers
+    files_by_category = RecordStore(file_types, size_unit) if writer is None else None
     
-    # Flatten file types for easy lookup and extraction
-    all_extensions = []
-    ext_to_cat = {}
-    for cat, extensions in file_types.items():
-        files_by_category[cat] = [] # Ensure keys exist
-        for ext in extensions:
-            ext_to_cat[ext.lower()] = cat
-            all_extensions.append(ext)
-
-    total_size = 0
+    if scan_mode == "async":
+        print(f" | Scanning {data_dir} recursively (async, concurrency {concurrency})...")
+    else:
+        print(f" | Scanning {data_dir} recursively ({workers} workers)...")
     
-    # Sort extensions for matching
-    sorted_exts_match = sorted(ext_to_cat.keys(), key=len, reverse=True)
-
-    for file_path in data_dir.rglob('*'):
-        if file_path.is_file():
-            if file_path.name.startswith('.'):
-                continue
-                
-            name = file_path.name.lower()
-            category = None
-            
-            for ext in sorted_exts_match:
-                if name.endswith(ext):
-                    category = ext_to_cat[ext]
-                    break
-            
-            if category is None:
-                continue
+    # One precompiled matcher returns both the category and the extension-stripped sample ID
+    if classifier is None:
+        classifier = ExtensionClassifier(file_types)
+    if metrics is None:
+        metrics = Metrics()
+    if resolver is None:
+        resolver = PatientResolver(sample_to_patient)
+    classify_container = container_matcher(classifier, options.container_extensions)
+    path_filter = compile_path_filter(data_dir, options.exclude, options.include)
+    # Checked once: formatting a log line per file is a measurable cost on millions of files
+    log_files = logger.isEnabledFor(logging.DEBUG)
 
-            # Calculate size
-            size_bytes = file_path.stat().st_size
-            size_kb = round(size_bytes / CONVERT_FROM_BYTES)
-            total_size += size_kb
-            
-            # Determine Sample ID using robust extraction
-            sample_id = extract_sample_id(file_path.name, all_extensions)
-            
-            # Look up patient ID
-            patient_id = sample_to_patient.get(sample_id, "")
-            
-            sample_ids_list = [sample_id]
-            patient_ids_list = [patient_id] if patient_id else []
-            
-            # Special handling for summarised files (lookup internal CSV IDs)
-            if category == 'summarised' and file_path.suffix in ['.csv', '.tsv', '.maf']:
-                try:
-                    # Determine separator
-                    if file_path.suffix == '.tsv':
-                        sep = '\t'
-                    elif file_path.suffix == '.maf':
-                        sep = '\t'  # MAF is typically tab-delimited
-                        # Skip comment lines starting with # for MAF if needed, but pandas read_csv handles comment='#' often
-                        # However, MAF usually has comments. Let's use comment='#' just in case.
-                    else:
-                        sep = ','
-
-                    try:
-                        # Attempt to read index. For MAF/TSV/CSV.
-                        # Note: MAF files often have many comment lines. 
-                        # We'll use comment='#' to be safe for MAF/VCF-like text.
-                        extra_args = {}
-                        if file_path.suffix == '.maf':
-                             extra_args['comment'] = '#'
-
-                        df = pd.read_csv(file_path, index_col=0, sep=sep, **extra_args)
-                        if not df.empty:
-                            sample_ids_list = list(df.index.astype(str))
-                            # Map all samples to patients
-                            p_ids = set()
-                            for s in sample_ids_list:
-                                pid = sample_to_patient.get(s)
-                                if pid:
-                                    p_ids.add(pid)
-                            patient_ids_list = list(p_ids)
-                    except Exception as e:
-                        print(f"   ! Could not read summary file {file_path.name}: {e}")
-                except Exception:
-                    pass
-
-            # Format for output
-            final_sample_id = sample_ids_list if len(sample_ids_list) > 1 else sample_ids_list[0]
-            final_patient_id = patient_ids_list if len(patient_ids_list) > 1 else (patient_ids_list[0] if patient_ids_list else "")
-            
-            # Add to RO-Crate
-            try:
-                rel_path = file_path.relative_to(data_dir)
-            except ValueError:
-                rel_path = file_path.name
-            
-            # Crate registration disabled/commented or minimal? 
-            # Prompt says "Separate RO-Crate functionality... but ensure the generator’s core logic does not require RO-Crate to run."
-            # We will keep it safe for now:
-            if crate:
-                 crate.add_file(file_path, properties={
-                    "fileSize": f"{size_kb}{FILE_SIZE_UNIT}",
-                    "patient_id": final_patient_id,
-                    "sample_id": final_sample_id
-                })
-            
-            record = {
-                "file_name": file_path.name,
-                "file_size": size_kb,
-                "directory": f"./{rel_path}",
-                "organization": organization,
-                "sample_id": final_sample_id,
-                "patient_id": final_patient_id
-            }
-            
-            files_by_category[category].append(record)
-            print(f"   + Found {category}: {file_path.name} ({size_kb} {FILE_SIZE_UNIT})")
+    total_bytes = 0
+
+    # Paths relative to the dataset by string prefix: pathlib per file is a measurable cost
+    root_prefix = os.fspath(data_dir).rstrip(os.sep) + os.sep
+    def relative(path):
+        return path[len(root_prefix):] if path.startswith(root_prefix) else os.path.basename(path)
+
+    def prefetch_sample_ids(path, name, match, st):
+        # Async mode: reads a summary file's sample IDs on a walker thread, pipelined with the walk.
+        # Returns (sample IDs or the exception raised, seconds) for _build_record.
+        category = match[0]
+        if category != 'summarised' or isinstance(st, ContainerStat):
+            return None
+        file_path = Path(path)
+        if not has_sample_ids(file_path):
+            return None
+        if cache is not None and cache.is_fresh(relative(path), st, category):
+            return None
+        start = time.perf_counter()
+        try:
+            table_ids = read_summary_sample_ids(file_path, sample_id_columns)
+        except Exception as e:
+            table_ids = e
+        return table_ids, time.perf_counter() - start
+
+    if scan_mode == "async":
+        # asyncio is only loaded for this mode
+        from .async_scanner import walk_dataset_async
+        walk = walk_dataset_async(data_dir, classifier.match, concurrency, prefetch_sample_ids, classify_container, shallow_containers, path_filter)
+    else:
+        walk = ((entry, match, None) for entry, match in walk_dataset(data_dir, classifier.match, workers, pool, classify_container, shallow_containers, path_filter))
+
+    def scanned_records():
+        # Yields (path, size_bytes, record, (rel_path, st, category, changed)) in walk order.
+        # changed: the record is not in the scan cache as it is (new or changed file, or new checksums).
+        for entry, (category, sample_id), prefetched in metrics.timed_iter("walk", walk):
+            path = entry.path
+            rel_path = relative(path)
+
+            # Stat result taken by the walker (a ContainerStat for containers)
+            st = entry.stat()
+            metrics.count("files")
+            size_bytes = st.st_size
+            if isinstance(st, ContainerStat):
+                metrics.count("containers")
+                if st.file_count is None:
+                    # Shallow container: its contents were not measured
+                    size_bytes = None
+            metrics.count("bytes_stat", st.st_size)
+
+            record = cache.lookup(rel_path, st, category) if cache is not None else None
+            changed = record is None
+            if record is None:
+                record = _build_record(path, rel_path, category, sample_id, size_bytes, sample_to_patient, organization, sample_id_columns, metrics,
+                                       metadata_dict if attach_metadata else None, resolver, prefetched, size_unit, st if isinstance(st, ContainerStat) else None)
+            else:
+                # The cached record may have been rendered in another unit
+                if size_bytes is not None:
+                    record["file_size"] = convert_size(record["file_size_bytes"], size_unit)
+                if checksums is None:
+                    # Cached from a run with checksums enabled
+                    for algorithm in CHECKSUM_ALGORITHMS:
+                        record.pop(algorithm, None)
+                elif "file_count" not in record:
+                    # The checksum pipeline will add the missing ones
+                    changed = any(algorithm not in record for algorithm in checksums.algorithms)
+            yield path, size_bytes, record, (rel_path, st, category, changed)
+
+    records = scanned_records()
+    if checksums is not None:
+        records = checksums.annotate(records)
 
-    print(f" | Total size: {total_size} {FILE_SIZE_UNIT}")
+    for path, size_bytes, record, (rel_path, st, category, changed) in records:
+        if cache is not None and changed:
+            cache.store(rel_path, st, category, record)
+
+        resolver.tally(record.get("unmapped_sample_ids"))
+
+        if size_bytes is not None:
+            total_bytes += size_bytes
+
+        if crate:
+            # A shallow container has no known size to record
+            properties = {"fileSize": f"{record['file_size']}{size_unit}", "contentSize": size_bytes} if size_bytes is not None else {}
+            properties["patient_id"] = record["patient_id"]
+            properties["sample_id"] = record["sample_id"]
+            for algorithm in CHECKSUM_ALGORITHMS:
+                if algorithm in record:
+                    properties[algorithm] = record[algorithm]
+            with metrics.stage("crate_build"):
+                if "file_count" in record:
+                    # A container directory is a Dataset entity
+                    crate.add_dataset(Path(path), properties=properties)
+                else:
+                    crate.add_file(Path(path), properties=properties)
+            metrics.count("crate_entities")
+
+        if writer is not None:
+            with metrics.stage("manifest_write"):
+                writer.add(category, record)
+        else:
+            files_by_category.add(category, record)
+        if log_files:
+            logger.debug(f"   + Found {category}: {record['file_name']} ({format_size(size_bytes) if size_bytes is not None else 'size not measured'})")
+
+    if path_filter is not None:
+        print(f" | Excluded by config.json patterns: {path_filter.excluded_dirs} directories (not listed), {path_filter.excluded_files} files")
+        metrics.count("excluded_dirs", path_filter.excluded_dirs)
+        metrics.count("excluded_files", path_filter.excluded_files)
+
+    if checksums is not None:
+        checksums.report()
+        metrics.count("bytes_hashed", checksums.bytes_hashed)
+    if cache is not None:
+        cache.save()
+        metrics.count("cache_hits", cache.hits)
+        metrics.count("cache_misses", cache.misses)
+
+    resolver.report()
+    metrics.count("unmapped_samples", len(resolver.unmapped))
+    metrics.count("files_with_unmapped_samples", resolver.files_with_unmapped)
+
+    print(f" | Total size: {convert_size(total_bytes, size_unit)} {size_unit} ({format_size(total_bytes)}, {total_bytes:,} bytes)")
     return files_by_category
+
+def _build_record(file_path, rel_path, category: str, sample_id: str, size_bytes: int, sample_to_patient: dict, organization: str, sample_id_columns: dict = None, metrics=None, patient_metadata=None, resolver=None, prefetched=None, size_unit=FILE_SIZE_UNIT, container=None) -> dict:
+    # Builds the output record for one file: size, sample/patient IDs and location.
+    # file_path is a path string (or Path); pathlib is only used for summarised files.
+    # For a container directory, `container` is its ContainerStat and the record gets its file_count.
+    # size_bytes is None for a shallow container (not measured); its sizes are written as null.
+    file_name = os.path.basename(file_path)
+
+    # Look up patient ID (sample_id is the file name without its matched extension)
+    patient_id = sample_to_patient.get(sample_id, "")
+    
+    sample_ids_list = [sample_id]
+    patient_ids_list = [patient_id] if patient_id else []
+    unmapped_sample_ids = []
+    
+    # Special handling for summarised files (lookup internal CSV IDs / VCF sample columns)
+    # (prefetched: the (IDs or exception, seconds) already read by the async walker)
+    summary_path = Path(file_path) if category == 'summarised' and container is None else None
+    if summary_path is not None and has_sample_ids(summary_path):
+        parse_start = time.perf_counter()
+        parse_seconds = None
+        try:
+            if prefetched is not None:
+                table_ids, parse_seconds = prefetched
+                if isinstance(table_ids, Exception):
+                    raise table_ids
+            else:
+                table_ids = read_summary_sample_ids(summary_path, sample_id_columns)
+            if table_ids:
+                sample_ids_list = table_ids
+                # Map all samples to patients in one batched lookup
+                if resolver is None:
+                    resolver = PatientResolver(sample_to_patient)
+                patient_ids_list, unmapped_sample_ids = resolver.resolve(sample_ids_list)
+        except Exception as e:
+            logger.warning(f"   ! Could not read summary file {file_name}: {e}")
+        if metrics is not None:
+            metrics.add_time("summary_parse", parse_seconds if parse_seconds is not None else time.perf_counter() - parse_start)
+            metrics.count("summary_files_parsed")
+
+    # Format for output
+    final_sample_id = sample_ids_list if len(sample_ids_list) > 1 else sample_ids_list[0]
+    final_patient_id = patient_ids_list if len(patient_ids_list) > 1 else (patient_ids_list[0] if patient_ids_list else "")
+    
+    record = {
+        "file_name": file_name,
+        "file_size": convert_size(size_bytes, size_unit) if size_bytes is not None else None,
+        "file_size_bytes": size_bytes,
+        "directory": f"./{rel_path}",
+        "organization": organization,
+        "sample_id": final_sample_id,
+        "patient_id": final_patient_id
+    }
+
+    if container is not None:
+        record["file_count"] = container.file_count
+
+    # Data quality: table samples without a patient in the mapping
+    if unmapped_sample_ids:
+        record["unmapped_sample_ids"] = unmapped_sample_ids
+
+    # Clinical fields per patient, fetched on demand from the metadata index
+    if patient_metadata is not None:
+        record["patient_metadata"] = {}
+        for pid in patient_ids_list:
+            fields = patient_metadata.get(pid)
+            if fields:
+                record["patient_metadata"][pid] = fields
+
+    return record
@@ -0,0 +1,131 @@
+import glob
+import json
+import os
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+from .params import BATCH_INDEX_FILE_NAME, CHECKSUM_WORKERS, FILE_SIZE_UNIT, METADATA, OUTPUT_FILE_NAMES, OUTPUT_HTML_FILE_NAME, SCAN_WORKERS
+from .generate_html import generate_html
+from .metadata_store import MetadataStore
+from .metrics import Metrics
+from .units import convert_size, format_size
+
+def expand_datasets(patterns):
+    # Resolves dataset roots given as paths or glob patterns (e.g. 'cohorts/*') to a list of
+    # unique directories, in argument order; matches of one pattern are sorted by name.
+    datasets = []
+    for pattern in patterns:
+        if glob.has_magic(pattern):
+            matches = sorted(glob.glob(os.path.expanduser(pattern)))
+            if not matches:
+                print(f"Warning: No dataset matches '{pattern}'")
+        else:
+            matches = [pattern]
+        for match in matches:
+            path = Path(match).resolve()
+            if glob.has_magic(pattern) and not path.is_dir():
+                continue
+            if path not in datasets:
+                datasets.append(path)
+    return datasets
+
+def dataset_output_names(datasets):
+    # One output subdirectory name per dataset: its directory name, with a numeric suffix if
+    # several datasets share a name (e.g. site_a/cohort and site_b/cohort -> cohort, cohort_2).
+    names = []
+    used = set()
+    for dataset in datasets:
+        name = dataset.name or "dataset"
+        candidate = name
+        n = 2
+        while candidate in used:
+            candidate = f"{name}_{n}"
+            n += 1
+        used.add(candidate)
+        names.append(candidate)
+    return names
+
+def generate_batch(patterns, output_dir, output_format="json", workers=SCAN_WORKERS, checksum_workers=CHECKSUM_WORKERS, metrics=None, **options):
+    # Ingests many datasets in one process. Each dataset keeps its own config.json and
+    # patient_sample_mapping.json and gets its own output folder (<output_dir>/<name>/ with the
+    # manifest, HTML viewer, scan cache and RO-Crate). All datasets share one thread pool and one
+    # MetadataStore, so the metadata registry is indexed once and only each dataset's mapping file
+    # is resolved per dataset. A combined index of all runs is written to <output_dir>/batch_index.json. A dataset that fails is recorded in the index and the batch
+    # carries on with the next one.
+    # `options` are passed on to generate_json (no_rocrate, use_cache, checksum_algorithms, ...).
+    from .generator import generate_json
+
+    datasets = expand_datasets(patterns)
+    if not datasets:
+        print("\nERROR: No dataset directories to ingest.")
+        raise SystemExit(1)
+    if metrics is None:
+        metrics = Metrics()
+    output_dir = Path(output_dir).resolve()
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    entries = []
+    metadata_store = MetadataStore(METADATA)
+    pool_size = max(workers, checksum_workers if options.get("checksum_algorithms") else 1, 1)
+    print(f" | Batch: {len(datasets)} datasets, {pool_size} shared workers")
+    try:
+        with ThreadPoolExecutor(max_workers=pool_size) as pool:
+            for i, (dataset, name) in enumerate(zip(datasets, dataset_output_names(datasets)), 1):
+                print(f"\n[{i}/{len(datasets)}] {dataset}")
+                dataset_dir = output_dir / name
+                dataset_dir.mkdir(exist_ok=True)
+                output_file = dataset_dir / OUTPUT_FILE_NAMES[output_format]
+                entry = {"name": name, "dataset": str(dataset)}
+                try:
+                    result = generate_json(dataset, output_file, workers=workers, output_format=output_format, checksum_workers=checksum_workers,
+                                           metrics=metrics, pool=pool, metadata_store=metadata_store, **options)
+                    entry["output"] = str(output_file.relative_to(output_dir))
+                    entry["records"] = result["records"]
+                    entry["total_size"] = result["summary"]["total_size"]
+                    entry["total_size_bytes"] = result["summary"]["total_size_bytes"]
+                    entry["unique_patients"] = result["summary"]["unique_patients"]
+                    if result["index_file"]:
+                        entry["index"] = str(Path(result["index_file"]).relative_to(output_dir))
+                    if options.get("viewer", True):
+                        html_file = dataset_dir / OUTPUT_HTML_FILE_NAME
+                        generate_html(html_file)
+                        entry["html"] = str(html_file.relative_to(output_dir))
+                    entry["status"] = "ok"
+                except SystemExit:
+                    # Configuration errors have already been printed by config.py / generate_json
+                    entry["status"] = "failed"
+                    entry["error"] = "configuration or dataset error (see log)"
+                except Exception as e:
+                    print(f"Unexpected Error in {dataset}: {e}")
+                    traceback.print_exc()
+                    entry["status"] = "failed"
+                    entry["error"] = str(e)
+                entries.append(entry)
+    finally:
+        metadata_store.close()
+
+    size_unit = options.get("size_unit", FILE_SIZE_UNIT)
+    total_bytes = sum(e.get("total_size_bytes", 0) for e in entries)
+    index = {
+        "generated": datetime.now(timezone.utc).isoformat(),
+        "output_format": output_format,
+        "datasets": entries,
+        "totals": {
+            "datasets": len(entries),
+            "failed": sum(1 for e in entries if e["status"] != "ok"),
+            "records": sum(e.get("records", 0) for e in entries),
+            # Converted from the exact sum, not summed from the per-dataset rounded totals
+            "total_size": convert_size(total_bytes, size_unit),
+            "total_size_bytes": total_bytes,
+            "total_size_human": format_size(total_bytes),
+            "file_size_unit": size_unit
+        }
+    }
+    index_file = output_dir / BATCH_INDEX_FILE_NAME
+    with open(index_file, "w", encoding="utf-8") as f:
+        json.dump(index, f, indent=4)
+
+    totals = index["totals"]
+    print(f"\nBatch index written to: {index_file} ({totals['datasets']} datasets, {totals['failed']} failed, {totals['records']} records, {totals['total_size_human']})")
+    return index
@@ -0,0 +1,140 @@
+import hashlib
+import json
+from array import array
+from pathlib import Path
+from .params import FILE_SIZE_UNIT, SCAN_CACHE_SUFFIX
+from .records import RecordStore
+
+# Bump whenever the way records are built changes, so stale caches are discarded
+CACHE_VERSION = 5
+
+def cache_path_for(output_file):
+    # The scan-state cache lives next to the output manifest (output.json -> output.scan_cache.jsonl).
+    output_file = Path(output_file)
+    return output_file.with_name(output_file.stem + SCAN_CACHE_SUFFIX)
+
+def scan_fingerprint(data_dir, file_types, sample_to_patient, organization, scan_options=None):
+    # Hashes everything besides the file itself that a cached record depends on.
+    # If any of it changes, the whole cache is discarded.
+    h = hashlib.sha256()
+    h.update(str(data_dir).encode())
+    h.update(json.dumps(file_types, sort_keys=True).encode())
+    if isinstance(sample_to_patient, dict):
+        h.update(json.dumps(sample_to_patient, sort_keys=True).encode())
+    else:
+        # Indexed mapping (see metadata_store.py): fingerprint of its source files
+        h.update(sample_to_patient.fingerprint.encode())
+    h.update(str(organization).encode())
+    h.update(json.dumps(scan_options or {}, sort_keys=True).encode())
+    return h.hexdigest()
+
+class ScanCache:
+    # Persistent map of relative path -> (size, mtime, inode, category, record) from the previous scan,
+    # stored one file per line as [rel_path, size, mtime_ns, inode, category, record] after a header line.
+    # A line is only decoded when its file is looked up. Freshness is a prefix comparison of the encoded
+    # stat fields, so only the record of an unchanged file is parsed.
+    # Unchanged files are not stored again: their lines are written back as they were read. New or
+    # changed records are kept compactly in a RecordStore (see records.py) until save(). Entries not
+    # seen again during the current scan are dropped on save, so deleted files disappear. Without new,
+    # changed or deleted files the cache file is left as it is.
+
+    def __init__(self, path, fingerprint, size_unit=FILE_SIZE_UNIT):
+        self.path = Path(path)
+        self.fingerprint = fingerprint
+        self.entries = {}
+        self._kept = {}
+        self.records = RecordStore(size_unit=size_unit)
+        self._categories = []
+        self._rows = array("I")
+        self._stats = array("q")
+        self._inodes = array("Q")
+        self._paths = {}
+        self._decoder = json.JSONDecoder()
+        self._current = False
+        self.hits = 0
+        self.misses = 0
+        self._load()
+
+    def _header(self):
+        return json.dumps({"version": CACHE_VERSION, "fingerprint": self.fingerprint}, separators=(",", ":")) + "\n"
+
+    def _load(self):
+        if not self.path.exists():
+            return
+        decode = self._decoder.raw_decode
+        entries = {}
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                if f.readline() != self._header():
+                    print(" | Scan cache is out of date (config, mapping or dataset changed); rescanning everything.")
+                    return
+                for line in f:
+                    if not line.endswith("\n"):
+                        line += "\n"
+                    # Only the path is decoded here: '["<rel_path>",...'
+                    entries[decode(line, 1)[0]] = line
+        except (OSError, ValueError) as e:
+            print(f"   ! Ignoring unreadable scan cache {self.path}: {e}")
+            return
+        self.entries = entries
+        self._current = True
+
+    @staticmethod
+    def _prefix(rel_path, st, category):
+        # The encoded start of the line of an unchanged file, up to its record
+        return json.dumps([rel_path, st.st_size, st.st_mtime_ns, st.st_ino, category], separators=(",", ":"))[:-1] + ","
+
+    def is_fresh(self, rel_path, st, category):
+        # Whether the stored record of the file is still valid. Counts nothing, so the async
+        # walker's threads can call it while prefetching.
+        line = self.entries.get(rel_path)
+        return line is not None and line.startswith(self._prefix(rel_path, st, category))
+
+    def lookup(self, rel_path, st, category):
+        # Returns the stored record if the file is unchanged since the last scan, else None.
+        # The line of an unchanged file is kept for save() unless store() replaces it.
+        line = self.entries.get(rel_path)
+        if line is not None:
+            prefix = self._prefix(rel_path, st, category)
+            if line.startswith(prefix):
+                self.hits += 1
+                self._kept[rel_path] = self.entries.pop(rel_path)
+                return self._decoder.raw_decode(line, len(prefix))[0]
+        self.misses += 1
+        return None
+
+    def store(self, rel_path, st, category, record):
+        # Called for new or changed files (and reused records that gained checksums).
+        self.entries.pop(rel_path, None)
+        self._kept.pop(rel_path, None)
+        # The path is only kept if it is not the record's directory without "./"
+        if record.get("directory") != f"./{rel_path}":
+            self._paths[len(self._rows)] = rel_path
+        self._categories.append(category)
+        self._rows.append(self.records.add(category, record))
+        self._stats.extend((st.st_size, st.st_mtime_ns))
+        self._inodes.append(st.st_ino)
+
+    def _stored_lines(self):
+        # Lines of the records stored during this scan, in scan order.
+        for i, (category, row) in enumerate(zip(self._categories, self._rows)):
+            record = self.records[category][row]
+            rel_path = self._paths.get(i) or record["directory"][2:]
+            entry = [rel_path, self._stats[2 * i], self._stats[2 * i + 1], self._inodes[i], category, record]
+            yield json.dumps(entry, separators=(",", ":")) + "\n"
+
+    def save(self):
+        # Loaded entries the scan did not see again belong to deleted files
+        removed = len(self.entries)
+        stored = len(self._rows)
+        if self._current and not stored and not removed:
+            print(f" | Scan cache: {self.hits} reused, nothing new, changed or removed ({self.path})")
+            return
+        tmp_path = self.path.with_name(self.path.name + ".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(self._header())
+            # Unchanged lines are copied back without decoding; json.dumps uses the C encoder
+            f.writelines(self._kept.values())
+            f.writelines(self._stored_lines())
+        tmp_path.replace(self.path)
+        print(f" | Scan cache: {self.hits} reused, {stored} new/changed, {removed} removed ({self.path})")
@@ -0,0 +1,97 @@
+import hashlib
+import logging
+import os
+import time
+import zlib
+from collections import deque
+from contextlib import nullcontext
+from concurrent.futures import ThreadPoolExecutor
+from .params import CHECKSUM_CHUNK_SIZE, CHECKSUM_WORKERS
+
+logger = logging.getLogger(__name__)
+
+# sha256/md5 for repositories, crc32 as a fast non-cryptographic option (stdlib zlib)
+CHECKSUM_ALGORITHMS = ["sha256", "md5", "crc32"]
+
+class _CRC32:
+    # hashlib-style wrapper around zlib.crc32.
+    def __init__(self):
+        self.value = 0
+
+    def update(self, data):
+        self.value = zlib.crc32(data, self.value)
+
+    def hexdigest(self):
+        return f"{self.value:08x}"
+
+def _new_hasher(algorithm):
+    return _CRC32() if algorithm == "crc32" else hashlib.new(algorithm)
+
+def compute_checksums(file_path, algorithms, chunk_size=CHECKSUM_CHUNK_SIZE) -> dict:
+    # Reads the file once in large chunks into a reused buffer and feeds every requested hasher.
+    # hashlib and zlib release the GIL on large buffers, so several files hash in parallel on threads.
+    hashers = {algorithm: _new_hasher(algorithm) for algorithm in algorithms}
+    buffer = bytearray(chunk_size)
+    view = memoryview(buffer)
+    with open(file_path, "rb", buffering=0) as f:
+        while True:
+            n = f.readinto(buffer)
+            if not n:
+                break
+            for hasher in hashers.values():
+                hasher.update(view[:n])
+    return {algorithm: hasher.hexdigest() for algorithm, hasher in hashers.items()}
+
+class ChecksumPipeline:
+    # Adds checksums to scanned records using a thread pool, yielding records in their original order.
+    # Records that already carry the requested checksums (e.g. reused from the scan cache because
+    # size and mtime are unchanged) are passed through without reading the file again.
+
+    def __init__(self, algorithms, workers=CHECKSUM_WORKERS, pool=None):
+        self.algorithms = list(dict.fromkeys(algorithms))
+        self.workers = max(1, workers)
+        self.pool = pool  # shared executor (batch mode); a private one is created per scan otherwise
+        self.files_hashed = 0
+        self.bytes_hashed = 0
+        self.reused = 0
+        self.seconds = 0.0
+
+    def annotate(self, items):
+        # items: iterable of (file_path, size_bytes, record, payload); yields the same tuples with
+        # checksums set on each record. At most 4 x workers files are in flight at once.
+        window = self.workers * 4
+        pending = deque()
+        start = time.perf_counter()
+        with (nullcontext(self.pool) if self.pool is not None else ThreadPoolExecutor(max_workers=self.workers)) as pool:
+            for file_path, size_bytes, record, payload in items:
+                # Drop checksums of algorithms that are no longer requested
+                for algorithm in CHECKSUM_ALGORITHMS:
+                    if algorithm not in self.algorithms:
+                        record.pop(algorithm, None)
+                # Container directories (records with a file_count) have no content checksum
+                missing = [a for a in self.algorithms if a not in record] if "file_count" not in record else []
+                future = pool.submit(compute_checksums, file_path, missing) if missing else None
+                pending.append((future, file_path, size_bytes, record, payload))
+                while len(pending) > window:
+                    yield self._finish(*pending.popleft())
+            while pending:
+                yield self._finish(*pending.popleft())
+        self.seconds += time.perf_counter() - start
+
+    def _finish(self, future, file_path, size_bytes, record, payload):
+        if future is None:
+            if "file_count" not in record:
+                self.reused += 1
+        else:
+            try:
+                record.update(future.result())
+                self.files_hashed += 1
+                self.bytes_hashed += size_bytes
+            except OSError as e:
+                logger.warning(f"   ! Could not checksum {os.path.basename(file_path)}: {e}")
+        return file_path, size_bytes, record, payload
+
+    def report(self):
+        mb = self.bytes_hashed / (1024 * 1024)
+        rate = mb / self.seconds if self.seconds > 0 else 0.0
+        print(f" | Checksums ({', '.join(self.algorithms)}): {self.files_hashed} files, {mb:.1f} MB hashed in {self.seconds:.2f}s ({rate:.1f} MB/s), {self.reused} reused from cache")
@@ -0,0 +1,52 @@
+# Key of the terminal marker in a trie node; never collides with a one-character edge
+_END = ""
+
+class ExtensionClassifier:
+    # Precompiled file-extension matcher built once from the normalized config.
+    # Extensions are stored in a trie keyed on their reversed, lowercased characters, so matching a
+    # file name walks back from its last character and stops at the first character that no
+    # extension shares. The cost depends on the suffix length, not on how many extensions are
+    # configured, and the longest match wins (.fastq.gz before .gz) as in a sorted linear search.
+    # If the same extension is listed under several categories, the last one listed wins.
+
+    def __init__(self, file_types: dict):
+        self.categories = list(file_types)
+        self._root = {}
+        for category, extensions in file_types.items():
+            for ext in extensions:
+                node = self._root
+                for ch in reversed(ext.lower()):
+                    node = node.setdefault(ch, {})
+                node[_END] = (category, len(ext))
+
+    def match(self, file_name: str):
+        # Returns (category, sample_id) for the longest matching extension, or None.
+        # sample_id is the file name with that extension stripped.
+        node = self._root
+        best = None
+        for ch in reversed(file_name.lower()):
+            node = node.get(ch)
+            if node is None:
+                break
+            end = node.get(_END)
+            if end is not None:
+                best = end
+        if best is None:
+            return None
+        category, length = best
+        return category, file_name[:-length]
+
+    def classify(self, file_name: str):
+        # Returns only the category, or None if no configured extension matches.
+        result = self.match(file_name)
+        return result[0] if result else None
+
+def container_matcher(classifier, container_extensions):
+    # Returns a function that gives the (category, sample_id) match of a container directory name
+    # (see containers.py), or None for ordinary directories; None if no container extension is set.
+    # The container extension decides whether a directory is one; the category and sample ID come
+    # from the regular classifier, like for a file.
+    if not container_extensions:
+        return None
+    containers = ExtensionClassifier({"container": container_extensions})
+    return lambda name: classifier.match(name) if containers.match(name) else None
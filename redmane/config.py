@@ -2,6 +2,9 @@ import json
 import sys
 # Config module: Implements 'Fail Loudly' policy for missing configurations.
 from pathlib import Path
+from .params import FILE_SIZE_UNIT, SCAN_CONCURRENCY, SCAN_WORKERS
+from .classifier import ExtensionClassifier
+from .patterns import translate_pattern
 
 REQUIRED_KEYS = [
     "raw_file_extensions",
@@ -109,3 +112,95 @@ def normalize_and_validate_config(config_dict):
         final_config[internal_key] = normalized[conf_key]
 
     return final_config
+
+def compile_classifier(file_types):
+    # Builds the reusable extension classifier for a normalized config (see classifier.py).
+    return ExtensionClassifier(file_types)
+
+class ScanOptions:
+    # How a dataset is scanned, passed to auxiliary.scan_dataset as one object: the optional
+    # settings of config.json (validated by normalize_scan_options) and the scan switches of the
+    # command line. New scan settings are added here, not as another scan_dataset argument.
+    # Walk strategy:
+    #   workers (threads listing directories), scan_mode ("threads" or "async"), concurrency (async only)
+    # Records:
+    #   sample_id_columns, container_extensions, shallow_containers, exclude, include, attach_metadata,
+    #   size_unit (only how sizes are rendered)
+
+    def __init__(self, sample_id_columns=None, container_extensions=None, exclude=None, include=None, workers=SCAN_WORKERS, scan_mode="threads",
+                 concurrency=SCAN_CONCURRENCY, size_unit=FILE_SIZE_UNIT, shallow_containers=False, attach_metadata=False):
+        self.sample_id_columns = sample_id_columns or {}
+        self.container_extensions = container_extensions or []
+        self.exclude = exclude or []
+        self.include = include or []
+        self.workers = workers
+        self.scan_mode = scan_mode
+        self.concurrency = concurrency
+        self.size_unit = size_unit
+        self.shallow_containers = shallow_containers
+        self.attach_metadata = attach_metadata
+
+    def record_settings(self):
+        # The settings a scanned record depends on (part of the scan cache fingerprint). The walk
+        # strategy and size_unit are left out: they do not change what is stored.
+        return {
+            "sample_id_columns": self.sample_id_columns,
+            "container_extensions": self.container_extensions,
+            "exclude": self.exclude,
+            "include": self.include,
+            "attach_metadata": self.attach_metadata,
+            "shallow_containers": self.shallow_containers
+        }
+
+def normalize_scan_options(config_dict, **settings):
+    # Validates the optional (non-extension) settings and returns them with defaults applied, as
+    # a ScanOptions that also carries the given command-line `settings` (workers, scan_mode, ...).
+    options = {}
+
+    # "sample_id_columns": {".maf": "Tumor_Sample_Barcode", ".csv": 0}
+    # Which column of a summarised table holds the sample IDs (header name or 0-based index).
+    sample_id_columns = config_dict.get("sample_id_columns", {})
+    if not isinstance(sample_id_columns, dict):
+        print_error_and_exit("Value for 'sample_id_columns' must be an OBJECT mapping extensions to column names or indexes.")
+    for ext, column in sample_id_columns.items():
+        if not ext.startswith("."):
+            print_error_and_exit(f"Invalid extension in 'sample_id_columns': '{ext}' (Must start with a dot, e.g., '.maf')")
+        valid_index = isinstance(column, int) and not isinstance(column, bool) and column >= 0
+        if not (valid_index or (isinstance(column, str) and column)):
+            print_error_and_exit(f"Invalid column for '{ext}' in 'sample_id_columns': {column!r} (Must be a header name or a non-negative index)")
+    options["sample_id_columns"] = {ext.lower(): column for ext, column in sample_id_columns.items()}
+
+    # "container_extensions": [".zarr", ".tiledb"]
+    # Directories with these extensions (Zarr/OME-Zarr stores, TileDB arrays, Parquet datasets) are
+    # one record each, with the total size and count of the files inside. Each extension must also
+    # be listed under a category, which the container is filed under.
+    container_extensions = config_dict.get("container_extensions", [])
+    if not isinstance(container_extensions, list):
+        print_error_and_exit("Value for 'container_extensions' must be a LIST of strings.")
+    listed = {ext.lower() for key in REQUIRED_KEYS + list(ALIASES) for ext in config_dict.get(key, []) if isinstance(ext, str)}
+    for ext in container_extensions:
+        if not isinstance(ext, str) or not ext.startswith("."):
+            print_error_and_exit(f"Invalid extension in 'container_extensions': {ext!r} (Must be a string starting with a dot, e.g., '.zarr')")
+        if ext.lower() not in listed:
+            print_error_and_exit(f"Container extension '{ext}' is not listed in any of {', '.join(REQUIRED_KEYS)}.")
+    options["container_extensions"] = [ext.lower() for ext in container_extensions]
+
+    # "exclude": ["work/", ".snakemake/", "tmp*/", "*.log"], "include": ["Raw/", "Processed/"]
+    # gitignore-style patterns relative to the dataset root (see patterns.py). Excluded directories
+    # are never listed; with include, only files matching one of its patterns are scanned.
+    for key in ("exclude", "include"):
+        patterns = config_dict.get(key, [])
+        if not isinstance(patterns, list):
+            print_error_and_exit(f"Value for '{key}' must be a LIST of gitignore-style patterns.")
+        for pattern in patterns:
+            if not isinstance(pattern, str) or not pattern.strip("!/"):
+                print_error_and_exit(f"Invalid pattern in '{key}': {pattern!r} (Must be a non-empty string, e.g., 'work/' or '*.log')")
+            if key == "include" and pattern.startswith("!"):
+                print_error_and_exit(f"Invalid pattern in 'include': '{pattern}' (Negation is only supported in 'exclude')")
+            try:
+                translate_pattern(pattern)
+            except ValueError as e:
+                print_error_and_exit(f"Invalid pattern in '{key}': '{pattern}' ({e})")
+        options[key] = patterns
+
+    return ScanOptions(**options, **settings)
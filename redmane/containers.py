@@ -0,0 +1,53 @@
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+class ContainerStat:
+    # stat-like result for a container directory (.zarr store, TileDB array, Parquet dataset):
+    # the total size of its files, the newest mtime among the directory, its subdirectories and
+    # files (so adding, removing or rewriting a chunk invalidates the scan cache) and the
+    # directory's inode. file_count is None when the contents were not measured.
+    __slots__ = ("st_size", "st_mtime_ns", "st_ino", "file_count")
+
+    def __init__(self, st_size, st_mtime_ns, st_ino, file_count):
+        self.st_size = st_size
+        self.st_mtime_ns = st_mtime_ns
+        self.st_ino = st_ino
+        self.file_count = file_count
+
+    @property
+    def st_mtime(self):
+        return self.st_mtime_ns / 1e9
+
+def measure_container(path, shallow=False):
+    # Sums the sizes of every file under a container directory, hidden ones included (.zarray,
+    # .zattrs), in one serial os.scandir walk. Symlinks are neither followed nor counted.
+    # With shallow, only the directory itself is stat'd: file_count is None, and st_size is 0 only
+    # to keep the stat-like interface (records of shallow containers have a null size).
+    st = os.stat(path, follow_symlinks=False)
+    if shallow:
+        return ContainerStat(0, st.st_mtime_ns, st.st_ino, None)
+    size = 0
+    count = 0
+    mtime_ns = st.st_mtime_ns
+    stack = [path]
+    while stack:
+        current = stack.pop()
+        try:
+            with os.scandir(current) as it:
+                for entry in it:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            stack.append(entry.path)
+                            mtime_ns = max(mtime_ns, entry.stat(follow_symlinks=False).st_mtime_ns)
+                        elif entry.is_file(follow_symlinks=False):
+                            entry_st = entry.stat(follow_symlinks=False)
+                            size += entry_st.st_size
+                            count += 1
+                            mtime_ns = max(mtime_ns, entry_st.st_mtime_ns)
+                    except OSError:
+                        continue
+        except OSError as e:
+            logger.warning(f"   ! Could not list directory {current}: {e}")
+    return ContainerStat(size, mtime_ns, st.st_ino, count)
@@ -0,0 +1,79 @@
+import json
+import tempfile
+from datetime import datetime, timezone
+from pathlib import Path
+
+ROCRATE_CONTEXT = "https://w3id.org/ro/crate/1.1/context"
+ROCRATE_PROFILE = "https://w3id.org/ro/crate/1.1"
+METADATA_FILE_NAME = "ro-crate-metadata.json"
+
+class MetadataOnlyCrate:
+    # RO-Crate that references data files in place instead of copying them.
+    # File entities are written straight into the JSON-LD graph with a file:// URI as their @id,
+    # so write() produces only ro-crate-metadata.json, whatever the size of the payload.
+    # Exposes the same add_file()/add_dataset()/write() calls as rocrate.rocrate.ROCrate used by scan_dataset.
+
+    def __init__(self, name, description):
+        self.name = name
+        self.description = description
+        self.count = 0
+        # Entities and their @ids are spooled to disk as they are added to keep memory flat
+        self._entities = tempfile.TemporaryFile(mode="w+", encoding="utf-8")
+        self._part_ids = tempfile.TemporaryFile(mode="w+", encoding="utf-8")
+
+    def add_file(self, file_path, properties=None):
+        self._add_entity(file_path, "File", properties)
+
+    def add_dataset(self, dir_path, properties=None):
+        # A directory added as a whole (e.g. a .zarr container), not file by file.
+        self._add_entity(dir_path, "Dataset", properties)
+
+    def _add_entity(self, file_path, entity_type, properties):
+        file_id = Path(file_path).resolve().as_uri()
+        if entity_type == "Dataset":
+            # RO-Crate: the @id of a directory ends with "/"
+            file_id += "/"
+        entity = {"@id": file_id, "@type": entity_type, "name": Path(file_path).name}
+        entity.update(properties or {})
+        self._entities.write(json.dumps(entity) + "\n")
+        self._part_ids.write(json.dumps({"@id": file_id}) + "\n")
+        self.count += 1
+
+    def _write_spool(self, out, spool, separator):
+        spool.seek(0)
+        first = True
+        for line in spool:
+            if not first:
+                out.write(separator)
+            out.write(line.rstrip("\n"))
+            first = False
+
+    def write(self, folder):
+        folder = Path(folder)
+        folder.mkdir(parents=True, exist_ok=True)
+        descriptor = {
+            "@id": METADATA_FILE_NAME,
+            "@type": "CreativeWork",
+            "conformsTo": {"@id": ROCRATE_PROFILE},
+            "about": {"@id": "./"}
+        }
+        root_header = {
+            "@id": "./",
+            "@type": "Dataset",
+            "name": self.name,
+            "description": self.description,
+            "datePublished": datetime.now(timezone.utc).isoformat()
+        }
+        with open(folder / METADATA_FILE_NAME, "w", encoding="utf-8") as out:
+            out.write('{"@context": ' + json.dumps(ROCRATE_CONTEXT) + ', "@graph": [\n')
+            out.write(json.dumps(descriptor) + ",\n")
+            # Root dataset with hasPart appended without materializing the list
+            out.write(json.dumps(root_header)[:-1] + ', "hasPart": [')
+            self._write_spool(out, self._part_ids, ", ")
+            out.write("]}")
+            if self.count:
+                out.write(",\n")
+                self._write_spool(out, self._entities, ",\n")
+            out.write("\n]}\n")
+        self._entities.close()
+        self._part_ids.close()
@@ -0,0 +1,158 @@
+import argparse
+import json
+import math
+import os
+import sys
+import tempfile
+import zlib
+from .params import DIFF_MAX_PARTITIONS, DIFF_PARTITION_BYTES
+from .readers import ManifestReader
+from .records import as_list
+from .checksums import CHECKSUM_ALGORITHMS
+from .units import convert_size, record_size_bytes
+
+def changed_fields(old, new):
+    # {field: [old value, new value]} for what differs between two versions of a file: category,
+    # size, sample/patient IDs, container file count, and checksums present in both.
+    # `old` and `new` are (category, record, size unit) triples.
+    (old_category, old_record, old_unit), (new_category, new_record, new_unit) = old, new
+    changes = {}
+    if old_category != new_category:
+        changes["category"] = [old_category, new_category]
+    old_size, new_size = record_size_bytes(old_record, old_unit), record_size_bytes(new_record, new_unit)
+    if old_size is None or new_size is None:
+        # A shallow container (unknown size) on either side
+        differs = old_size != new_size
+    elif "file_size_bytes" not in old_record or "file_size_bytes" not in new_record:
+        # A manifest from before exact sizes: compare at the precision it was written with
+        unit = old_unit if "file_size_bytes" not in old_record else new_unit
+        differs = convert_size(old_size, unit) != convert_size(new_size, unit)
+    else:
+        differs = old_size != new_size
+    if differs:
+        changes["file_size_bytes"] = [old_size, new_size]
+    for field in ("sample_id", "patient_id"):
+        # Compared as sets: the order of a table's IDs is not part of the mapping
+        old_ids, new_ids = as_list(old_record.get(field)), as_list(new_record.get(field))
+        if set(old_ids) != set(new_ids):
+            changes[field] = [old_ids, new_ids]
+    if old_record.get("file_count") != new_record.get("file_count"):
+        changes["file_count"] = [old_record.get("file_count"), new_record.get("file_count")]
+    for algorithm in CHECKSUM_ALGORITHMS:
+        if algorithm in old_record and algorithm in new_record and old_record[algorithm] != new_record[algorithm]:
+            changes[algorithm] = [old_record[algorithm], new_record[algorithm]]
+    return changes
+
+class ManifestDiff:
+    # Matches the records of two manifests by their `directory` (path relative to the dataset) and
+    # writes one JSON line per difference:
+    #   {"change": "added",   "directory": ..., "category": ..., "record": {new record}}
+    #   {"change": "removed", "directory": ..., "category": ..., "record": {old record}}
+    #   {"change": "changed", "directory": ..., "category": ..., "fields": {field: [old, new]}, "record": {new record}}
+    # Memory is bounded by a hash partitioning of both manifests: records are spilled to
+    # `partitions` temporary files by a hash of their directory, then each partition of the old
+    # manifest is indexed in memory and the same partition of the new one streamed against it.
+    # With one partition nothing is spilled and changes come out in the new manifest's order,
+    # followed by the removed records; otherwise they are grouped by partition.
+
+    def __init__(self, old_path, new_path, partitions=None):
+        self.old = ManifestReader(old_path)
+        self.new = ManifestReader(new_path)
+        if partitions is None:
+            partitions = math.ceil(os.path.getsize(old_path) / DIFF_PARTITION_BYTES)
+        self.partitions = max(1, min(partitions, DIFF_MAX_PARTITIONS))
+        self.counts = {"added": 0, "removed": 0, "changed": 0, "unchanged": 0}
+
+    def _spill(self, reader, tmp_dir, name):
+        # Writes [category, record] lines to one file per partition; returns their paths.
+        paths = [os.path.join(tmp_dir, f"{name}.{i}.jsonl") for i in range(self.partitions)]
+        files = [open(path, "w", encoding="utf-8") for path in paths]
+        try:
+            for category, record in reader:
+                i = zlib.crc32(record["directory"].encode("utf-8")) % self.partitions
+                files[i].write(json.dumps([category, record], separators=(",", ":")) + "\n")
+        finally:
+            for f in files:
+                f.close()
+        return paths
+
+    @staticmethod
+    def _read_spill(path):
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                yield json.loads(line)
+
+    def _compare(self, old_records, new_records, out):
+        # One partition: index the old records, stream the new ones against the index.
+        index = {}
+        for category, record in old_records:
+            index[record["directory"]] = (category, record)
+        for category, record in new_records:
+            directory = record["directory"]
+            previous = index.pop(directory, None)
+            if previous is None:
+                self._emit(out, "added", directory, category, record)
+                continue
+            fields = changed_fields((previous[0], previous[1], self.old.size_unit), (category, record, self.new.size_unit))
+            if fields:
+                self._emit(out, "changed", directory, category, record, fields)
+            else:
+                self.counts["unchanged"] += 1
+        for directory, (category, record) in index.items():
+            self._emit(out, "removed", directory, category, record)
+
+    def _emit(self, out, change, directory, category, record, fields=None):
+        line = {"change": change, "directory": directory, "category": category}
+        if fields is not None:
+            line["fields"] = fields
+        line["record"] = record
+        out.write(json.dumps(line, separators=(",", ":")) + "\n")
+        self.counts[change] += 1
+
+    def write(self, out):
+        # Writes the changes to the text stream `out` and returns the counts per kind of change.
+        if self.partitions == 1:
+            self._compare(self.old, self.new, out)
+            return self.counts
+        with tempfile.TemporaryDirectory(prefix="redmane-diff-") as tmp_dir:
+            old_paths = self._spill(self.old, tmp_dir, "old")
+            new_paths = self._spill(self.new, tmp_dir, "new")
+            for old_path, new_path in zip(old_paths, new_paths):
+                self._compare(self._read_spill(old_path), self._read_spill(new_path), out)
+                os.remove(old_path)
+                os.remove(new_path)
+        return self.counts
+
+def main(argv=None):
+    # redmane-diff old/output.json new/output.json [-o changes.jsonl]
+    parser = argparse.ArgumentParser(prog="redmane-diff", description="Write the records added, removed or changed between two manifests (json, jsonl, parquet or arrow) as JSON lines.")
+    parser.add_argument("old", help="Previous manifest, e.g. the output.json last published.")
+    parser.add_argument("new", help="Current manifest.")
+    parser.add_argument("-o", "--output", help="File for the changes (default: standard output).")
+    parser.add_argument("--partitions", type=int, help="Hash partitions spilled to disk to bound memory (default: one per "
+                                                        f"{DIFF_PARTITION_BYTES // 1024 ** 2} MB of the old manifest).")
+    args = parser.parse_args(argv)
+
+    for path in (args.old, args.new):
+        if not os.path.isfile(path):
+            parser.error(f"manifest not found: {path}")
+    diff = ManifestDiff(args.old, args.new, args.partitions)
+    # Progress goes to stderr when the changes go to stdout
+    log = sys.stderr if args.output is None else sys.stdout
+    try:
+        if args.output is None:
+            counts = diff.write(sys.stdout)
+        else:
+            tmp_path = args.output + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as out:
+                counts = diff.write(out)
+            os.replace(tmp_path, args.output)
+    except (ValueError, KeyError) as e:
+        print(f"ERROR: could not read manifest: {e}", file=log)
+        sys.exit(1)
+    print(f" | Diff: {counts['added']} added, {counts['removed']} removed, {counts['changed']} changed, {counts['unchanged']} unchanged", file=log)
+    if args.output is not None:
+        print(f"Changes written to: {args.output}", file=log)
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,20 @@
 import json
+import re
+import shutil
+from datetime import datetime, timezone
 from pathlib import Path
 from html import escape
-from .params import ORGANIZATION
+from .params import FILE_SIZE_UNIT, ORGANIZATION, OUTPUT_VIEWER_DIR_NAME, VIEWER_PAGE_SIZE
+from .readers import ManifestReader
+from .records import as_list
+from .summary import SummaryStats
+from .units import record_size_bytes
 
 # The template now includes Client-side JS to fetch and render data
-# We use __JSON_FILENAME__ as a placeholder to avoid conflicts with JS template literals ${...}
+# We use __VIEWER_DIR__ as a placeholder to avoid conflicts with JS template literals ${...}
+# The viewer never loads the whole manifest: it reads summary.json, then only the record pages
+# (pages/<category>_<n>.json) of the rows scrolled into view and the search shards (search/<c>.json)
+# of the typed query. Each category table is virtualized: only the visible rows exist in the DOM.
 DYNAMIC_VIEWER_TEMPLATE = """
 <!DOCTYPE html>
 <html lang="en">
@@ -18,23 +28,28 @@ DYNAMIC_VIEWER_TEMPLATE = """
         .container { max-width: 1200px; margin: 0 auto; background: #fff; padding: 30px; box-shadow: 0 4px 12px rgba(0,0,0,0.05); border-radius: 8px; }
         h1 { color: #2c3e50; font-weight: 300; margin-top: 0; border-bottom: 1px solid #eee; padding-bottom: 20px; }
         h2 { color: #34495e; font-weight: 500; font-size: 1.5em; margin-top: 30px; }
-        
+        h2 .count { color: #95a5a6; font-size: 0.6em; font-weight: 400; margin-left: 10px; }
+
         .summary-box { background: #fff; padding: 20px; border-radius: 8px; border: 1px solid #eef2f5; margin-bottom: 30px; }
         .summary-grid { display: grid; grid-template-columns: repeat(auto-fit, minmax(200px, 1fr)); gap: 20px; }
         .stat-item { background: #f8f9fa; padding: 20px; border-radius: 8px; text-align: center; border: 1px solid #e9ecef; }
         .stat-value { font-size: 28px; font-weight: 600; color: #3498db; margin-bottom: 5px; }
         .stat-label { color: #95a5a6; font-size: 13px; text-transform: uppercase; font-weight: 600; letter-spacing: 0.5px; }
-        
-        table { width: 100%; border-collapse: separate; border-spacing: 0; margin-top: 15px; border: 1px solid #eef2f5; border-radius: 6px; overflow: hidden; }
-        th, td { padding: 14px 18px; text-align: left; border-bottom: 1px solid #eef2f5; }
-        th { background-color: #f8f9fa; font-weight: 600; color: #7f8c8d; font-size: 14px; text-transform: uppercase; }
-        tr:last-child td { border-bottom: none; }
-        tr:hover { background-color: #fcfcfc; }
-        
+
+        .vtable { margin-top: 15px; border: 1px solid #eef2f5; border-radius: 6px; overflow: hidden; }
+        .vrow { display: grid; grid-template-columns: 2fr 0.7fr 1.2fr 1.6fr 2.5fr; height: 36px; border-bottom: 1px solid #eef2f5; box-sizing: border-box; }
+        .vrow > div { padding: 0 18px; line-height: 36px; white-space: nowrap; overflow: hidden; text-overflow: ellipsis; }
+        .vrow:hover { background-color: #fcfcfc; }
+        .vhead { background-color: #f8f9fa; font-weight: 600; color: #7f8c8d; font-size: 14px; text-transform: uppercase; }
+        .vhead:hover { background-color: #f8f9fa; }
+        .viewport { position: relative; overflow-y: auto; }
+        .rows { position: absolute; left: 0; right: 0; top: 0; }
+        .pending { color: #bdc3c7; }
+
         .upload-link { text-align: right; margin-bottom: 0; }
         .upload-btn { background: #27ae60; color: white; padding: 10px 24px; text-decoration: none; border-radius: 4px; font-weight: 600; font-size: 14px; transition: all 0.2s; box-shadow: 0 2px 4px rgba(39, 174, 96, 0.2); }
         .upload-btn:hover { background: #219150; box-shadow: 0 4px 8px rgba(39, 174, 96, 0.3); transform: translateY(-1px); }
-        
+
         #error-message { background: #fff5f5; color: #e74c3c; padding: 20px; border-radius: 6px; border: 1px solid #ffebea; display: none; margin-bottom: 20px; }
         .loading { text-align: center; padding: 60px; color: #95a5a6; font-style: italic; }
     </style>
@@ -42,13 +57,13 @@ DYNAMIC_VIEWER_TEMPLATE = """
 <body>
     <div class="container">
         <div id="error-message"></div>
-        
+
         <div style="display: flex; justify-content: space-between; align-items: center;">
             <h1>Files Summary</h1>
-            <!-- Placeholder for filtering/search -->
+            <!-- Searches file names, sample IDs and patient IDs (prefix match on every word typed) -->
             <div style="margin: 0 20px; flex-grow: 1; max-width: 400px;">
-                <input type="text" placeholder="Filter files (coming soon)..." disabled 
-                       style="width: 100%; padding: 8px; border: 1px solid #ddd; border-radius: 4px; background: #f9f9f9;">
+                <input id="search" type="search" placeholder="Filter files by name, sample or patient..." disabled
+                       style="width: 100%; padding: 8px; border: 1px solid #ddd; border-radius: 4px; background: #fff;">
             </div>
             <div class="upload-link">
                 <a href="https://data-registry.example.org/upload" class="upload-btn">Upload Metadata</a>
@@ -56,21 +71,67 @@ DYNAMIC_VIEWER_TEMPLATE = """
         </div>
 
         <div id="content">
-            <div class="loading">Loading metadata from <code>__JSON_FILENAME__</code>...</div>
+            <div class="loading">Loading metadata from <code>__VIEWER_DIR__/</code>...</div>
         </div>
     </div>
 
     <script>
-        const JSON_FILE = "__JSON_FILENAME__";
+        const DATA_DIR = "__VIEWER_DIR__";
+        const ROW_HEIGHT = 36;       // px, must match .vrow
+        const VISIBLE_ROWS = 15;     // height of each table viewport, in rows
+        const OVERSCAN = 10;         // rows rendered above/below the viewport
+        const MAX_CACHED_PAGES = 64; // record pages kept in memory (least recently used are dropped)
+
+        const pageCache = new Map();
+        const shardCache = new Map();
+        const tables = [];
+        let meta = null;
+
+        async function fetchJSON(path) {
+            // Revalidated on every request: the data may be regenerated under the same names
+            const response = await fetch(`${DATA_DIR}/${path}`, {cache: 'no-cache'});
+            if (!response.ok) {
+                throw new Error(`HTTP error! status: ${response.status} (${path})`);
+            }
+            return response.json();
+        }
+
+        function escapeHTML(value) {
+            return String(value).replace(/[&<>"']/g, c => ({'&': '&amp;', '<': '&lt;', '>': '&gt;', '"': '&quot;', "'": '&#39;'}[c]));
+        }
+
+        // Human-readable size of an exact byte count (same binary units as units.format_size)
+        const SIZE_UNITS = [['TB', 1024 ** 4], ['GB', 1024 ** 3], ['MB', 1024 ** 2], ['KB', 1024]];
+        function formatSize(bytes) {
+            if (bytes === null) return 'not measured';
+            for (const [unit, factor] of SIZE_UNITS) {
+                if (bytes >= factor) return `${(bytes / factor).toFixed(1)} ${unit}`;
+            }
+            return `${bytes} B`;
+        }
+
+        function getPage(cat, page) {
+            const key = `${cat}/${page}`;
+            let promise = pageCache.get(key);
+            if (promise) {
+                // Move to the end: most recently used
+                pageCache.delete(key);
+            } else {
+                promise = fetchJSON(`pages/${cat}_${String(page).padStart(5, '0')}.json`);
+                promise.catch(() => pageCache.delete(key));
+            }
+            pageCache.set(key, promise);
+            while (pageCache.size > MAX_CACHED_PAGES) {
+                pageCache.delete(pageCache.keys().next().value);
+            }
+            return promise;
+        }
 
         async function loadMetadata() {
             try {
-                const response = await fetch(JSON_FILE);
-                if (!response.ok) {
-                    throw new Error(`HTTP error! status: ${response.status}`);
-                }
-                const data = await response.json();
-                renderReport(data);
+                meta = await fetchJSON('summary.json');
+                renderReport();
+                if (meta.poll_seconds) setTimeout(pollForUpdates, meta.poll_seconds * 1000);
             } catch (e) {
                 showError(`Failed to load metadata: ${e.message}<br><br>
                 <strong>Note:</strong> If you are opening this file locally, modern browsers block reading Fetch API from file:// protocol.<br>
@@ -78,117 +139,193 @@ DYNAMIC_VIEWER_TEMPLATE = """
             }
         }
 
-        function renderReport(fullData) {
-            const data = fullData.data;
-            const files = data.files;
-            
-            // Calculate stats
-            let totalFiles = 0;
-            let totalSize = 0;
-            const patients = new Set();
-            const samples = new Set();
-            const sizesByCat = {};
-
-            for (const [cat, fileList] of Object.entries(files)) {
-                let catSize = 0;
-                totalFiles += fileList.length;
-                
-                for (const f of fileList) {
-                    catSize += f.file_size;
-                    
-                    // Patient IDs
-                    const pids = Array.isArray(f.patient_id) ? f.patient_id : [f.patient_id];
-                    pids.forEach(p => { if(p) patients.add(p); });
-                    
-                    // Sample IDs
-                    const sids = Array.isArray(f.sample_id) ? f.sample_id : [f.sample_id];
-                    sids.forEach(s => { if(s) samples.add(s); });
+        async function pollForUpdates() {
+            // Live reports (watch mode): the small version.json tells whether the data was regenerated
+            try {
+                const version = await fetchJSON('version.json');
+                if (version.generated !== meta.generated) {
+                    meta = await fetchJSON('summary.json');
+                    pageCache.clear();
+                    shardCache.clear();
+                    tables.length = 0;
+                    renderReport();
+                    const search = document.getElementById('search');
+                    if (search.value) applyFilter(search.value);
                 }
-                sizesByCat[cat] = catSize;
-                totalSize += catSize;
+            } catch (e) {
+                // The data folder is being swapped or the server is unreachable; try again later
             }
+            if (meta.poll_seconds) setTimeout(pollForUpdates, meta.poll_seconds * 1000);
+        }
+
+        function renderReport() {
+            // All statistics are precomputed by the generator; nothing is aggregated here
+            document.getElementById('content').innerHTML = `
+                <p><strong>Location:</strong> ${escapeHTML(meta.location)}</p>
 
-            const html = `
-                <p><strong>Location:</strong> ${data.location}</p>
-                
                 <div class="summary-box">
                     <h2>Summary Statistics</h2>
                     <div class="summary-grid">
                         <div class="stat-item">
-                            <div class="stat-value">${totalFiles}</div>
+                            <div class="stat-value">${meta.summary.total_files.toLocaleString()}</div>
                             <div class="stat-label">Total Files</div>
                         </div>
                         <div class="stat-item">
-                            <div class="stat-value">${patients.size}</div>
+                            <div class="stat-value">${meta.summary.unique_patients.toLocaleString()}</div>
                             <div class="stat-label">Total Patients</div>
                         </div>
                         <div class="stat-item">
-                            <div class="stat-value">${samples.size}</div>
+                            <div class="stat-value">${meta.summary.unique_samples.toLocaleString()}</div>
                             <div class="stat-label">Total Samples</div>
                         </div>
                          <div class="stat-item">
-                            <div class="stat-value">${totalSize.toLocaleString()} ${data.file_size_unit}</div>
+                            <div class="stat-value" title="${meta.summary.total_size_bytes.toLocaleString()} bytes">${formatSize(meta.summary.total_size_bytes)}</div>
                             <div class="stat-label">Total Size</div>
                         </div>
                     </div>
                 </div>
-
-                ${renderTables(files)}
+                <div id="tables"></div>
             `;
-            
-            document.getElementById('content').innerHTML = html;
+
+            const container = document.getElementById('tables');
+            for (const category of meta.categories) {
+                if (category.files === 0) continue;
+                tables.push(new VirtualTable(category, container));
+            }
+
+            const search = document.getElementById('search');
+            if (search.disabled) {
+                search.disabled = false;
+                let timer = null;
+                search.addEventListener('input', () => {
+                    clearTimeout(timer);
+                    timer = setTimeout(() => applyFilter(search.value), 200);
+                });
+            }
         }
 
-        function renderTables(filesMap) {
-            const categories = ['raw', 'processed', 'summarised'];
-            // add any others found
-            Object.keys(filesMap).forEach(k => {
-                if(!categories.includes(k)) categories.push(k);
-            });
-
-            let tablesHtml = '';
-            
-            for (const cat of categories) {
-                if (!filesMap[cat] || filesMap[cat].length === 0) continue;
-                
-                const rows = filesMap[cat].map(f => {
-                    // Truncate sample IDs for display
-                    let sDisplay = Array.isArray(f.sample_id) ? f.sample_id : [f.sample_id];
-                    if (sDisplay.length > 5) {
-                        sDisplay = sDisplay.slice(0, 5).join(', ') + `... (${sDisplay.length})`;
-                    } else {
-                        sDisplay = sDisplay.join(', ');
-                    }
-
-                    // Format patient IDs
-                    let pDisplay = Array.isArray(f.patient_id) ? f.patient_id.join(', ') : f.patient_id || '';
-
-                    return `<tr>
-                        <td>${f.file_name}</td>
-                        <td>${f.file_size}</td>
-                        <td>${pDisplay}</td>
-                        <td>${sDisplay}</td>
-                        <td>${f.directory}</td>
-                    </tr>`;
+        class VirtualTable {
+            constructor(category, parent) {
+                this.category = category;
+                this.rowIds = null; // null = all rows, otherwise the matching row numbers
+                this.renderToken = 0;
+
+                const name = category.name.charAt(0).toUpperCase() + category.name.slice(1);
+                const section = document.createElement('div');
+                section.innerHTML = `
+                    <h2>${escapeHTML(name)} Files<span class="count"></span></h2>
+                    <div class="vtable">
+                        <div class="vrow vhead"><div>File Name</div><div>Size</div><div>Patient ID</div><div>Sample ID</div><div>Path</div></div>
+                        <div class="viewport"><div class="spacer"></div><div class="rows"></div></div>
+                    </div>`;
+                parent.appendChild(section);
+                this.countLabel = section.querySelector('.count');
+                this.viewport = section.querySelector('.viewport');
+                this.spacer = section.querySelector('.spacer');
+                this.rows = section.querySelector('.rows');
+
+                let scheduled = false;
+                this.viewport.addEventListener('scroll', () => {
+                    if (scheduled) return;
+                    scheduled = true;
+                    requestAnimationFrame(() => { scheduled = false; this.render(); });
+                });
+                this.setRows(null);
+            }
+
+            get length() {
+                return this.rowIds === null ? this.category.files : this.rowIds.length;
+            }
+
+            setRows(rowIds) {
+                this.rowIds = rowIds;
+                const n = this.length;
+                const size = meta.summary.categories[this.category.name].size_bytes;
+                this.countLabel.textContent = rowIds === null ? `${n.toLocaleString()} files, ${formatSize(size)}` : `${n.toLocaleString()} of ${this.category.files.toLocaleString()} files`;
+                this.viewport.style.height = `${Math.max(1, Math.min(n, VISIBLE_ROWS)) * ROW_HEIGHT}px`;
+                this.spacer.style.height = `${n * ROW_HEIGHT}px`;
+                this.viewport.scrollTop = 0;
+                this.render();
+            }
+
+            async render() {
+                const token = ++this.renderToken;
+                const n = this.length;
+                const first = Math.max(0, Math.floor(this.viewport.scrollTop / ROW_HEIGHT) - OVERSCAN);
+                const last = Math.min(n, Math.ceil((this.viewport.scrollTop + this.viewport.clientHeight) / ROW_HEIGHT) + OVERSCAN);
+                const ids = [];
+                for (let i = first; i < last; i++) {
+                    ids.push(this.rowIds === null ? i : this.rowIds[i]);
+                }
+                this.rows.style.top = `${first * ROW_HEIGHT}px`;
+                if (n === 0) {
+                    this.rows.innerHTML = '<div class="vrow"><div class="pending">No matching files</div></div>';
+                    return;
+                }
+
+                // Fetch only the pages holding the visible rows
+                const pageSize = meta.page_size;
+                const pages = [...new Set(ids.map(id => Math.floor(id / pageSize)))];
+                const loaded = new Map();
+                await Promise.all(pages.map(async p => loaded.set(p, await getPage(this.category.name, p))));
+                if (token !== this.renderToken) return; // scrolled or filtered again meanwhile
+
+                this.rows.innerHTML = ids.map(id => {
+                    const [fileName, fileSize, patients, samples, directory] = loaded.get(Math.floor(id / pageSize))[id % pageSize];
+                    return `<div class="vrow">
+                        <div title="${escapeHTML(fileName)}">${escapeHTML(fileName)}</div>
+                        <div title="${fileSize === null ? 'size not measured (--shallow-containers)' : fileSize.toLocaleString() + ' bytes'}">${formatSize(fileSize)}</div>
+                        <div title="${escapeHTML(patients)}">${escapeHTML(patients)}</div>
+                        <div title="${escapeHTML(samples)}">${escapeHTML(samples)}</div>
+                        <div title="${escapeHTML(directory)}">${escapeHTML(directory)}</div>
+                    </div>`;
                 }).join('');
+            }
+        }
+
+        function getShard(key) {
+            if (!shardCache.has(key)) {
+                shardCache.set(key, meta.search.shards.includes(key) ? fetchJSON(`search/${key}.json`) : Promise.resolve({tokens: [], postings: []}));
+            }
+            return shardCache.get(key);
+        }
 
-                tablesHtml += `
-                    <h2>${cat.charAt(0).toUpperCase() + cat.slice(1)} Files</h2>
-                    <table>
-                        <thead>
-                            <tr>
-                                <th>File Name</th>
-                                <th>Size (KB)</th>
-                                <th>Patient ID</th>
-                                <th>Sample ID</th>
-                                <th>Path</th>
-                            </tr>
-                        </thead>
-                        <tbody>${rows}</tbody>
-                    </table>
-                `;
-            }
-            return tablesHtml;
+        async function matchToken(word) {
+            // Rows (per category) containing a token that starts with `word`.
+            const shard = await getShard(word[0]);
+            const matches = meta.categories.map(() => new Set());
+            // Binary search for the first token >= word; the prefix matches are contiguous from there
+            let lo = 0, hi = shard.tokens.length;
+            while (lo < hi) {
+                const mid = (lo + hi) >> 1;
+                if (shard.tokens[mid] < word) lo = mid + 1; else hi = mid;
+            }
+            for (let i = lo; i < shard.tokens.length && shard.tokens[i].startsWith(word); i++) {
+                shard.postings[i].forEach((rows, c) => rows.forEach(r => matches[c].add(r)));
+            }
+            return matches;
+        }
+
+        let filterToken = 0;
+        async function applyFilter(query) {
+            const token = ++filterToken;
+            // Same tokenization as the generator: lowercase runs of letters and digits
+            const words = query.toLowerCase().split(/[^a-z0-9]+/).filter(Boolean);
+            if (words.length === 0) {
+                tables.forEach(t => t.setRows(null));
+                return;
+            }
+            const perWord = await Promise.all(words.map(matchToken));
+            if (token !== filterToken) return;
+            for (const table of tables) {
+                const c = meta.categories.indexOf(table.category);
+                // Every word must match (AND)
+                let rows = [...perWord[0][c]];
+                for (const other of perWord.slice(1)) {
+                    rows = rows.filter(r => other[c].has(r));
+                }
+                table.setRows(rows.sort((a, b) => a - b));
+            }
         }
 
         function showError(msg) {
@@ -205,17 +342,164 @@ DYNAMIC_VIEWER_TEMPLATE = """
 </html>
 """
 
-def generate_html_from_json(json_path, html_path):
-    # Generates a static HTML viewer that dynamically loads the JSON content.
-    # The html_path and json_path are assumed to be accessible relative to each other.
-    json_filename = Path(json_path).name
+# Search tokens: lowercase runs of ASCII letters and digits (the viewer tokenizes queries the same way)
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+# Sample IDs shown per row before the list is truncated to "... (<count>)"
+DISPLAY_SAMPLE_IDS = 5
+
+
+class ViewerDataWriter:
+    # Writes the data the HTML viewer loads, while the scan streams records (same add/close
+    # interface as the manifest writers in writers.py):
+    #   summary.json            the page/shard layout and the SummaryStats aggregates (see summary.py)
+    #   version.json            when the data was generated; polled by live viewers (watch mode)
+    #   pages/<cat>_<n>.json    display rows of one category, VIEWER_PAGE_SIZE per file
+    #   search/<c>.json         inverted index of the tokens starting with character c:
+    #                           sorted tokens and, per token, the matching row numbers per category
+    # Only the current page of each category is held in memory; the search index grows with the dataset.
+    # Rows carry exact byte sizes; the page renders them human-readable.
+    # `summary` is the SummaryStats fed by the caller alongside this writer (see TeeWriter in
+    # writers.py); without one, this writer keeps its own.
+
+    def __init__(self, folder, location, categories, page_size=VIEWER_PAGE_SIZE, summary=None, size_unit=FILE_SIZE_UNIT, poll_seconds=None):
+        self.folder = Path(folder)
+        self.location = str(location)
+        self.page_size = page_size
+        self.poll_seconds = poll_seconds
+        self.count = 0
+        self.categories = list(categories)
+        self._own_summary = summary is None
+        self.summary = SummaryStats(categories, size_unit) if summary is None else summary
+        self._layout = {cat: {"name": cat, "files": 0, "pages": 0} for cat in self.categories}
+        self._rows = {cat: [] for cat in self.categories}
+        self._tokens = {}
+
+        # Built next to the final folder and swapped in on close, so a reload never sees a mix of runs
+        self._tmp = self.folder.with_name(self.folder.name + ".tmp")
+        if self._tmp.exists():
+            shutil.rmtree(self._tmp)
+        (self._tmp / "pages").mkdir(parents=True)
+        (self._tmp / "search").mkdir()
+
+    def add(self, category, record):
+        if category not in self._layout:
+            self.categories.append(category)
+            self._layout[category] = {"name": category, "files": 0, "pages": 0}
+            self._rows[category] = []
+        if self._own_summary:
+            self.summary.add(category, record)
+        layout = self._layout[category]
+        row_number = layout["files"]
+        layout["files"] += 1
+        self.count += 1
+
+        sample_ids = as_list(record["sample_id"])
+        patient_ids = as_list(record["patient_id"])
+
+        samples_display = ", ".join(sample_ids[:DISPLAY_SAMPLE_IDS])
+        if len(sample_ids) > DISPLAY_SAMPLE_IDS:
+            samples_display += f"... ({len(sample_ids)})"
+        rows = self._rows[category]
+        rows.append([record["file_name"], record_size_bytes(record, self.summary.size_unit), ", ".join(patient_ids), samples_display, record["directory"]])
+        if len(rows) == self.page_size:
+            self._flush_page(category)
+
+        # Index file name, sample and patient tokens of this row
+        c = self.categories.index(category)
+        words = set(TOKEN_PATTERN.findall(record["file_name"].lower()))
+        for value in sample_ids + patient_ids:
+            words.update(TOKEN_PATTERN.findall(value.lower()))
+        for word in words:
+            postings = self._tokens.get(word)
+            if postings is None:
+                postings = self._tokens[word] = [[] for _ in self.categories]
+            while len(postings) <= c:
+                postings.append([])
+            postings[c].append(row_number)
+
+    def _flush_page(self, category):
+        rows = self._rows[category]
+        if not rows:
+            return
+        layout = self._layout[category]
+        with open(self._tmp / "pages" / f"{category}_{layout['pages']:05d}.json", "w", encoding="utf-8") as f:
+            # json.dumps uses the C encoder; json.dump to a file streams through the pure-Python one
+            f.write(json.dumps(rows, separators=(",", ":")))
+        layout["pages"] += 1
+        self._rows[category] = []
+
+    def close(self):
+        for category in self.categories:
+            self._flush_page(category)
+
+        # One shard per first character, so a query only downloads the shards of its words
+        shards = {}
+        for word in sorted(self._tokens):
+            shards.setdefault(word[0], []).append(word)
+        for key, words in shards.items():
+            width = len(self.categories)
+            postings = [self._tokens[w] + [[]] * (width - len(self._tokens[w])) for w in words]
+            with open(self._tmp / "search" / f"{key}.json", "w", encoding="utf-8") as f:
+                f.write(json.dumps({"tokens": words, "postings": postings}, separators=(",", ":")))
+
+        generated = datetime.now(timezone.utc).isoformat()
+        summary = {
+            "location": self.location,
+            "generated": generated,
+            "poll_seconds": self.poll_seconds,
+            "page_size": self.page_size,
+            "categories": [self._layout[cat] for cat in self.categories],
+            "search": {"shards": sorted(shards)},
+            "summary": self.summary.as_dict()
+        }
+        with open(self._tmp / "summary.json", "w", encoding="utf-8") as f:
+            json.dump(summary, f, indent=4)
+        with open(self._tmp / "version.json", "w", encoding="utf-8") as f:
+            json.dump({"generated": generated}, f)
+
+        # Moved aside rather than deleted first, so the folder is missing only between two renames
+        old = self.folder.with_name(self.folder.name + ".old")
+        if old.exists():
+            shutil.rmtree(old)
+        if self.folder.exists():
+            self.folder.replace(old)
+        self._tmp.replace(self.folder)
+        if old.exists():
+            shutil.rmtree(old)
+
+def generate_html(html_path, viewer_dir=OUTPUT_VIEWER_DIR_NAME):
+    # Writes the static HTML viewer; it loads its data from viewer_dir (relative to html_path).
     html_filename = Path(html_path).name
-    
-    html = DYNAMIC_VIEWER_TEMPLATE.replace("__JSON_FILENAME__", json_filename)
+
+    html = DYNAMIC_VIEWER_TEMPLATE.replace("__VIEWER_DIR__", str(viewer_dir))
     html = html.replace("__HTML_FILENAME__", html_filename)
-    
+
     with open(html_path, "w", encoding="utf-8") as f:
         f.write(html)
-    
+
     print(f"HTML report viewer generated at: {html_path}")
     print(f"NOTE: To view {html_filename} correctly, you must serve it via HTTP (e.g., 'python -m http.server') or allow local file access in your browser.")
+
+def build_viewer_data_from_json(json_path, folder):
+    # Builds the viewer data from an existing manifest (streamed, any --output-format), e.g. one
+    # written with --no-html or by an older version.
+    # The location and unit are known once reading has started (JSONL manifests have no location)
+    reader = ManifestReader(json_path)
+    open_writer = lambda: ViewerDataWriter(folder, reader.location or "", [], size_unit=reader.size_unit)
+    writer = None
+    for category, record in reader:
+        if writer is None:
+            writer = open_writer()
+        writer.add(category, record)
+    (writer or open_writer()).close()
+
+def generate_html_from_json(json_path, html_path):
+    # Generates a static HTML viewer for an output.json.
+    # The html_path and json_path are assumed to be accessible relative to each other.
+    # The viewer data folder is written by generate_json during the scan; if it is missing,
+    # it is built from the JSON file once.
+    viewer_dir = Path(html_path).parent / OUTPUT_VIEWER_DIR_NAME
+    if not (viewer_dir / "summary.json").exists():
+        build_viewer_data_from_json(json_path, viewer_dir)
+    generate_html(html_path, OUTPUT_VIEWER_DIR_NAME)
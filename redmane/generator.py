@@ -1,121 +1,203 @@
 import sys
 import argparse
-import json
+import logging
 from pathlib import Path
-from rocrate.rocrate import ROCrate
 from .params import *
-from .generate_html import generate_html_from_json
-from .config import find_config_path, load_config, normalize_and_validate_config
-import pandas as pd
-import numpy as np
-
-def load_metadata(file_path):
-    # Loads metadata from the JSON file and returns a dictionary keyed by the "Patient ID".
-    if not file_path.exists():
-        print(f"Warning: Metadata file not found at {file_path}")
-        return {}
-        
-    with open(file_path, "r") as f:
-        data = json.load(f)
-    metadata_dict = {}
-    for entry in data:
-        key = entry.get("Patient ID")
-        if key:
-            metadata_dict[key] = entry
-    return metadata_dict
-
-def load_sample_tb(file_path):
-    # Loads the JSON file including the pairs of samples and corresponding patients.
-    # Returns a dictionary mapping sample_id to patient_id.
-    if not file_path.exists():
-        print(f"Warning: Sample to Patient mapping file not found at {file_path}")
-        return {}
-
-    with open(file_path) as f:
-        data = json.load(f)
-    return data
-
+from .generate_html import ViewerDataWriter, generate_html
+from .config import find_config_path, load_config, normalize_and_validate_config, normalize_scan_options, compile_classifier
+from .cache import ScanCache, cache_path_for, scan_fingerprint
+from .writers import WRITERS, TeeWriter, open_writer
+from .crate import MetadataOnlyCrate
+from .checksums import CHECKSUM_ALGORITHMS, ChecksumPipeline
+from .metrics import Metrics
+from .metadata_store import MetadataStore
+from .summary import SummaryStats
+from .index import InvertedIndexWriter, index_path_for
+from .batch import generate_batch
 from .auxiliary import scan_dataset
 
-def generate_json(directory, output_file, no_rocrate=False):
+def generate_json(directory, output_file, no_rocrate=False, workers=SCAN_WORKERS, use_cache=True, compact=False, output_format="json", rocrate_mode="copy", checksum_algorithms=None, checksum_workers=CHECKSUM_WORKERS, metrics=None, attach_metadata=False, pool=None, metadata_store=None, viewer=True, scan_mode="threads", concurrency=SCAN_CONCURRENCY, size_unit=FILE_SIZE_UNIT, shallow_containers=False, live=False, index=False):
     # Generates a JSON summary of files in the specified directory using RO-Crate.
+    # In batch mode (see batch.py) `pool` is the executor shared by all datasets and `metadata_store`
+    # the MetadataStore kept open across datasets; only the dataset's mapping is resolved here.
+    # With viewer, the data of the HTML viewer (summary, record pages, search index) is written to
+    # OUTPUT_VIEWER_DIR_NAME next to the output file during the same pass.
+    # With live (watch mode, see watch.py), the HTML viewer polls its data folder for updates.
+    # With shallow_containers, container directories (config "container_extensions") are not walked.
+    # size_unit is the unit file sizes and totals are rendered in; exact byte counts are always kept.
+    # With index, the patient -> samples -> files and sample -> files lookups (see index.py) are
+    # written next to the output file during the same pass.
+    # Returns the output file, the number of records written and the summary statistics.
     data_dir = Path(directory).resolve()
     if not data_dir.is_dir():
         print(f"\nERROR: The specified path '{directory}' does not exist or is not a directory.")
         sys.exit(1)
+    if metrics is None:
+        metrics = Metrics()
     
     # Init RO-Crate
     crate = None
-    if not no_rocrate:
+    if not no_rocrate and rocrate_mode == "metadata":
+        # Only ro-crate-metadata.json is written; file entities point at the original files
+        crate = MetadataOnlyCrate("Research Object", f"Research object created from files in {directory}")
+    elif not no_rocrate:
+        # Imported here: loading rocrate costs more than a small scan, and --no-rocrate never needs it
+        from rocrate.rocrate import ROCrate
         crate = ROCrate()
         crate.root_dataset.name = "Research Object"
         crate.root_dataset.description = f"Research object created from files in {directory}"
     
-    # Load metadata
-    metadata_dict = load_metadata(METADATA)
+    with metrics.stage("config_load"):
+        # Priority: dataset-level mapping > global mapping
+        dataset_mapping_file = data_dir / "patient_sample_mapping.json"
+        if dataset_mapping_file.exists():
+            print(f" | Found patient mapping: {dataset_mapping_file}")
+            mapping_file = dataset_mapping_file
+        else:
+            mapping_file = SAMPLE_TO_PATIENT
     
-    # Priority: dataset-level mapping > global mapping
-    dataset_mapping_file = data_dir / "patient_sample_mapping.json"
-    if dataset_mapping_file.exists():
-        print(f" | Found patient mapping: {dataset_mapping_file}")
-        sample_to_patient = load_sample_tb(dataset_mapping_file)
-    else:
-        sample_to_patient = load_sample_tb(SAMPLE_TO_PATIENT)
+        # Load metadata: indexed on disk once, then looked up per sample/patient on demand
+        own_store = metadata_store is None
+        if own_store:
+            metadata_store = MetadataStore(METADATA)
+        metadata_dict = metadata_store.patients
+        sample_to_patient = metadata_store.mapping(mapping_file)
     
-    # STRICT CONFIG enforcement
-    # 1. Find config path
-    config_path = find_config_path(data_dir)
-    print(f" | Found configuration: {config_path}")
+        # STRICT CONFIG enforcement
+        # 1. Find config path
+        config_path = find_config_path(data_dir)
+        print(f" | Found configuration: {config_path}")
     
-    # 2. Load config
-    config_raw = load_config(config_path)
+        # 2. Load config
+        config_raw = load_config(config_path)
     
-    # 3. Validate and normalize
-    file_types = normalize_and_validate_config(config_raw)
+        # 3. Validate and normalize
+        file_types = normalize_and_validate_config(config_raw)
+        classifier = compile_classifier(file_types)
+        scan_options = normalize_scan_options(config_raw, workers=workers, scan_mode=scan_mode, concurrency=concurrency, size_unit=size_unit, shallow_containers=shallow_containers, attach_metadata=attach_metadata)
     
-    # Scan
-    files_map = scan_dataset(data_dir, file_types, metadata_dict, sample_to_patient, ORGANIZATION, crate)
+    # Incremental rescans: reuse records of files unchanged since the last run
+    cache = None
+    if use_cache:
+        with metrics.stage("cache_load"):
+            cache = ScanCache(cache_path_for(output_file), scan_fingerprint(data_dir, file_types, sample_to_patient, ORGANIZATION, scan_options.record_settings()), size_unit=size_unit)
     
-    # Build output
-    output_data = {
-        "data": {
-            "location": str(data_dir),
-            "file_size_unit": FILE_SIZE_UNIT,
-            "files": files_map
-        }
-    }
+    # Opt-in content checksums, hashed in parallel
+    checksums = None
+    if checksum_algorithms:
+        checksums = ChecksumPipeline(checksum_algorithms, checksum_workers, pool=pool)
+    
+    # Records are streamed to the output file while scanning
+    # Summary statistics are accumulated in the same pass and written with the manifest
+    summary = SummaryStats(file_types, size_unit)
+    sinks = [summary]
+    if viewer:
+        sinks.append(ViewerDataWriter(Path(output_file).parent / OUTPUT_VIEWER_DIR_NAME, data_dir, file_types, summary=summary,
+                                      poll_seconds=VIEWER_POLL_SECONDS if live else None))
+    manifest = open_writer(output_format, output_file, data_dir, file_types, compact=compact, summary=summary, size_unit=size_unit)
+    index_file = None
+    if index:
+        index_file = index_path_for(output_file)
+        sinks.append(InvertedIndexWriter(index_file, manifest, sample_to_patient, data_dir))
+    writer = TeeWriter(manifest, *sinks)
+    
+    # Scan
+    with metrics.stage("scan"):
+        scan_dataset(data_dir, file_types, metadata_dict, sample_to_patient, ORGANIZATION, crate, scan_options, cache=cache, writer=writer, checksums=checksums, classifier=classifier, metrics=metrics, pool=pool)
     
     # Write RO-Crate
     if crate:
         rocrate_folder = Path(output_file).parent / "rocrate"
-        crate.write(rocrate_folder)
+        with metrics.stage("crate_write"):
+            crate.write(rocrate_folder)
         print(f"RO-Crate written to {rocrate_folder}")
     else:
         print(" | RO-Crate generation skipped per --no-rocrate flag.")
     
-    # Write JSON
-    with open(output_file, "w") as f:
-        json.dump(output_data, f, indent=4)
+    if own_store:
+        metadata_store.close()
     
-    print(f"\nJSON file generated at: {output_file}")
+    # Write output manifest
+    with metrics.stage("manifest_write"):
+        writer.close()
+    metrics.count("records_written", writer.count)
+    
+    print(f"\n{output_format.upper()} file generated at: {output_file}")
+    if index_file:
+        print(f"Patient/sample index written to: {index_file}")
+    return {"output_file": str(output_file), "records": writer.count, "summary": summary.as_dict(), "index_file": str(index_file) if index_file else None}
 
 def main():
     parser = argparse.ArgumentParser(description="Generate metadata JSON and HTML report for a dataset.")
-    parser.add_argument("--dataset", required=True, help="Path to the dataset directory.")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--dataset", help="Path to the dataset directory.")
+    source.add_argument("--batch", nargs="+", metavar="DATASET", help="Ingest many datasets in one run: directories or glob patterns (quote them, e.g. 'cohorts/*'). Each dataset gets its own folder in --output-dir, plus a combined batch_index.json.")
+    parser.add_argument("--output-dir", default=".", help="Batch mode: directory for the per-dataset outputs and batch_index.json (default: current directory).")
     parser.add_argument("--no-rocrate", action="store_true", help="Disable RO-Crate generation.")
+    parser.add_argument("--rocrate-mode", choices=["copy", "metadata"], default="copy", help="copy: write the RO-Crate with a copy of every data file (default). metadata: write only ro-crate-metadata.json referencing the files in place.")
+    parser.add_argument("--no-cache", action="store_true", help="Ignore and do not update the scan-state cache; rescan every file.")
+    parser.add_argument("--output-format", choices=sorted(WRITERS), default="json", help="Manifest format: json (nested document, default), jsonl (one record per line) or parquet/arrow (typed columns, requires pyarrow).")
+    parser.add_argument("--compact", action="store_true", help="Write output.json without indentation (roughly half the size).")
+    parser.add_argument("--size-unit", choices=list(SIZE_UNITS), default=FILE_SIZE_UNIT, help=f"Unit of file_size and the size totals (default: {FILE_SIZE_UNIT}; binary multiples). Exact sizes are always written as file_size_bytes.")
+    parser.add_argument("--shallow-containers", action="store_true", help="Do not walk container directories (config 'container_extensions', e.g. .zarr stores): record them without their size and file count, for speed.")
+    parser.add_argument("--no-html", action="store_true", help=f"Do not write the HTML viewer ({OUTPUT_HTML_FILE_NAME} and its paged data in {OUTPUT_VIEWER_DIR_NAME}/), which costs about 20 us per file during the scan.")
+    parser.add_argument("--index", action="store_true", help="Also write the patient/sample lookup index (output.index.sqlite) next to the manifest.")
+    parser.add_argument("--attach-metadata", action="store_true", help="Add the clinical fields of each file's patients (from sample_metadata.json) to its record as 'patient_metadata'.")
+    parser.add_argument("--checksum", action="append", choices=CHECKSUM_ALGORITHMS, dest="checksums", help="Add a content checksum to every record (repeatable): sha256, md5, or crc32 (fast, non-cryptographic).")
+    parser.add_argument("--checksum-workers", type=int, default=CHECKSUM_WORKERS, help=f"Number of threads hashing files (default: {CHECKSUM_WORKERS}).")
+    parser.add_argument("--metrics-out", help="Write per-stage timings and counters (files/s, bytes stat'd, summary parse time, crate entities, peak RSS) as JSON to this file.")
+    parser.add_argument("--profile", help="Run under cProfile and write the stats to this file (inspect with 'python -m pstats').")
+    parser.add_argument("--log-level", default="INFO", choices=["DEBUG", "INFO", "WARNING", "ERROR"], help="Logging level. DEBUG prints one '+ Found' line per file.")
+    parser.add_argument("--workers", type=int, default=SCAN_WORKERS, help=f"Number of threads listing directories in parallel (default: {SCAN_WORKERS}, 1 = serial).")
+    parser.add_argument("--scan-mode", choices=["threads", "async"], default="threads", help="threads: list directories on --workers threads (default). async: pipeline listings, per-file stats and summary file reads with asyncio, for high-latency network filesystems (NFS, Lustre, S3-FUSE).")
+    parser.add_argument("--concurrency", type=int, default=SCAN_CONCURRENCY, help=f"--scan-mode async: maximum filesystem calls in flight (default: {SCAN_CONCURRENCY}).")
+    parser.add_argument("--watch", action="store_true", help="Keep running and update the manifest, summary and HTML viewer data whenever files land, change or are removed (inotify on Linux, polling elsewhere). Stop with Ctrl+C.")
+    parser.add_argument("--debounce", type=float, default=WATCH_DEBOUNCE, help=f"--watch: seconds without new changes before updating (default: {WATCH_DEBOUNCE:g}).")
+    parser.add_argument("--poll-interval", type=float, help=f"--watch: poll for changes every N seconds instead of using inotify, e.g. on network mounts written by other machines (default without inotify: {WATCH_POLL_INTERVAL:g}).")
     
     args = parser.parse_args()
+    logging.basicConfig(level=getattr(logging, args.log_level), format="%(message)s", stream=sys.stdout)
     
+    if args.batch:
+        if args.watch:
+            parser.error("--watch works with --dataset, not --batch")
+        run_batch(args)
+        return
+
     target_directory = args.dataset
     print(f"\nProcess started for: {target_directory}")
     
     # Define output paths (Current Working Directory)
-    output_file_path = Path.cwd() / OUTPUT_JSON_FILE_NAME
+    output_file_path = Path.cwd() / OUTPUT_FILE_NAMES[args.output_format]
     output_html_path = Path.cwd() / OUTPUT_HTML_FILE_NAME
     
+    options = dict(no_rocrate=args.no_rocrate, workers=args.workers, use_cache=not args.no_cache, compact=args.compact, output_format=args.output_format, rocrate_mode=args.rocrate_mode, checksum_algorithms=args.checksums, checksum_workers=args.checksum_workers,
+                   attach_metadata=args.attach_metadata, scan_mode=args.scan_mode, concurrency=args.concurrency, size_unit=args.size_unit, shallow_containers=args.shallow_containers, index=args.index, viewer=not args.no_html)
+    if args.watch:
+        from .watch import watch_dataset
+        try:
+            watch_dataset(target_directory, output_file_path, output_html_path, debounce=args.debounce, poll_interval=args.poll_interval, **options)
+        except SystemExit:
+            sys.exit(1)
+        return
+
     try:
-        generate_json(target_directory, output_file_path, no_rocrate=args.no_rocrate)
-        generate_html_from_json(output_file_path, output_html_path)
+        metrics = Metrics()
+        run = lambda: generate_json(target_directory, output_file_path, metrics=metrics, **options)
+        if args.profile:
+            import cProfile
+            profiler = cProfile.Profile()
+            profiler.runcall(run)
+            profiler.dump_stats(args.profile)
+            print(f"cProfile stats written to: {args.profile}")
+        else:
+            run()
+        metrics.report()
+        if args.metrics_out:
+            metrics.write(args.metrics_out)
+        # The viewer reads its own paged data (written during the scan), whatever the manifest format
+        if not args.no_html:
+            generate_html(output_html_path)
     except SystemExit:
         sys.exit(1)
     except Exception as e:
@@ -124,5 +206,34 @@ def main():
         traceback.print_exc()
         sys.exit(1)
 
+def run_batch(args):
+    # --batch: one process ingests every dataset; outputs go to --output-dir/<dataset name>/.
+    print(f"\nBatch process started for: {' '.join(args.batch)}")
+    try:
+        metrics = Metrics()
+        run = lambda: generate_batch(args.batch, args.output_dir, output_format=args.output_format, workers=args.workers, checksum_workers=args.checksum_workers, metrics=metrics,
+                                     no_rocrate=args.no_rocrate, use_cache=not args.no_cache, compact=args.compact, rocrate_mode=args.rocrate_mode, checksum_algorithms=args.checksums, attach_metadata=args.attach_metadata,
+                                     scan_mode=args.scan_mode, concurrency=args.concurrency, size_unit=args.size_unit, shallow_containers=args.shallow_containers, index=args.index, viewer=not args.no_html)
+        if args.profile:
+            import cProfile
+            profiler = cProfile.Profile()
+            index = profiler.runcall(run)
+            profiler.dump_stats(args.profile)
+            print(f"cProfile stats written to: {args.profile}")
+        else:
+            index = run()
+        metrics.report()
+        if args.metrics_out:
+            metrics.write(args.metrics_out)
+    except SystemExit:
+        sys.exit(1)
+    except Exception as e:
+        print(f"Unexpected Error: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
+    if index["totals"]["failed"]:
+        sys.exit(1)
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,226 @@
+import os
+import sqlite3
+from functools import lru_cache
+from pathlib import Path
+from .params import INDEX_BATCH_SIZE, INDEX_SUFFIX
+from .readers import ManifestReader
+from .records import as_list
+
+INDEX_VERSION = 3
+
+def index_path_for(output_file):
+    # The inverted index lives next to the output manifest (output.json -> output.index.sqlite).
+    output_file = Path(output_file)
+    return output_file.with_name(output_file.stem + INDEX_SUFFIX)
+
+class InvertedIndexWriter:
+    # Builds patient -> samples, patient -> files and sample -> files indexes while the records are
+    # written (same add/close interface as writers.py). Files, samples and patients get compact
+    # integer IDs. A file's ID is its position in scan order. The relations are stored as integer
+    # pairs in SQLite, indexed once at the end.
+    # Records are not copied: each file is stored as its category and its extent in the manifest,
+    # taken from `manifest` (the manifest writer, see last_extent in writers.py): a byte range in
+    # JSON and JSONL, a row group and row in Parquet and Arrow. ManifestIndex reads back only those
+    # bytes or row groups. The manifest is closed first (see TeeWriter), so its category offsets,
+    # size and mtime are known on close and recorded, and a stale index is detected.
+    # The samples of a multi-sample table are paired with their patients through
+    # `sample_to_patient`, the mapping the scan used.
+    # Written to a temporary file and moved into place on close.
+
+    def __init__(self, path, manifest, sample_to_patient=None, location=None):
+        self.path = Path(path)
+        self.manifest = manifest
+        self.sample_to_patient = sample_to_patient
+        self.location = location
+        self.count = 0
+        self._tmp_path = self.path.with_name(self.path.name + ".tmp")
+        if self._tmp_path.exists():
+            self._tmp_path.unlink()
+        self._connection = sqlite3.connect(self._tmp_path)
+        # A throwaway build file: no journal, no fsync
+        self._connection.execute("PRAGMA journal_mode = OFF")
+        self._connection.execute("PRAGMA synchronous = OFF")
+        self._connection.executescript("""
+            CREATE TABLE info (key TEXT PRIMARY KEY, value TEXT);
+            CREATE TABLE categories (id INTEGER PRIMARY KEY, category TEXT, offset INTEGER);
+            CREATE TABLE files (id INTEGER PRIMARY KEY, category INTEGER, block INTEGER, offset INTEGER, length INTEGER);
+            CREATE TABLE samples (id INTEGER PRIMARY KEY, sample_id TEXT);
+            CREATE TABLE patients (id INTEGER PRIMARY KEY, patient_id TEXT);
+            CREATE TABLE sample_files (sample INTEGER, file INTEGER);
+            CREATE TABLE patient_files (patient INTEGER, file INTEGER);
+            CREATE TABLE patient_samples (patient INTEGER, sample INTEGER);
+        """)
+        self._samples = {}
+        self._patients = {}
+        self._categories = {}
+        self._pairs = set()
+        self._files = []
+        self._sample_files = []
+        self._patient_files = []
+
+    @staticmethod
+    def _id(ids, value):
+        found = ids.get(value)
+        if found is None:
+            found = ids[value] = len(ids)
+        return found
+
+    def _patient_of(self, sample_ids):
+        # {sample: patient} for the samples of a multi-sample table.
+        if self.sample_to_patient is None:
+            return {}
+        get_many = getattr(self.sample_to_patient, "get_many", None)
+        if get_many is not None:
+            return get_many(sample_ids)
+        return {s: self.sample_to_patient[s] for s in sample_ids if s in self.sample_to_patient}
+
+    def add(self, category, record):
+        file_id = self.count
+        self.count += 1
+        self._files.append((file_id, self._id(self._categories, category)) + self.manifest.last_extent)
+        sample_ids = as_list(record.get("sample_id"))
+        patient_ids = as_list(record.get("patient_id"))
+        for sample_id in sample_ids:
+            self._sample_files.append((self._id(self._samples, sample_id), file_id))
+        for patient_id in patient_ids:
+            self._patient_files.append((self._id(self._patients, patient_id), file_id))
+        if len(sample_ids) == 1 and len(patient_ids) == 1:
+            self._pairs.add((self._patients[patient_ids[0]], self._samples[sample_ids[0]]))
+        elif patient_ids:
+            patients = set(patient_ids)
+            for sample_id, patient_id in self._patient_of(sample_ids).items():
+                if patient_id in patients:
+                    self._pairs.add((self._patients[patient_id], self._samples[sample_id]))
+        if len(self._files) >= INDEX_BATCH_SIZE:
+            self._flush()
+
+    def _flush(self):
+        execute_many = self._connection.executemany
+        execute_many("INSERT INTO files VALUES (?, ?, ?, ?, ?)", self._files)
+        execute_many("INSERT INTO sample_files VALUES (?, ?)", self._sample_files)
+        execute_many("INSERT INTO patient_files VALUES (?, ?)", self._patient_files)
+        self._files, self._sample_files, self._patient_files = [], [], []
+
+    def close(self):
+        self._flush()
+        connection = self._connection
+        offsets = self.manifest.category_offsets
+        connection.executemany("INSERT INTO categories VALUES (?, ?, ?)", ((i, c, offsets.get(c, 0)) for c, i in self._categories.items()))
+        connection.executemany("INSERT INTO samples VALUES (?, ?)", ((i, s) for s, i in self._samples.items()))
+        connection.executemany("INSERT INTO patients VALUES (?, ?)", ((i, p) for p, i in self._patients.items()))
+        connection.executemany("INSERT INTO patient_samples VALUES (?, ?)", sorted(self._pairs))
+        # Built after loading: one sort per index instead of random inserts into a b-tree
+        connection.executescript("""
+            CREATE UNIQUE INDEX samples_by_name ON samples (sample_id);
+            CREATE UNIQUE INDEX patients_by_name ON patients (patient_id);
+            CREATE INDEX sample_files_by_sample ON sample_files (sample, file);
+            CREATE INDEX patient_files_by_patient ON patient_files (patient, file);
+            CREATE INDEX patient_samples_by_patient ON patient_samples (patient, sample);
+        """)
+        info = [("version", str(INDEX_VERSION)), ("location", str(self.location)), ("files", str(self.count))]
+        manifest = Path(self.manifest.output_file)
+        st = os.stat(manifest)
+        info += [("manifest", manifest.name), ("manifest_size", str(st.st_size)), ("manifest_mtime_ns", str(st.st_mtime_ns))]
+        connection.executemany("INSERT INTO info VALUES (?, ?)", info)
+        connection.commit()
+        connection.close()
+        os.replace(self._tmp_path, self.path)
+
+class ManifestIndex:
+    # Lookup API over the inverted index written next to a manifest:
+    #   index = ManifestIndex("output.json")           (or the output.index.sqlite path)
+    #   index.samples("ICGC_0001")                     -> ["LC_Sample1", ...]
+    #   index.file_ids(patient_id="ICGC_0001")         -> [12, 40, ...]
+    #   index.records(sample_id="LC_Sample1")          -> [("raw", {record}), ...]
+    # Nothing is loaded up front: the SQLite file is opened on the first query, and each query
+    # reads only the index entries it returns. Repeated lookups are memoized. The index holds no
+    # records: records() reads just their extents from the manifest (see readers.py), so a lookup
+    # costs its result rather than the manifest's size, and fails if the manifest changed since
+    # the index was written.
+
+    def __init__(self, path):
+        path = Path(path)
+        self.path = path if path.name.endswith(INDEX_SUFFIX) else index_path_for(path)
+        self._connection = None
+        self._manifest = None
+        self._samples = lru_cache(maxsize=4096)(self._query_samples)
+        self._file_ids = lru_cache(maxsize=4096)(self._query_file_ids)
+
+    def _execute(self, query, params=()):
+        if self._connection is None:
+            if not self.path.exists():
+                raise FileNotFoundError(f"No index at {self.path} (written by redmane-ingest next to the manifest)")
+            self._connection = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True, check_same_thread=False)
+            version = self._connection.execute("SELECT value FROM info WHERE key = 'version'").fetchone()
+            if version != (str(INDEX_VERSION),):
+                raise ValueError(f"{self.path} was written by an incompatible version; rerun redmane-ingest --index")
+        return self._connection.execute(query, params)
+
+    def _manifest_path(self):
+        # The manifest the index was written for, checked against its recorded size and mtime.
+        if self._manifest is None:
+            info = dict(self._execute("SELECT key, value FROM info").fetchall())
+            if "manifest" not in info:
+                raise ValueError(f"{self.path} does not name its manifest; rerun redmane-ingest --index")
+            manifest = self.path.with_name(info["manifest"])
+            try:
+                st = os.stat(manifest)
+            except OSError:
+                raise FileNotFoundError(f"Manifest {manifest} of index {self.path} not found")
+            if (str(st.st_size), str(st.st_mtime_ns)) != (info["manifest_size"], info["manifest_mtime_ns"]):
+                raise ValueError(f"{manifest} changed since {self.path} was written; rerun redmane-ingest --index")
+            self._manifest = manifest
+        return self._manifest
+
+    def _query_samples(self, patient_id):
+        return tuple(row[0] for row in self._execute(
+            "SELECT s.sample_id FROM patients p JOIN patient_samples ps ON ps.patient = p.id JOIN samples s ON s.id = ps.sample "
+            "WHERE p.patient_id = ? ORDER BY ps.sample", (patient_id,)))
+
+    def _query_file_ids(self, table, column, key_table, key_column, key):
+        return tuple(row[0] for row in self._execute(
+            f"SELECT f.file FROM {key_table} k JOIN {table} f ON f.{column} = k.id WHERE k.{key_column} = ? ORDER BY f.file", (key,)))
+
+    def samples(self, patient_id):
+        # Sample IDs of a patient, in order of first appearance in the scan.
+        return list(self._samples(patient_id))
+
+    def file_ids(self, patient_id=None, sample_id=None):
+        # IDs of the files listing this patient or sample (exactly one of them), in scan order.
+        if (patient_id is None) == (sample_id is None):
+            raise ValueError("pass exactly one of patient_id and sample_id")
+        if patient_id is not None:
+            return list(self._file_ids("patient_files", "patient", "patients", "patient_id", patient_id))
+        return list(self._file_ids("sample_files", "sample", "samples", "sample_id", sample_id))
+
+    def read_records(self, file_ids):
+        # (category, record) of each file ID, in the order given, read from the manifest.
+        categories, extents = [], []
+        for file_id in file_ids:
+            row = self._execute("SELECT c.category, f.block, c.offset + f.offset, f.length FROM files f JOIN categories c ON c.id = f.category WHERE f.id = ?", (file_id,)).fetchone()
+            if row is None:
+                raise KeyError(file_id)
+            categories.append(row[0])
+            extents.append(row[1:])
+        if not extents:
+            return []
+        return list(zip(categories, ManifestReader(self._manifest_path()).read_extents(extents)))
+
+    def record(self, file_id):
+        # (category, record) of a file ID.
+        return self.read_records([file_id])[0]
+
+    def records(self, patient_id=None, sample_id=None):
+        # (category, record) of every file listing this patient or sample.
+        return self.read_records(self.file_ids(patient_id, sample_id))
+
+    def close(self):
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,183 @@
+import hashlib
+import json
+import os
+import sqlite3
+import tempfile
+from contextlib import closing
+from functools import lru_cache
+from pathlib import Path
+from .params import METADATA_INDEX_DIR
+
+INDEX_VERSION = 1
+
+# Keys per IN (...) query of LazyMapping.get_many; below SQLite's host parameter limit
+BATCH_SIZE = 500
+
+# Per-sample fields of a sample_metadata.json entry; everything else describes the patient
+SAMPLE_FIELDS = ("Sample ID",)
+
+def _source_state(path):
+    # (size, mtime_ns) of a source JSON file, or None if it does not exist.
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_size, st.st_mtime_ns
+
+class LazyMapping:
+    # Read-only, dict-like view over one index table: values are fetched on demand and memoized.
+    # Supports the .get() / `in` / [] calls scan_dataset makes on plain dicts.
+
+    def __init__(self, connection, table, fingerprint, decode=None):
+        self.fingerprint = fingerprint
+        query = f"SELECT value FROM {table} WHERE key = ?"
+        execute = connection.execute
+
+        @lru_cache(maxsize=65536)
+        def lookup(key):
+            row = execute(query, (key,)).fetchone()
+            if row is None:
+                return None
+            return decode(row[0]) if decode else row[0]
+
+        self._lookup = lookup
+        self._execute = execute
+        self._table = table
+        self._decode = decode
+
+    def get_many(self, keys):
+        # Returns {key: value} for the keys present in the index, fetched in batched IN queries.
+        found = {}
+        keys = list(dict.fromkeys(keys))
+        for start in range(0, len(keys), BATCH_SIZE):
+            batch = keys[start:start + BATCH_SIZE]
+            query = f"SELECT key, value FROM {self._table} WHERE key IN ({','.join('?' * len(batch))})"
+            for key, value in self._execute(query, batch):
+                found[key] = self._decode(value) if self._decode else value
+        return found
+
+    def get(self, key, default=None):
+        value = self._lookup(key)
+        return default if value is None else value
+
+    def __getitem__(self, key):
+        value = self._lookup(key)
+        if value is None:
+            raise KeyError(key)
+        return value
+
+    def __contains__(self, key):
+        return self._lookup(key) is not None
+
+def _index_path(index_dir, prefix, source):
+    # One index per source JSON file, named after its resolved path.
+    key = hashlib.sha1(str(source).encode()).hexdigest()[:16]
+    return Path(index_dir) / f"{prefix}_{key}.sqlite"
+
+def _open_index(index_path, states, fill):
+    # Read-only connection to the index at index_path, (re)built with fill(connection) unless it
+    # was built from the same source states. It is built under a name unique to this process and
+    # swapped in, so concurrent runs never write the same file. If the index directory is not
+    # writable, the index is built in memory for this run instead.
+    if _is_current(index_path, states):
+        return sqlite3.connect(f"file:{index_path}?mode=ro", uri=True)
+    print(f" | Building metadata index {index_path} ...")
+    try:
+        index_path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(prefix=index_path.name + ".", suffix=".tmp", dir=index_path.parent)
+        os.close(fd)
+    except OSError as e:
+        print(f"Warning: Cannot write the metadata index to {index_path.parent} ({e}); indexing in memory for this run")
+        connection = sqlite3.connect(":memory:")
+        _fill(connection, states, fill)
+        return connection
+    try:
+        with closing(sqlite3.connect(tmp_path)) as connection:
+            _fill(connection, states, fill)
+        os.replace(tmp_path, index_path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    return sqlite3.connect(f"file:{index_path}?mode=ro", uri=True)
+
+def _is_current(index_path, states):
+    if not index_path.exists():
+        return False
+    try:
+        with closing(sqlite3.connect(f"file:{index_path}?mode=ro", uri=True)) as connection:
+            version = connection.execute("SELECT value FROM info WHERE key = 'version'").fetchone()
+            stored = connection.execute("SELECT value FROM info WHERE key = 'sources'").fetchone()
+    except sqlite3.Error:
+        return False
+    return version == (str(INDEX_VERSION),) and stored is not None and json.loads(stored[0]) == json.loads(json.dumps(states))
+
+def _fill(connection, states, fill):
+    with connection:
+        connection.execute("CREATE TABLE info (key TEXT PRIMARY KEY, value TEXT)")
+        fill(connection)
+        connection.execute("INSERT INTO info VALUES ('version', ?)", (str(INDEX_VERSION),))
+        connection.execute("INSERT INTO info VALUES ('sources', ?)", (json.dumps(states),))
+
+class MetadataStore:
+    # SQLite indexes over sample_metadata.json (patient clinical fields, the shared registry) and
+    # the sample -> patient mapping JSON files. Each file has its own index, built once from the
+    # JSON and rebuilt only when its size or mtime changes, so the registry is indexed once
+    # however many datasets bring their own patient_sample_mapping.json. After that, lookups read
+    # single rows on demand, so no run loads the whole registry into RAM.
+    #   store = MetadataStore(METADATA)
+    #   store.patients.get("ICGC_0001")                      -> {"Study ID": ..., "Diagnosis Age": ..., ...}
+    #   store.mapping(SAMPLE_TO_PATIENT).get("LC_Sample1")   -> "ICGC_0001"
+    # A store stays open across datasets in batch mode (see batch.py); mappings are opened once each.
+
+    def __init__(self, metadata_file, index_dir=METADATA_INDEX_DIR):
+        self.metadata_file = Path(metadata_file).resolve()
+        self.index_dir = index_dir
+        self._metadata_state = _source_state(self.metadata_file)
+        self._connections = [_open_index(_index_path(index_dir, "metadata_index", self.metadata_file),
+                                         {str(self.metadata_file): self._metadata_state}, self._fill_patients)]
+        self.patients = LazyMapping(self._connections[0], "patients", self._fingerprint(), decode=json.loads)
+        self._mappings = {}
+
+    def _fingerprint(self, *states):
+        # Fingerprint of the registry and the given (path, state) pairs (see scan_fingerprint).
+        states = dict(states, **{str(self.metadata_file): self._metadata_state})
+        return hashlib.sha256(json.dumps(sorted(states.items())).encode()).hexdigest()
+
+    def _fill_patients(self, connection):
+        connection.execute("CREATE TABLE patients (key TEXT PRIMARY KEY, value TEXT) WITHOUT ROWID")
+        if self._metadata_state is None:
+            print(f"Warning: Metadata file not found at {self.metadata_file}")
+            return
+        with open(self.metadata_file, encoding="utf-8") as f:
+            entries = json.load(f)
+        # Keyed by "Patient ID"; the last entry of a patient wins
+        connection.executemany("INSERT OR REPLACE INTO patients VALUES (?, ?)", (
+            (entry["Patient ID"], json.dumps({k: v for k, v in entry.items() if k not in SAMPLE_FIELDS}))
+            for entry in entries if entry.get("Patient ID")
+        ))
+
+    def mapping(self, mapping_file):
+        # The sample -> patient view of a mapping JSON file, indexed on its own.
+        mapping_file = Path(mapping_file).resolve()
+        found = self._mappings.get(mapping_file)
+        if found is None:
+            state = _source_state(mapping_file)
+
+            def fill(connection):
+                connection.execute("CREATE TABLE sample_to_patient (key TEXT PRIMARY KEY, value TEXT) WITHOUT ROWID")
+                if state is None:
+                    print(f"Warning: Sample to Patient mapping file not found at {mapping_file}")
+                    return
+                with open(mapping_file, encoding="utf-8") as f:
+                    mapping = json.load(f)
+                connection.executemany("INSERT OR REPLACE INTO sample_to_patient VALUES (?, ?)",
+                                       ((str(s), str(p)) for s, p in mapping.items()))
+
+            connection = _open_index(_index_path(self.index_dir, "mapping_index", mapping_file), {str(mapping_file): state}, fill)
+            self._connections.append(connection)
+            found = self._mappings[mapping_file] = LazyMapping(connection, "sample_to_patient", self._fingerprint((str(mapping_file), state)))
+        return found
+
+    def close(self):
+        for connection in self._connections:
+            connection.close()
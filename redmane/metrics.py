@@ -0,0 +1,78 @@
+import json
+import sys
+import time
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+def peak_rss_bytes():
+    # Peak resident set size of this process, or None where the resource module is unavailable.
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is reported in bytes on macOS and in kilobytes on Linux
+    return peak if sys.platform == "darwin" else peak * 1024
+
+class Metrics:
+    # Per-stage wall times and counters collected during one ingest run.
+    # Stages are timed with `with metrics.stage("name"):`; counters are plain sums.
+
+    def __init__(self):
+        self.stages = {}
+        self.counters = {}
+        self._start = time.perf_counter()
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(name, time.perf_counter() - start)
+
+    def add_time(self, name, seconds):
+        self.stages[name] = self.stages.get(name, 0.0) + seconds
+
+    def count(self, name, value=1):
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    def timed_iter(self, name, iterable):
+        # Yields from iterable, charging the time spent waiting for each item to stage `name`.
+        iterator = iter(iterable)
+        clock = time.perf_counter
+        while True:
+            start = clock()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                self.add_time(name, clock() - start)
+                return
+            self.add_time(name, clock() - start)
+            yield item
+
+    def as_dict(self):
+        total = time.perf_counter() - self._start
+        files = self.counters.get("files", 0)
+        scan_seconds = self.stages.get("scan", 0.0)
+        return {
+            "total_seconds": round(total, 6),
+            "stages": {name: round(seconds, 6) for name, seconds in self.stages.items()},
+            "counters": dict(self.counters),
+            "files_per_sec": round(files / scan_seconds, 1) if scan_seconds > 0 else None,
+            "peak_rss_bytes": peak_rss_bytes()
+        }
+
+    def report(self):
+        data = self.as_dict()
+        stages = ", ".join(f"{name} {seconds:.2f}s" for name, seconds in data["stages"].items())
+        rss = data["peak_rss_bytes"]
+        rss_text = f", peak RSS {rss / (1024 * 1024):.0f} MB" if rss else ""
+        print(f" | Metrics: {stages}; {data['counters'].get('files', 0)} files ({data['files_per_sec'] or 0} files/s){rss_text}")
+
+    def write(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.as_dict(), f, indent=4)
+        print(f"Metrics written to: {path}")
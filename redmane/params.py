@@ -1,3 +1,4 @@
+import os
 from pathlib import Path
 
 # Base directory where params.py resides
@@ -6,8 +7,64 @@ BASE_DIR = Path(__file__).resolve().parent
 OUTPUT_JSON_FILE_NAME = "output.json"
 OUTPUT_HTML_FILE_NAME = "output.html"
 
-CONVERT_FROM_BYTES = 1024
+# Data loaded by output.html: summary, paged records and search index (see generate_html.py)
+OUTPUT_VIEWER_DIR_NAME = "output_viewer"
+VIEWER_PAGE_SIZE = 1000
+
+# Output manifest file per --output-format
+OUTPUT_FILE_NAMES = {
+    "json": OUTPUT_JSON_FILE_NAME,
+    "jsonl": "output.jsonl",
+    "parquet": "output.parquet",
+    "arrow": "output.arrow"
+}
+
+# Combined index written to --output-dir by batch mode (--batch)
+BATCH_INDEX_FILE_NAME = "batch_index.json"
+
+# Summary of the non-JSON manifests, written next to them (output.parquet -> output.summary.json)
+SUMMARY_SUFFIX = ".summary.json"
+
+# Records per Parquet row group
+PARQUET_BATCH_SIZE = 65536
+
+# Units for rendering sizes (--size-unit); records and totals keep exact byte counts.
+# Binary multiples: "KB" is the 1024-byte unit used by earlier manifests.
+SIZE_UNITS = {"B": 1, "KB": 1024, "MB": 1024 ** 2, "GB": 1024 ** 3, "TB": 1024 ** 4}
 FILE_SIZE_UNIT = "KB"
+CONVERT_FROM_BYTES = SIZE_UNITS[FILE_SIZE_UNIT]
+
+# --watch: seconds without new changes before the manifest is updated, longest wait during a
+# continuous burst, and the polling interval where inotify is unavailable (or with --poll-interval)
+WATCH_DEBOUNCE = 2.0
+WATCH_MAX_DELAY = 60.0
+WATCH_POLL_INTERVAL = 30.0
+
+# Seconds between the HTML viewer's checks of output_viewer/version.json in watch mode
+VIEWER_POLL_SECONDS = 15
+
+# Number of threads listing directories concurrently during a scan (1 = serial walk)
+SCAN_WORKERS = min(32, (os.cpu_count() or 1) + 4)
+
+# --scan-mode async: listings, stats and summary header reads in flight at once (network filesystems)
+SCAN_CONCURRENCY = 64
+
+# Scan-state cache written next to the output JSON (output.json -> output.scan_cache.jsonl)
+SCAN_CACHE_SUFFIX = ".scan_cache.jsonl"
+
+# redmane-diff: old-manifest bytes per hash partition held in memory at once, and the most
+# partitions (temporary files) it spills to
+DIFF_PARTITION_BYTES = 64 * 1024 ** 2
+DIFF_MAX_PARTITIONS = 512
+
+# Patient/sample inverted index written next to the output manifest (output.json -> output.index.sqlite),
+# and the records buffered before each insert into it
+INDEX_SUFFIX = ".index.sqlite"
+INDEX_BATCH_SIZE = 10000
+
+# Opt-in content checksums: hashing threads and read buffer size
+CHECKSUM_WORKERS = os.cpu_count() or 1
+CHECKSUM_CHUNK_SIZE = 8 * 1024 * 1024
 
 # Default file types REMOVED. Strict config via config.json is now mandatory.
 # See config.py for validation logic.
@@ -16,4 +73,7 @@ FILE_SIZE_UNIT = "KB"
 SAMPLE_METADATA_DIR = BASE_DIR / "sample_metadata"
 METADATA = SAMPLE_METADATA_DIR / "sample_metadata.json"
 SAMPLE_TO_PATIENT = SAMPLE_METADATA_DIR / "sample_to_patient.json"
+
+# On-disk SQLite indexes built from the metadata JSON files (see metadata_store.py)
+METADATA_INDEX_DIR = Path(os.environ.get("XDG_CACHE_HOME", Path.home() / ".cache")) / "redmane"
 ORGANIZATION = "National Academy of Taiwan"
@@ -0,0 +1,148 @@
+import os
+import re
+import threading
+
+def translate_pattern(pattern):
+    # Translates one gitignore-style pattern into (regex, negated, dir_only), matched against
+    # paths relative to the dataset root with "/" separators:
+    #   "work/"        a directory named work, at any depth (everything below it is skipped)
+    #   "*.log"        any file or directory whose name ends in .log, at any depth
+    #   "/tmp*"        only at the dataset root (a pattern with a "/" before its end is anchored)
+    #   "Raw/**/qc"    ** matches any number of directories; * and ? never match "/"
+    #   "!keep.log"    negation: re-includes what an earlier pattern excluded
+    # Raises ValueError for patterns that cannot be compiled.
+    # A leading "\!" matches a literal "!"
+    negated = pattern.startswith("!")
+    if negated:
+        pattern = pattern[1:]
+    dir_only = pattern.endswith("/")
+    pattern = pattern.rstrip("/")
+    if not pattern:
+        raise ValueError("empty pattern")
+    anchored = "/" in pattern
+    pattern = pattern.lstrip("/")
+
+    parts = []
+    i = 0
+    while i < len(pattern):
+        char = pattern[i]
+        if pattern.startswith("**", i):
+            at_start = i == 0 or pattern[i - 1] == "/"
+            if at_start and pattern.startswith("**/", i):
+                # Zero or more leading directories
+                parts.append("(?:.*/)?")
+                i += 3
+                continue
+            if at_start and i + 2 == len(pattern):
+                # Everything inside
+                parts.append(".*")
+                i += 2
+                continue
+            parts.append("[^/]*")
+            i += 2
+        elif char == "\\" and i + 1 < len(pattern):
+            # Escaped literal, e.g. "\*"
+            parts.append(re.escape(pattern[i + 1]))
+            i += 2
+        elif char == "*":
+            parts.append("[^/]*")
+            i += 1
+        elif char == "?":
+            parts.append("[^/]")
+            i += 1
+        elif char == "[":
+            end = pattern.find("]", i + 2)
+            if end < 0:
+                raise ValueError("unterminated character class")
+            body = pattern[i + 1:end]
+            if body.startswith("!"):
+                body = "^" + body[1:]
+            parts.append("[" + body.replace("\\", "\\\\") + "]")
+            i = end + 1
+        else:
+            parts.append(re.escape(char))
+            i += 1
+    prefix = "" if anchored else "(?:.*/)?"
+    try:
+        return re.compile(prefix + "".join(parts) + r"\Z"), negated, dir_only
+    except re.error as e:
+        raise ValueError(str(e)) from e
+
+class PathFilter:
+    # The include/exclude patterns of config.json, compiled once per scan.
+    # exclude: gitignore semantics. The last matching pattern decides, and "!" re-includes.
+    # The walkers test directories before listing them, so an excluded directory is never read.
+    # A file inside an excluded directory cannot be re-included.
+    # include: if given, only files (and containers) that match one of these patterns, or that
+    # lie inside a directory that does, are scanned. Every directory is still listed unless excluded.
+    # excluded_dirs and excluded_files count what was skipped; the walkers' threads add to them.
+
+    def __init__(self, root, exclude=(), include=()):
+        self.root = os.fspath(root).rstrip(os.sep) + os.sep
+        self._exclude = [translate_pattern(p) for p in exclude]
+        self._include = [translate_pattern(p)[::2] for p in include]
+        self._include_dirs = {}
+        # Without negations the first match decides: one combined regex per entry type
+        self._combined = None
+        if not any(negated for _, negated, _ in self._exclude):
+            self._combined = (self._join(regex for regex, _, _ in self._exclude),
+                              self._join(regex for regex, _, dir_only in self._exclude if not dir_only))
+        self.excluded_dirs = 0
+        self.excluded_files = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _join(regexes):
+        patterns = [regex.pattern for regex in regexes]
+        return re.compile("|".join(f"(?:{p})" for p in patterns)) if patterns else None
+
+    def relative(self, path):
+        # "Raw/run1/a.fastq" for <root>/Raw/run1/a.fastq
+        if path.startswith(self.root):
+            rel = path[len(self.root):]
+        else:
+            rel = os.path.relpath(path, self.root)
+        return rel if os.sep == "/" else rel.replace(os.sep, "/")
+
+    def excluded(self, rel, is_dir):
+        # Whether the exclude patterns skip this entry (not its parents, which the walk has pruned).
+        if self._combined is not None:
+            regex = self._combined[0 if is_dir else 1]
+            return regex is not None and regex.match(rel) is not None
+        for regex, negated, dir_only in reversed(self._exclude):
+            if (is_dir or not dir_only) and regex.match(rel):
+                return not negated
+        return False
+
+    def _matches_include(self, rel, is_dir):
+        return any((is_dir or not dir_only) and regex.match(rel) for regex, dir_only in self._include)
+
+    def _dir_included(self, rel_dir):
+        # Memoized per directory; concurrent walkers may compute the same entry twice, harmlessly.
+        included = self._include_dirs.get(rel_dir)
+        if included is None:
+            parent = rel_dir.rpartition("/")[0]
+            included = self._matches_include(rel_dir, True) or (bool(parent) and self._dir_included(parent))
+            self._include_dirs[rel_dir] = included
+        return included
+
+    def skips(self, rel, is_dir=False):
+        # Whether a classified file (or a container directory) at `rel` is left out of the scan.
+        if self.excluded(rel, is_dir):
+            return True
+        if not self._include:
+            return False
+        parent = rel.rpartition("/")[0]
+        return not (self._matches_include(rel, is_dir) or (bool(parent) and self._dir_included(parent)))
+
+    def tally(self, dirs, files):
+        if dirs or files:
+            with self._lock:
+                self.excluded_dirs += dirs
+                self.excluded_files += files
+
+def compile_path_filter(root, exclude=None, include=None):
+    # None when there is nothing to filter, so the walkers skip the checks entirely.
+    if not exclude and not include:
+        return None
+    return PathFilter(root, exclude or (), include or ())
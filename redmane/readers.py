@@ -0,0 +1,214 @@
+import json
+import re
+import sys
+from pathlib import Path
+from .params import FILE_SIZE_UNIT, SUMMARY_SUFFIX
+from .checksums import CHECKSUM_ALGORITHMS
+
+# Characters read from a JSON manifest at a time
+READ_CHUNK = 1 << 20
+
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+
+class _JSONStream:
+    # Minimal pull parser for one large JSON document: structural characters are consumed one by
+    # one and each value (e.g. one file record) is decoded on its own with the C decoder, so only
+    # the current chunk and value are in memory.
+
+    def __init__(self, f):
+        self._f = f
+        self._decoder = json.JSONDecoder()
+        self._buf = ""
+        self._pos = 0
+        self._eof = False
+
+    def _fill(self):
+        chunk = self._f.read(READ_CHUNK)
+        if not chunk:
+            self._eof = True
+            return False
+        self._buf = self._buf[self._pos:] + chunk
+        self._pos = 0
+        return True
+
+    def peek(self):
+        # Next non-whitespace character ("" at the end of the document).
+        while True:
+            self._pos = _WHITESPACE.match(self._buf, self._pos).end()
+            if self._pos < len(self._buf):
+                return self._buf[self._pos]
+            if not self._fill():
+                return ""
+
+    def expect(self, chars):
+        char = self.peek()
+        if not char or char not in chars:
+            raise ValueError(f"expected one of {chars!r} at character {self._pos} of the current chunk, found {char!r}")
+        self._pos += 1
+        return char
+
+    def value(self):
+        self.peek()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buf, self._pos)
+                # A value ending exactly at the end of the chunk (e.g. a number) may continue
+                if end < len(self._buf) or self._eof:
+                    self._pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self._eof:
+                    raise
+            self._fill()
+
+    def keys(self):
+        # Iterates the keys of the object at the current position; the caller consumes each value.
+        self.expect("{")
+        if self.peek() == "}":
+            self._pos += 1
+            return
+        while True:
+            key = self.value()
+            self.expect(":")
+            yield key
+            if self.expect(",}") == "}":
+                return
+
+class ManifestReader:
+    # Streams the (category, record) pairs of a manifest written by any --output-format
+    # (output.json, .jsonl, .parquet, .arrow; chosen by suffix) without loading it whole.
+    # location and size_unit are filled in from the manifest as it is read. For a JSON manifest
+    # written by this package they are known before the first record.
+
+    def __init__(self, path):
+        self.path = Path(path)
+        suffix = self.path.suffix.lower()
+        self.format = {".jsonl": "jsonl", ".parquet": "parquet", ".arrow": "arrow", ".feather": "arrow"}.get(suffix, "json")
+        self.location = None
+        self.size_unit = FILE_SIZE_UNIT
+
+    def __iter__(self):
+        if self.format == "json":
+            return self._iter_json()
+        if self.format == "jsonl":
+            return self._iter_jsonl()
+        return self._iter_columnar()
+
+    def _iter_json(self):
+        # {"data": {"location": ..., "file_size_unit": ..., "summary": ..., "files": {"<category>": [...]}}}
+        with open(self.path, "r", encoding="utf-8") as f:
+            stream = _JSONStream(f)
+            for key in stream.keys():
+                if key != "data":
+                    stream.value()
+                    continue
+                for data_key in stream.keys():
+                    if data_key != "files":
+                        value = stream.value()
+                        if data_key == "location":
+                            self.location = value
+                        elif data_key == "file_size_unit":
+                            self.size_unit = value
+                        continue
+                    for category in stream.keys():
+                        stream.expect("[")
+                        if stream.peek() == "]":
+                            stream.expect("]")
+                            continue
+                        while True:
+                            yield category, stream.value()
+                            if stream.expect(",]") == "]":
+                                break
+
+    def _iter_jsonl(self):
+        # The unit is in the summary sidecar (output.jsonl -> output.summary.json), if there is one
+        sidecar = self.path.with_name(self.path.stem + SUMMARY_SUFFIX)
+        if sidecar.exists():
+            with open(sidecar, "r", encoding="utf-8") as f:
+                self.size_unit = json.load(f).get("file_size_unit", self.size_unit)
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    record = json.loads(line)
+                    yield record.pop("category"), record
+
+    def _open_columnar(self):
+        # (source, metadata) of a Parquet or Arrow manifest.
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            print(f"\nERROR: reading {self.path.name} requires pyarrow. Install it with 'pip install pyarrow'.")
+            sys.exit(1)
+        if self.format == "parquet":
+            source = pq.ParquetFile(self.path)
+            return source, source.schema_arrow.metadata or {}
+        source = pa.ipc.open_file(pa.memory_map(str(self.path)))
+        return source, source.schema.metadata or {}
+
+    def _iter_columnar(self):
+        # One record batch at a time; columns are turned back into the JSON record layout.
+        source, metadata = self._open_columnar()
+        if self.format == "parquet":
+            batches = source.iter_batches()
+        else:
+            batches = (source.get_batch(i) for i in range(source.num_record_batches))
+        self.location = metadata.get(b"location", b"").decode() or None
+        self.size_unit = metadata.get(b"file_size_unit", self.size_unit.encode()).decode()
+        for batch in batches:
+            for row in batch.to_pylist():
+                yield row.pop("category"), _record_from_row(row)
+
+    def read_extents(self, extents):
+        # Random access: the record at each (block, offset, length) extent, in the order given.
+        # Extents are those of writers.py (last_extent), with JSON offsets already made absolute:
+        # a byte range for JSON and JSONL, (row group, row) for Parquet and Arrow. Only those
+        # records (or row groups) are read.
+        order = sorted(range(len(extents)), key=lambda i: extents[i][:2])
+        records = [None] * len(extents)
+        if self.format in ("json", "jsonl"):
+            with open(self.path, "rb") as f:
+                for i in order:
+                    _, offset, length = extents[i]
+                    f.seek(offset)
+                    records[i] = json.loads(f.read(length))
+                    if self.format == "jsonl":
+                        records[i].pop("category")
+            return records
+        source, _ = self._open_columnar()
+        blocks = {}
+        for i in order:
+            blocks.setdefault(extents[i][0], []).append(i)
+        for block, indexes in blocks.items():
+            batch = source.read_row_group(block) if self.format == "parquet" else source.get_batch(block)
+            for i, row in zip(indexes, batch.take([extents[i][1] for i in indexes]).to_pylist()):
+                del row["category"]
+                records[i] = _record_from_row(row)
+        return records
+
+def _single(values):
+    # Inverse of records.as_list: one ID is a string, none is "".
+    if len(values) == 1:
+        return values[0]
+    return values if values else ""
+
+def _record_from_row(row):
+    record = {
+        "file_name": row["file_name"],
+        "file_size": row["file_size"],
+        "file_size_bytes": row["file_size_bytes"],
+        "directory": row["directory"],
+        "organization": row["organization"],
+        "sample_id": _single(row["sample_id"] or []),
+        "patient_id": _single(row["patient_id"] or [])
+    }
+    if row.get("file_count") is not None:
+        record["file_count"] = row["file_count"]
+    if row.get("unmapped_sample_ids"):
+        record["unmapped_sample_ids"] = row["unmapped_sample_ids"]
+    if row.get("patient_metadata") is not None:
+        record["patient_metadata"] = json.loads(row["patient_metadata"])
+    for algorithm in CHECKSUM_ALGORITHMS:
+        if row.get(algorithm) is not None:
+            record[algorithm] = row[algorithm]
+    return record
@@ -0,0 +1,166 @@
+from array import array
+from collections.abc import Mapping, Sequence
+import sys
+from .params import FILE_SIZE_UNIT
+from .units import convert_size
+
+# Keys every scanned record starts with, in output order (see auxiliary._build_record)
+RECORD_KEYS = ("file_name", "file_size", "file_size_bytes", "directory", "organization", "sample_id", "patient_id")
+
+def as_list(value):
+    # Normalizes the string-or-list sample_id/patient_id fields of a record.
+    if isinstance(value, list):
+        return value
+    return [value] if value else []
+
+class StringTable:
+    # Dictionary encoding: each distinct string is kept once and referenced by its index.
+    __slots__ = ("strings", "_ids")
+
+    def __init__(self):
+        self.strings = []
+        self._ids = {}
+
+    def encode(self, value):
+        index = self._ids.get(value)
+        if index is None:
+            index = self._ids[value] = len(self.strings)
+            self.strings.append(value)
+        return index
+
+def _pack_ids(value):
+    # sample_id / patient_id: a string, or a tuple for several IDs (smaller than a list).
+    # Patient IDs repeat across files and are interned.
+    if isinstance(value, str):
+        return sys.intern(value)
+    return tuple(sys.intern(v) if isinstance(v, str) else v for v in value)
+
+def _pack_sample(value, name):
+    # Most sample IDs are the file name without its extension: only the prefix length is kept.
+    if isinstance(value, str):
+        return len(value) if name.startswith(value) else value
+    return tuple(value)
+
+def _unpack_ids(value):
+    return list(value) if isinstance(value, tuple) else value
+
+class CategoryRecords(Sequence):
+    # The records of one category as parallel columns: file names, dictionary-encoded parent
+    # directories and organizations, exact sizes in an int64 array, sample IDs (as a prefix
+    # length of the file name where possible) and interned patient IDs.
+    # Optional keys (file_count, unmapped_sample_ids, patient_metadata, checksums) are kept only
+    # for the rows that have them. Rows that do not follow the scanned record layout (e.g. read
+    # from an old manifest) are kept as they are.
+    # Indexing builds a fresh record dict in the manifest schema; changing it does not change the store.
+
+    def __init__(self, strings, size_unit):
+        self._strings = strings
+        self._size_unit = size_unit
+        self._names = []
+        self._dirs = array("I")
+        self._orgs = array("I")
+        self._sizes = array("q")
+        self._samples = []
+        self._patients = []
+        self._extras = {}
+        self._verbatim = {}
+
+    def append(self, record):
+        row = len(self._names)
+        name = record.get("file_name")
+        parent, sep, tail = str(record.get("directory", "")).rpartition("/")
+        size_bytes = record.get("file_size_bytes")
+        if (tuple(record)[:len(RECORD_KEYS)] != RECORD_KEYS or not sep or tail != name
+                or not isinstance(size_bytes, int) or record["file_size"] != convert_size(size_bytes, self._size_unit)):
+            self._verbatim[row] = record
+            name, parent, size_bytes, sample_id, patient_id = "", "", 0, "", ""
+        else:
+            sample_id, patient_id = _pack_sample(record["sample_id"], name), _pack_ids(record["patient_id"])
+            if len(record) > len(RECORD_KEYS):
+                self._extras[row] = {key: record[key] for key in list(record)[len(RECORD_KEYS):]}
+        self._names.append(name)
+        self._dirs.append(self._strings.encode(parent))
+        self._orgs.append(self._strings.encode(record.get("organization", "")))
+        self._sizes.append(size_bytes)
+        self._samples.append(sample_id)
+        self._patients.append(patient_id)
+        return row
+
+    def __len__(self):
+        return len(self._names)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("record index out of range")
+        verbatim = self._verbatim.get(index)
+        if verbatim is not None:
+            return verbatim
+        strings = self._strings.strings
+        name = self._names[index]
+        size_bytes = self._sizes[index]
+        sample_id = self._samples[index]
+        record = {
+            "file_name": name,
+            "file_size": convert_size(size_bytes, self._size_unit),
+            "file_size_bytes": size_bytes,
+            "directory": f"{strings[self._dirs[index]]}/{name}",
+            "organization": strings[self._orgs[index]],
+            "sample_id": name[:sample_id] if isinstance(sample_id, int) else _unpack_ids(sample_id),
+            "patient_id": _unpack_ids(self._patients[index])
+        }
+        extras = self._extras.get(index)
+        if extras:
+            record.update(extras)
+        return record
+
+    def __eq__(self, other):
+        if not isinstance(other, Sequence) or isinstance(other, str):
+            return NotImplemented
+        return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+
+    def __repr__(self):
+        return f"<CategoryRecords: {len(self)} records>"
+
+class RecordStore(Mapping):
+    # Compact in-memory alternative to {category: [record dict, ...]}: a read-only mapping of
+    # category -> CategoryRecords, sharing one string table for directories and organizations.
+    # Has the writer interface (add/close/count, see writers.py), so it can collect a scan;
+    # records are turned back into dicts only when they are read for output.
+
+    def __init__(self, categories=(), size_unit=FILE_SIZE_UNIT):
+        self.size_unit = size_unit
+        self.count = 0
+        self._strings = StringTable()
+        self._categories = {}
+        for category in categories:
+            self._category(category)
+
+    def _category(self, category):
+        records = self._categories.get(category)
+        if records is None:
+            records = self._categories[sys.intern(category)] = CategoryRecords(self._strings, self.size_unit)
+        return records
+
+    def add(self, category, record):
+        # Returns the record's row in its category.
+        self.count += 1
+        return self._category(category).append(record)
+
+    def close(self):
+        pass
+
+    def __getitem__(self, category):
+        return self._categories[category]
+
+    def __iter__(self):
+        return iter(self._categories)
+
+    def __len__(self):
+        return len(self._categories)
+
+    def __repr__(self):
+        return f"<RecordStore: {self.count} records in {len(self)} categories>"
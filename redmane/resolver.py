@@ -0,0 +1,58 @@
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Unmapped sample IDs printed in the end-of-scan report; each record lists all of its own
+REPORT_SAMPLE_LIMIT = 10
+
+class PatientResolver:
+    # Maps whole batches of sample IDs (e.g. every row or sample column of a summarised table)
+    # to patient IDs. An indexed mapping (see metadata_store.py) answers a batch with a few
+    # IN (...) queries instead of one query per sample; a plain dict is looked up directly.
+    # Samples missing from the mapping are returned to the caller and tallied for the
+    # end-of-scan data-quality report rather than dropped silently.
+
+    def __init__(self, sample_to_patient):
+        self.sample_to_patient = sample_to_patient
+        self.unmapped = {}  # sample ID -> number of summary files it appears in unmapped
+        self.files_with_unmapped = 0
+
+    def _lookup(self, sample_ids):
+        # {sample: patient} covering the mapped samples of the batch.
+        get_many = getattr(self.sample_to_patient, "get_many", None)
+        if get_many is not None:
+            return get_many(sample_ids)
+        return self.sample_to_patient
+
+    def resolve(self, sample_ids):
+        # Returns (patient_ids, unmapped_sample_ids): the unique patients of sample_ids in order of
+        # first appearance, and the samples without a (non-empty) patient in the mapping.
+        if not sample_ids:
+            return [], []
+        found = self._lookup(sample_ids)
+        patients = {}
+        unmapped = []
+        for sample in sample_ids:
+            patient = found.get(sample)
+            if patient is None or patient == "":
+                unmapped.append(sample)
+            else:
+                patients[patient] = None
+        return list(patients), unmapped
+
+    def tally(self, unmapped_sample_ids):
+        # Counts the unmapped samples of one record towards the end-of-scan report.
+        if not unmapped_sample_ids:
+            return
+        self.files_with_unmapped += 1
+        for sample in unmapped_sample_ids:
+            self.unmapped[sample] = self.unmapped.get(sample, 0) + 1
+
+    def report(self):
+        if not self.unmapped:
+            return
+        shown = ", ".join(list(self.unmapped)[:REPORT_SAMPLE_LIMIT])
+        more = len(self.unmapped) - REPORT_SAMPLE_LIMIT
+        suffix = f", ... and {more} more" if more > 0 else ""
+        print(f" | Unmapped samples: {len(self.unmapped)} sample IDs in {self.files_with_unmapped} summary files have no patient in the mapping ({shown}{suffix})")
+        logger.debug(f"   Unmapped sample IDs: {sorted(self.unmapped)}")
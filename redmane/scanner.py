@@ -0,0 +1,166 @@
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from .params import SCAN_WORKERS
+from .containers import measure_container
+
+logger = logging.getLogger(__name__)
+
+# Directory listings read ahead of the consumer, per worker (see _walk_parallel)
+READ_AHEAD_PER_WORKER = 4
+
+class ScannedFile:
+    # The DirEntry-like view of one walked file or container directory (path, name and its stat
+    # result; a ContainerStat for containers) handed out by both walkers.
+    __slots__ = ("path", "name", "_stat")
+
+    def __init__(self, path, name, st):
+        self.path = path
+        self.name = name
+        self._stat = st
+
+    def stat(self):
+        return self._stat
+
+def list_dir(path, classify, classify_container=None, path_filter=None, scandir=os.scandir):
+    # Lists one directory and returns ([(DirEntry, match, is_container)], [subdirectory paths]).
+    # Shared by both walkers (this module and async_scanner.py); nothing is stat'd here, each
+    # walker decides when to stat the matched files and measure the containers.
+    # Subdirectories for which classify_container returns a match are containers (see
+    # containers.py): they are returned as one matched item and not descended into.
+    # With a PathFilter (see patterns.py), excluded subdirectories are dropped before anything
+    # below them is read, and excluded matched files before they are stat'd.
+    files = []
+    subdirs = []
+    skipped_dirs = skipped_files = 0
+    try:
+        with scandir(path) as it:
+            for entry in it:
+                try:
+                    # Symlinked directories are not descended into (same as Path.rglob)
+                    if entry.is_dir(follow_symlinks=False):
+                        rel = path_filter.relative(entry.path) if path_filter is not None else None
+                        if rel is not None and path_filter.excluded(rel, True):
+                            skipped_dirs += 1
+                            continue
+                        match = None
+                        if classify_container is not None and not entry.name.startswith('.'):
+                            match = classify_container(entry.name)
+                        if match is None:
+                            subdirs.append(entry.path)
+                        elif rel is not None and path_filter.skips(rel, True):
+                            skipped_files += 1
+                        else:
+                            files.append((entry, match, True))
+                    elif entry.is_file():
+                        if entry.name.startswith('.'):
+                            continue
+                        match = classify(entry.name)
+                        if match is None:
+                            continue
+                        if path_filter is not None and path_filter.skips(path_filter.relative(entry.path)):
+                            skipped_files += 1
+                            continue
+                        files.append((entry, match, False))
+                except OSError:
+                    continue
+    except OSError as e:
+        logger.warning(f"   ! Could not list directory {path}: {e}")
+    if path_filter is not None:
+        path_filter.tally(skipped_dirs, skipped_files)
+    return files, subdirs
+
+def _list_and_stat(path, classify, classify_container=None, shallow_containers=False, path_filter=None):
+    # The threaded walker stats every matched file (and measures every container) on the worker
+    # that listed its directory, so the caller gets (ScannedFile, match) pairs ready to use.
+    # A file's stat is the one its DirEntry caches (free on Windows, one call on POSIX).
+    listed, subdirs = list_dir(path, classify, classify_container, path_filter)
+    files = []
+    for entry, match, is_container in listed:
+        try:
+            st = measure_container(entry.path, shallow_containers) if is_container else entry.stat()
+        except OSError:
+            # Vanished between listing and stat
+            continue
+        files.append((ScannedFile(entry.path, entry.name, st), match))
+    return files, subdirs
+
+def _walk_serial(root, list_dir):
+    # Depth-first, pre-order walk in a single thread.
+    stack = [root]
+    while stack:
+        files, subdirs = list_dir(stack.pop())
+        yield from files
+        stack.extend(reversed(subdirs))
+
+def _walk_parallel(root, list_dir, workers, pool=None):
+    # Lists directories concurrently but yields results in the same pre-order as the
+    # serial walk. Each worker submits the listings of its subdirectories before it
+    # returns, so the frontier is read ahead while the caller consumes in order.
+    # At most READ_AHEAD_PER_WORKER * workers listings are pending or waiting to be consumed,
+    # so a wide tree is not held in memory; the caller submits the next directories in walk
+    # order as it consumes, and lists a directory itself if none was read ahead.
+    # With a shared `pool` (batch mode), listings run on it and it is left open afterwards.
+    own_pool = pool is None
+    if own_pool:
+        pool = ThreadPoolExecutor(max_workers=workers)
+    limit = max(workers or 1, 1) * READ_AHEAD_PER_WORKER
+    futures = {}
+    lock = threading.Lock()
+    stopped = False
+
+    def read_ahead(paths):
+        # Submits listings of `paths` in order until the limit; called with the lock held.
+        for path in paths:
+            if stopped or len(futures) >= limit:
+                # The caller stopped iterating, or enough is read ahead
+                break
+            if path in futures:
+                continue
+            try:
+                futures[path] = pool.submit(list_and_expand, path)
+            except RuntimeError:
+                # Pool is shutting down
+                break
+
+    def list_and_expand(path):
+        files, subdirs = list_dir(path)
+        with lock:
+            read_ahead(subdirs)
+        return files, subdirs
+
+    try:
+        with lock:
+            read_ahead([root])
+        stack = [root]
+        while stack:
+            path = stack.pop()
+            with lock:
+                future = futures.pop(path, None)
+            files, subdirs = future.result() if future is not None else list_dir(path)
+            stack.extend(reversed(subdirs))
+            with lock:
+                read_ahead(reversed(stack[-limit:]))
+            yield from files
+    finally:
+        with lock:
+            stopped = True
+            for future in futures.values():
+                future.cancel()
+        if own_pool:
+            pool.shutdown(wait=True)
+
+def walk_dataset(root, classify, workers=SCAN_WORKERS, pool=None, classify_container=None, shallow_containers=False, path_filter=None):
+    # Recursively walks root and yields (ScannedFile, match) for every non-hidden file
+    # for which classify(file_name) returns a match other than None. The order matches
+    # Path.rglob('*'), whatever the number of workers.
+    # Container directories (classify_container(dir_name) is not None) are yielded once as a
+    # (ScannedFile, match) whose stat() sums their contents; with shallow_containers their
+    # contents are not walked at all.
+    # path_filter (see patterns.py) applies the include/exclude patterns of config.json.
+    root = os.fspath(root)
+    list_dir = lambda path: _list_and_stat(path, classify, classify_container, shallow_containers, path_filter)
+    if pool is None and (workers is None or workers <= 1):
+        return _walk_serial(root, list_dir)
+    return _walk_parallel(root, list_dir, workers, pool)
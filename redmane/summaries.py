@@ -0,0 +1,99 @@
+import csv
+import gzip
+
+# Delimiter and comment prefix per summarised table type
+TABLE_FORMATS = {
+    ".csv": (",", None),
+    ".tsv": ("\t", None),
+    ".maf": ("\t", "#")  # MAF is tab-delimited and starts with '#version' comment lines
+}
+
+# Plain and bgzipped VCF (bgzip output is a valid multi-member gzip stream)
+VCF_EXTENSIONS = (".vcf", ".vcf.gz", ".vcf.bgz")
+
+# Fixed VCF columns before the per-sample columns
+VCF_FIXED_COLUMNS = 9  # CHROM POS ID REF ALT QUAL FILTER INFO FORMAT
+
+def _data_lines(f, comment):
+    # Yields non-blank lines, skipping comment lines.
+    for line in f:
+        if not line.strip():
+            continue
+        if comment and line.startswith(comment):
+            continue
+        yield line
+
+def _split(line, sep, limit=-1):
+    # Splits one line into fields; only quoted lines pay for the csv module.
+    if '"' in line:
+        return next(csv.reader([line], delimiter=sep))
+    return line.rstrip("\r\n").split(sep, limit)
+
+def extract_table_sample_ids(file_path, id_column=0) -> list:
+    # Streams a CSV/TSV/MAF table line by line and returns the unique values of its
+    # sample ID column, in order of first appearance. Only one line is held in memory at
+    # a time, so multi-GB tables cost a single pass and the size of the ID set.
+    # id_column is a 0-based column index or a header name (e.g. 'Tumor_Sample_Barcode').
+    sep, comment = TABLE_FORMATS[file_path.suffix.lower()]
+    sample_ids = {}
+
+    with open(file_path, "r", encoding="utf-8", errors="replace", newline="") as f:
+        lines = _data_lines(f, comment)
+        header = next(lines, None)
+        if header is None:
+            return []
+
+        if isinstance(id_column, str):
+            columns = [c.strip() for c in _split(header, sep)]
+            if id_column not in columns:
+                raise ValueError(f"sample ID column '{id_column}' not found in header")
+            index = columns.index(id_column)
+        else:
+            index = id_column
+
+        for line in lines:
+            fields = _split(line, sep, index + 1)
+            if index < len(fields):
+                value = fields[index].strip()
+                if value:
+                    sample_ids[value] = None
+
+    return list(sample_ids)
+
+def is_vcf(file_name: str) -> bool:
+    return file_name.lower().endswith(VCF_EXTENSIONS)
+
+def extract_vcf_sample_ids(file_path) -> list:
+    # Returns the sample names from the '#CHROM' header line of a VCF, reading only the
+    # header. Compressed VCFs are decompressed as a stream, so only the first few KB of a
+    # joint-called .vcf.gz are read. Sites-only VCFs (no FORMAT/sample columns) return [].
+    if file_path.name.lower().endswith(".vcf"):
+        f = open(file_path, "r", encoding="utf-8", errors="replace")
+    else:
+        f = gzip.open(file_path, "rt", encoding="utf-8", errors="replace")
+
+    with f:
+        for line in f:
+            if line.startswith("##"):
+                continue
+            if not line.startswith("#CHROM"):
+                break
+            line = line.rstrip("\r\n")
+            # The spec requires tabs; tolerate space-separated headers written by hand
+            columns = line.split("\t") if "\t" in line else line.split()
+            return [c for c in columns[VCF_FIXED_COLUMNS:] if c]
+
+    raise ValueError("no '#CHROM' header line found")
+
+def has_sample_ids(file_path) -> bool:
+    # Whether a summarised file is a table or VCF whose contents list its sample IDs.
+    return file_path.suffix in TABLE_FORMATS or is_vcf(file_path.name)
+
+def read_summary_sample_ids(file_path, sample_id_columns=None) -> list:
+    # Sample IDs listed inside a summarised table (ID column) or VCF (header sample columns).
+    if is_vcf(file_path.name):
+        # Sample columns of the '#CHROM' header line; the variant records are never read
+        return extract_vcf_sample_ids(file_path)
+    # Stream only the sample ID column; the first column unless config names another one
+    id_column = (sample_id_columns or {}).get(file_path.suffix.lower(), 0)
+    return extract_table_sample_ids(file_path, id_column)
@@ -0,0 +1,82 @@
+from .params import FILE_SIZE_UNIT
+from .records import as_list
+from .units import convert_size, format_size, record_size_bytes
+
+def size_bucket(size):
+    # Histogram bucket of a file size in bytes: 0 for empty files, else n such that 2**(n-1) <= size < 2**n.
+    return size.bit_length() if size > 0 else 0
+
+def bucket_range(bucket):
+    # (min, max) file size of a histogram bucket, both inclusive.
+    if bucket == 0:
+        return 0, 0
+    return 1 << (bucket - 1), (1 << bucket) - 1
+
+class SummaryStats:
+    # Aggregates that used to be recomputed from every record by each consumer (the HTML viewer,
+    # downstream tools): totals, unique patients and samples, per-category file counts, sizes and
+    # size histograms, and the number of files per patient. Fed one record at a time during the
+    # scan (same add/close interface as the writers in writers.py), so it costs O(1) per record
+    # plus the sets of unique IDs.
+    # Sizes are summed in exact bytes and rendered in `size_unit` (see units.py) by as_dict.
+
+    def __init__(self, categories, size_unit=FILE_SIZE_UNIT):
+        self.size_unit = size_unit
+        self.count = 0
+        self.total_size = 0
+        self.categories = {}
+        for category in categories:
+            self._add_category(category)
+        self._patients = set()
+        self._samples = set()
+        self.files_per_patient = {}
+
+    def _add_category(self, category):
+        self.categories[category] = {"files": 0, "size": 0, "histogram": {}}
+
+    def add(self, category, record):
+        if category not in self.categories:
+            self._add_category(category)
+        stats = self.categories[category]
+        size = record_size_bytes(record, self.size_unit)
+        stats["files"] += 1
+        self.count += 1
+        if size is not None:
+            # Shallow containers (unknown size) are counted but left out of sizes and histograms
+            stats["size"] += size
+            bucket = size_bucket(size)
+            stats["histogram"][bucket] = stats["histogram"].get(bucket, 0) + 1
+            self.total_size += size
+
+        self._samples.update(as_list(record["sample_id"]))
+        for patient_id in as_list(record["patient_id"]):
+            self._patients.add(patient_id)
+            self.files_per_patient[patient_id] = self.files_per_patient.get(patient_id, 0) + 1
+
+    def close(self):
+        pass
+
+    def as_dict(self):
+        categories = {}
+        for category, stats in self.categories.items():
+            histogram = []
+            for bucket in sorted(stats["histogram"]):
+                low, high = bucket_range(bucket)
+                histogram.append({"min_bytes": low, "max_bytes": high, "files": stats["histogram"][bucket]})
+            categories[category] = {
+                "files": stats["files"],
+                "size": convert_size(stats["size"], self.size_unit),
+                "size_bytes": stats["size"],
+                "size_histogram": histogram
+            }
+        return {
+            "total_files": self.count,
+            "total_size": convert_size(self.total_size, self.size_unit),
+            "total_size_bytes": self.total_size,
+            "total_size_human": format_size(self.total_size),
+            "file_size_unit": self.size_unit,
+            "unique_patients": len(self._patients),
+            "unique_samples": len(self._samples),
+            "categories": categories,
+            "files_per_patient": dict(sorted(self.files_per_patient.items()))
+        }
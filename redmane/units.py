@@ -0,0 +1,34 @@
+from .params import FILE_SIZE_UNIT, SIZE_UNITS
+
+# Units rendered as whole numbers (as in earlier manifests); larger units keep SIZE_DECIMALS
+WHOLE_UNITS = ("B", "KB")
+SIZE_DECIMALS = 3
+
+def convert_size(size_bytes, unit=FILE_SIZE_UNIT):
+    # Renders an exact byte count in `unit`. Only rendered values are rounded: totals are
+    # converted from the exact sum, never summed from per-file rounded values.
+    factor = SIZE_UNITS[unit]
+    if factor == 1:
+        return size_bytes
+    if unit in WHOLE_UNITS:
+        return round(size_bytes / factor)
+    return round(size_bytes / factor, SIZE_DECIMALS)
+
+def format_size(size_bytes):
+    # Human-readable size in the largest unit that keeps the value >= 1, e.g. "4.8 GB" or "512 B".
+    unit = "B"
+    for name, factor in SIZE_UNITS.items():
+        if size_bytes >= factor:
+            unit = name
+    if unit == "B":
+        return f"{size_bytes} B"
+    return f"{size_bytes / SIZE_UNITS[unit]:.1f} {unit}"
+
+def record_size_bytes(record, unit=FILE_SIZE_UNIT):
+    # Exact size of a record. Manifests written before file_size_bytes only have the rounded
+    # file_size in `unit`, which is the best available estimate. None for a record of unknown
+    # size (a container scanned with --shallow-containers).
+    size_bytes = record.get("file_size_bytes")
+    if size_bytes is None and record["file_size"] is not None:
+        size_bytes = round(record["file_size"] * SIZE_UNITS[unit])
+    return size_bytes
@@ -0,0 +1,339 @@
+import ctypes
+import ctypes.util
+import errno
+import os
+import select
+import struct
+import sys
+import time
+import traceback
+from pathlib import Path
+from .params import OUTPUT_VIEWER_DIR_NAME, SUMMARY_SUFFIX, WATCH_DEBOUNCE, WATCH_MAX_DELAY, WATCH_POLL_INTERVAL
+from .cache import cache_path_for
+from .index import index_path_for
+from .classifier import container_matcher
+from .config import find_config_path, load_config, normalize_and_validate_config, normalize_scan_options, compile_classifier
+from .metrics import Metrics
+from .patterns import compile_path_filter
+from .scanner import walk_dataset
+
+# Files at the dataset root that change how every file is classified or mapped
+DATASET_SETTINGS = ("config.json", "patient_sample_mapping.json")
+
+# inotify event bits (linux/inotify.h)
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+
+# A file counts as changed once it is closed after writing (not on every write), moved,
+# deleted or touched
+WATCH_MASK = IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF
+
+# struct inotify_event: wd, mask, cookie, len, then `len` bytes of NUL-padded name
+_EVENT = struct.Struct("iIII")
+
+def generated_paths(output_file, html_file):
+    # Everything an update writes next to the manifest; changes to these never trigger a rescan
+    # (the output folder may be inside the dataset).
+    output_file = Path(output_file).resolve()
+    folder = output_file.parent
+    viewer_dir = folder / OUTPUT_VIEWER_DIR_NAME
+    cache_file = cache_path_for(output_file)
+    index_file = index_path_for(output_file)
+    return [
+        output_file, output_file.with_name(output_file.name + ".tmp"),
+        output_file.with_name(output_file.stem + SUMMARY_SUFFIX),
+        cache_file, cache_file.with_name(cache_file.name + ".tmp"),
+        viewer_dir, viewer_dir.with_name(viewer_dir.name + ".tmp"), viewer_dir.with_name(viewer_dir.name + ".old"),
+        index_file, index_file.with_name(index_file.name + ".tmp"),
+        folder / "rocrate", Path(html_file).resolve()
+    ]
+
+class ChangeFilter:
+    # Decides which changed paths are worth an update, with the rules of the scan itself: hidden
+    # names are skipped, files must match a configured extension and the include/exclude patterns,
+    # anything inside a container directory counts, and so do new or removed directories and the
+    # dataset's config.json and mapping. Generated outputs are ignored.
+
+    def __init__(self, data_dir, ignore):
+        self.data_dir = Path(data_dir)
+        self.ignore = {Path(p) for p in ignore}
+        self.classify = None
+        self.classify_container = None
+        self.path_filter = None
+        self.reload()
+
+    def reload(self):
+        # Re-reads the classification rules from config.json (after every successful update).
+        config_raw = load_config(find_config_path(self.data_dir))
+        classifier = compile_classifier(normalize_and_validate_config(config_raw))
+        scan_options = normalize_scan_options(config_raw)
+        self.classify = classifier.match
+        self.classify_container = container_matcher(classifier, scan_options.container_extensions)
+        self.path_filter = compile_path_filter(self.data_dir, scan_options.exclude, scan_options.include)
+
+    def ignored(self, path):
+        path = Path(path)
+        return path in self.ignore or any(parent in self.ignore for parent in path.parents)
+
+    def excluded(self, path, is_dir):
+        # Whether the include/exclude patterns of config.json leave `path` out of the scan,
+        # directly or through an excluded parent directory.
+        if self.path_filter is None:
+            return False
+        try:
+            parts = Path(path).relative_to(self.data_dir).parts
+        except ValueError:
+            return False
+        if any(self.path_filter.excluded("/".join(parts[:i]), True) for i in range(1, len(parts))):
+            return True
+        rel = "/".join(parts)
+        return self.path_filter.excluded(rel, True) if is_dir else self.path_filter.skips(rel)
+
+    def container_of(self, path):
+        # The container directory `path` lies in (its record in the manifest), or None.
+        if self.classify_container is None:
+            return None
+        path = Path(path)
+        try:
+            parts = path.relative_to(self.data_dir).parts[:-1]
+        except ValueError:
+            return None
+        for i, part in enumerate(parts):
+            if self.classify_container(part) is not None:
+                return self.data_dir.joinpath(*parts[:i + 1])
+        return None
+
+    def relevant(self, path, is_dir):
+        path = Path(path)
+        if self.ignored(path):
+            return False
+        name = path.name
+        if path.parent == self.data_dir and name in DATASET_SETTINGS:
+            return True
+        if self.excluded(path, is_dir):
+            return False
+        if self.container_of(path) is not None:
+            return True
+        if name.startswith('.'):
+            return False
+        return is_dir or self.classify(name) is not None
+
+class InotifyWatcher:
+    # Change notifications from the Linux kernel, through libc (no extra dependency). One watch
+    # per directory, including every directory inside a container (chunks are written deep inside
+    # .zarr stores); directories created or moved in later are added as they appear. A change
+    # inside a container is reported as the container, the path of its record.
+    # inotify only sees changes made through this kernel: on NFS and other network mounts, files
+    # written by other machines need --poll-interval.
+    kind = "inotify"
+
+    def __init__(self, root, change_filter):
+        self._libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        self.fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.root = os.fspath(root)
+        self.filter = change_filter
+        self.paths = {}
+        try:
+            self._add_tree(self.root)
+        except OSError:
+            self.close()
+            raise
+
+    def _add_tree(self, path):
+        stack = [path]
+        while stack:
+            current = stack.pop()
+            wd = self._libc.inotify_add_watch(self.fd, os.fsencode(current), WATCH_MASK | IN_ONLYDIR)
+            if wd < 0:
+                err = ctypes.get_errno()
+                if err == errno.ENOSPC:
+                    raise OSError(err, "inotify watch limit reached (raise fs.inotify.max_user_watches)")
+                # Vanished or unreadable
+                continue
+            self.paths[wd] = current
+            try:
+                with os.scandir(current) as it:
+                    for entry in it:
+                        if entry.is_dir(follow_symlinks=False) and not self.filter.ignored(entry.path) and not self.filter.excluded(entry.path, True):
+                            stack.append(entry.path)
+            except OSError:
+                continue
+
+    def wait(self, timeout=None):
+        # Blocks until events arrive (or `timeout` seconds pass) and returns the relevant changed paths.
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        changes = []
+        if not ready:
+            return changes
+        while True:
+            try:
+                data = os.read(self.fd, 65536)
+            except BlockingIOError:
+                break
+            offset = 0
+            while offset < len(data):
+                wd, mask, _cookie, length = _EVENT.unpack_from(data, offset)
+                name = data[offset + _EVENT.size:offset + _EVENT.size + length].rstrip(b"\0")
+                offset += _EVENT.size + length
+                if mask & IN_Q_OVERFLOW:
+                    # Events were dropped: anything may have changed
+                    changes.append(self.root)
+                    continue
+                if mask & IN_IGNORED:
+                    self.paths.pop(wd, None)
+                    continue
+                directory = self.paths.get(wd)
+                if directory is None:
+                    continue
+                path = os.path.join(directory, os.fsdecode(name)) if name else directory
+                is_dir = bool(mask & IN_ISDIR) or not name
+                if is_dir and mask & (IN_CREATE | IN_MOVED_TO) and not self.filter.ignored(path) and not self.filter.excluded(path, True):
+                    try:
+                        self._add_tree(path)
+                    except OSError as e:
+                        print(f"   ! {e}; changes below {path} may be missed")
+                if self.filter.relevant(path, is_dir):
+                    changes.append(os.fspath(self.filter.container_of(path) or path))
+        return changes
+
+    def close(self):
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+
+class PollingWatcher:
+    # Fallback where inotify is unavailable or cannot see the changes (macOS, Windows, network
+    # mounts): every `interval` seconds, stats the files a scan would pick up (the same walker and
+    # classification) and reports those whose size or mtime changed. Containers are measured like
+    # in a scan (measure_container), so their size and newest mtime change when a chunk inside is
+    # written. The tree is walked at most once per interval, however short the debounce.
+    kind = "polling"
+
+    def __init__(self, root, change_filter, interval=WATCH_POLL_INTERVAL):
+        self.root = Path(root)
+        self.filter = change_filter
+        self.interval = interval
+        self.snapshot = self._snapshot()
+        self.next_poll = time.monotonic() + interval
+
+    def _snapshot(self):
+        state = {}
+        for entry, _match in walk_dataset(self.root, self.filter.classify, classify_container=self.filter.classify_container, path_filter=self.filter.path_filter):
+            st = entry.stat()
+            state[entry.path] = (st.st_size, st.st_mtime_ns)
+        for name in DATASET_SETTINGS:
+            try:
+                st = os.stat(self.root / name)
+            except OSError:
+                continue
+            state[os.fspath(self.root / name)] = (st.st_size, st.st_mtime_ns)
+        return state
+
+    def wait(self, timeout=None):
+        # Sleeps until the next poll and returns the relevant paths that were added, removed or
+        # modified since the previous poll. If `timeout` ends first (the debounce of a burst), no
+        # new changes can have been seen yet: returns [] without walking.
+        delay = self.next_poll - time.monotonic()
+        if timeout is not None and timeout < delay:
+            time.sleep(max(timeout, 0))
+            return []
+        time.sleep(max(delay, 0))
+        previous, self.snapshot = self.snapshot, self._snapshot()
+        self.next_poll = time.monotonic() + self.interval
+        changed = [path for path in previous.keys() | self.snapshot.keys() if previous.get(path) != self.snapshot.get(path)]
+        return [path for path in changed if self.filter.relevant(path, False)]
+
+    def close(self):
+        pass
+
+def open_watcher(root, change_filter, poll_interval=None):
+    # inotify on Linux unless a polling interval is given; polling elsewhere or if inotify fails.
+    if poll_interval is None and sys.platform.startswith("linux"):
+        try:
+            return InotifyWatcher(root, change_filter)
+        except (OSError, AttributeError) as e:
+            print(f"   ! inotify unavailable ({e}); polling every {WATCH_POLL_INTERVAL:g}s instead")
+    return PollingWatcher(root, change_filter, poll_interval or WATCH_POLL_INTERVAL)
+
+def _update(data_dir, output_file, options):
+    # One incremental run of generate_json (unchanged files come from the scan cache). Errors are
+    # reported and the watch carries on, so a bad config.json can be fixed while watching.
+    from .generator import generate_json
+
+    metrics = Metrics()
+    try:
+        generate_json(data_dir, output_file, metrics=metrics, live=True, **options)
+    except SystemExit:
+        print(" | Update failed; still watching (fix the dataset or config.json and save again).")
+        return False
+    except Exception as e:
+        print(f"Unexpected Error: {e}")
+        traceback.print_exc()
+        print(" | Update failed; still watching.")
+        return False
+    metrics.report()
+    return True
+
+def watch_dataset(directory, output_file, html_file, debounce=WATCH_DEBOUNCE, poll_interval=None, max_delay=WATCH_MAX_DELAY, **options):
+    # Long-running mode: writes the manifest once, then updates it whenever classified files
+    # land, change or disappear. A burst of changes (e.g. a sequencing run being copied in)
+    # triggers one update once it has been quiet for `debounce` seconds, or after `max_delay`
+    # seconds at the latest. Each update rewrites the manifest, summary and viewer data
+    # atomically, reusing cached records of unchanged files. The HTML viewer polls
+    # output_viewer/version.json and reloads its data after an update.
+    # `options` are passed on to generate_json (no_rocrate, workers, output_format, ...). The
+    # RO-Crate is written in metadata mode: copying every data file on each update would cost
+    # more than the incremental scan it follows.
+    from .generate_html import generate_html
+
+    data_dir = Path(directory).resolve()
+    output_file = Path(output_file)
+    if not options.get("no_rocrate") and options.get("rocrate_mode", "copy") == "copy":
+        print(" | --watch writes the metadata-only RO-Crate (--rocrate-mode metadata), which references the data files instead of copying them on every update")
+        options["rocrate_mode"] = "metadata"
+    if not _update(data_dir, output_file, options):
+        raise SystemExit(1)
+    if options.get("viewer", True):
+        generate_html(html_file)
+
+    change_filter = ChangeFilter(data_dir, generated_paths(output_file, html_file))
+    watcher = open_watcher(data_dir, change_filter, poll_interval)
+    print(f"\n | Watching {data_dir} ({watcher.kind}); press Ctrl+C to stop.")
+    try:
+        while True:
+            changes = watcher.wait()
+            if not changes:
+                continue
+            pending = set(changes)
+            deadline = time.monotonic() + max_delay
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                more = watcher.wait(min(debounce, remaining))
+                if not more:
+                    break
+                pending.update(more)
+            print(f"\n | Changes detected ({len(pending)} paths); updating {output_file.name}")
+            if _update(data_dir, output_file, options):
+                try:
+                    change_filter.reload()
+                except SystemExit:
+                    # config.json changed again since the update; the next update reports it
+                    pass
+    except KeyboardInterrupt:
+        print("\n | Watch stopped.")
+    finally:
+        watcher.close()
@@ -0,0 +1,303 @@
+import json
+import math
+import sys
+import tempfile
+from json.encoder import encode_basestring_ascii
+from pathlib import Path
+from .params import FILE_SIZE_UNIT, PARQUET_BATCH_SIZE, SUMMARY_SUFFIX
+from .checksums import CHECKSUM_ALGORITHMS
+from .records import as_list
+from .units import WHOLE_UNITS
+
+# Indentation of one file record inside {"data": {"files": {"<category>": [ ... ]}}}
+RECORD_DEPTH = 4
+
+# json.dumps(value, separators=(",", ":")) without building an encoder per call
+encode_compact = json.JSONEncoder(separators=(",", ":")).encode
+
+def write_summary_sidecar(output_file, summary):
+    # Record-oriented formats have no place for a document-level section, so their summary
+    # (see summary.py) goes next to them: output.parquet -> output.summary.json.
+    output_file = Path(output_file)
+    with open(output_file.with_name(output_file.stem + SUMMARY_SUFFIX), "w", encoding="utf-8") as f:
+        f.write(json.dumps(summary.as_dict(), indent=4))
+
+class StreamingJSONWriter:
+    # Writes the output manifest incrementally instead of building the whole document in memory.
+    # Records are appended to one temporary spool file per category as the scan produces them,
+    # then the spools are stitched together into the usual data/location/file_size_unit/files
+    # document. With indent=4 the result is formatted like json.dump(output_data, f, indent=4);
+    # indent=None writes a compact document.
+    # With a SummaryStats (see summary.py), its aggregates are written as data.summary, ahead of
+    # data.files, so streaming readers reach them without parsing the records.
+    # Every writer exposes last_extent, where the record just added lies in the output (see
+    # index.py): here (None, offset, length) in bytes from the start of its category's array, whose
+    # own offset is in category_offsets once closed. The document is ASCII (all strings are
+    # written with ensure_ascii), so characters and bytes coincide.
+
+    def __init__(self, output_file, location, categories, indent=4, summary=None, size_unit=FILE_SIZE_UNIT):
+        self.output_file = Path(output_file)
+        self.location = str(location)
+        self.indent = indent
+        self.size_unit = size_unit
+        self.summary = summary
+        self.count = 0
+        self.last_extent = None
+        self.category_offsets = {}
+        self._spools = {}
+        self._sizes = {}
+        self._lengths = {}
+        # Newline and indentation per nesting depth
+        self._pads = ["\n" + " " * ((indent or 0) * depth) for depth in range(RECORD_DEPTH + 3)]
+        for category in categories:
+            self._open_spool(category)
+
+    def _open_spool(self, category):
+        self._spools[category] = tempfile.TemporaryFile(mode="w+", encoding="utf-8", dir=self.output_file.parent)
+        self._sizes[category] = 0
+        self._lengths[category] = 0
+
+    def _encode(self, value, depth):
+        # Encodes a value as it would appear at the given nesting depth of the full document.
+        if self.indent is None:
+            return encode_compact(value)
+        pad = "\n" + " " * (self.indent * depth)
+        return json.dumps(value, indent=self.indent).replace("\n", pad)
+
+    def _encode_record(self, record):
+        # Same text as _encode(record, RECORD_DEPTH), without json's pure-Python indenting encoder:
+        # a record is a flat object, so its strings, numbers and string lists are encoded one by one
+        # with the C string encoder and laid out here. Anything else (e.g. patient_metadata) falls
+        # back to _encode.
+        if not record:
+            return "{}"
+        pad = self._pads[RECORD_DEPTH]
+        field_pad = self._pads[RECORD_DEPTH + 1]
+        item_pad = self._pads[RECORD_DEPTH + 2]
+        fields = []
+        for key, value in record.items():
+            if type(key) is not str:
+                return self._encode(record, RECORD_DEPTH)
+            kind = type(value)
+            if kind is str:
+                text = encode_basestring_ascii(value)
+            elif kind is int:
+                text = int.__repr__(value)
+            elif kind is float and math.isfinite(value):
+                text = float.__repr__(value)
+            elif kind is list and value and all(type(v) is str for v in value):
+                text = "[" + item_pad + ("," + item_pad).join(map(encode_basestring_ascii, value)) + field_pad + "]"
+            else:
+                text = self._encode(value, RECORD_DEPTH + 1)
+            fields.append(encode_basestring_ascii(key) + ": " + text)
+        return "{" + field_pad + ("," + field_pad).join(fields) + pad + "}"
+
+    def add(self, category, record):
+        if category not in self._spools:
+            self._open_spool(category)
+        spool = self._spools[category]
+        lead = "," if self._sizes[category] else ""
+        if self.indent is None:
+            text = self._encode(record, RECORD_DEPTH)
+        else:
+            lead += self._pads[RECORD_DEPTH]
+            text = self._encode_record(record)
+        spool.write(lead + text)
+        offset = self._lengths[category] + len(lead)
+        self._lengths[category] = offset + len(text)
+        self.last_extent = (None, offset, len(text))
+        self._sizes[category] += 1
+        self.count += 1
+
+    def close(self):
+        # Assembles the final document next to the output file, then moves it into place.
+        if self.indent is None:
+            nl = lambda depth: ""
+            colon = ":"
+        else:
+            nl = lambda depth: "\n" + " " * (self.indent * depth)
+            colon = ": "
+
+        tmp_path = self.output_file.with_name(self.output_file.name + ".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as out:
+            out.write("{" + nl(1) + '"data"' + colon + "{")
+            out.write(nl(2) + '"location"' + colon + json.dumps(self.location) + ",")
+            out.write(nl(2) + '"file_size_unit"' + colon + json.dumps(self.size_unit) + ",")
+            if self.summary is not None:
+                out.write(nl(2) + '"summary"' + colon + self._encode(self.summary.as_dict(), 2) + ",")
+            out.write(nl(2) + '"files"' + colon + "{")
+            for i, (category, spool) in enumerate(self._spools.items()):
+                if i:
+                    out.write(",")
+                out.write(nl(3) + json.dumps(category) + colon + "[")
+                self.category_offsets[category] = out.tell()
+                spool.seek(0)
+                while True:
+                    chunk = spool.read(1 << 20)
+                    if not chunk:
+                        break
+                    out.write(chunk)
+                spool.close()
+                if self._sizes[category]:
+                    out.write(nl(3))
+                out.write("]")
+            if self._spools:
+                out.write(nl(2))
+            out.write("}" + nl(1) + "}" + nl(0) + "}")
+        tmp_path.replace(self.output_file)
+
+class JSONLWriter:
+    # Writes one file record per line, with its category as an extra field.
+    # Suited to line-oriented loaders (pandas.read_json(lines=True), DuckDB read_json_auto).
+    # last_extent is (None, offset, length) of the record's line in bytes (ASCII, as above).
+
+    def __init__(self, output_file, location, categories, indent=None, summary=None, size_unit=FILE_SIZE_UNIT):
+        self.output_file = Path(output_file)
+        self.count = 0
+        self.last_extent = None
+        self.category_offsets = {}
+        self.summary = summary
+        self._offset = 0
+        self._tmp_path = self.output_file.with_name(self.output_file.name + ".tmp")
+        self._out = open(self._tmp_path, "w", encoding="utf-8")
+
+    def add(self, category, record):
+        line = {"category": category}
+        line.update(record)
+        text = encode_compact(line)
+        self._out.write(text + "\n")
+        self.last_extent = (None, self._offset, len(text))
+        self._offset += len(text) + 1
+        self.count += 1
+
+    def close(self):
+        self._out.close()
+        self._tmp_path.replace(self.output_file)
+        if self.summary is not None:
+            write_summary_sidecar(self.output_file, self.summary)
+
+class ParquetWriter:
+    # Writes records to a Parquet file with typed columns (file_size_bytes int64, file_size int64
+    # or float64 depending on the unit, sample_id and patient_id as list<string>, nullable checksum columns) in row groups of PARQUET_BATCH_SIZE records, so memory
+    # stays bounded and consumers get projection and predicate pushdown.
+    # The dataset location and size unit are stored in the schema metadata.
+    # last_extent is (row group, row within it, None): each buffered batch is one row group.
+    format_name = "parquet"
+
+    def __init__(self, output_file, location, categories, indent=None, summary=None, size_unit=FILE_SIZE_UNIT):
+        try:
+            import pyarrow as pa
+        except ImportError:
+            print(f"\nERROR: --output-format {self.format_name} requires pyarrow. Install it with 'pip install pyarrow'.")
+            sys.exit(1)
+        self._pa = pa
+        self.output_file = Path(output_file)
+        self.count = 0
+        self.last_extent = None
+        self.category_offsets = {}
+        self.summary = summary
+        self._batches = 0
+        self._schema = pa.schema([
+            ("category", pa.dictionary(pa.int32(), pa.string())),
+            ("file_name", pa.string()),
+            ("file_size", pa.int64() if size_unit in WHOLE_UNITS else pa.float64()),
+            ("file_size_bytes", pa.int64()),
+            ("file_count", pa.int64()),  # container directories only (see containers.py)
+            ("directory", pa.string()),
+            ("organization", pa.dictionary(pa.int32(), pa.string())),
+            ("sample_id", pa.list_(pa.string())),
+            ("patient_id", pa.list_(pa.string()))
+        ] + [(algorithm, pa.string()) for algorithm in CHECKSUM_ALGORITHMS] + [
+            ("patient_metadata", pa.string()),  # JSON object, only with --attach-metadata
+            ("unmapped_sample_ids", pa.list_(pa.string()))
+        ], metadata={"location": str(location), "file_size_unit": size_unit})
+        self._tmp_path = self.output_file.with_name(self.output_file.name + ".tmp")
+        self._writer = self._open_sink(self._tmp_path)
+        self._columns = {name: [] for name in self._schema.names}
+
+    def _open_sink(self, path):
+        import pyarrow.parquet as pq
+        return pq.ParquetWriter(path, self._schema)
+
+    def _write(self, batch):
+        self._writer.write_batch(batch, row_group_size=PARQUET_BATCH_SIZE)
+
+    def add(self, category, record):
+        columns = self._columns
+        self.last_extent = (self._batches, len(columns["file_name"]), None)
+        columns["category"].append(category)
+        columns["file_name"].append(record["file_name"])
+        columns["file_size"].append(record["file_size"])
+        columns["file_size_bytes"].append(record["file_size_bytes"])
+        columns["file_count"].append(record.get("file_count"))
+        columns["directory"].append(record["directory"])
+        columns["organization"].append(record["organization"])
+        columns["sample_id"].append(as_list(record["sample_id"]))
+        columns["patient_id"].append(as_list(record["patient_id"]))
+        for algorithm in CHECKSUM_ALGORITHMS:
+            columns[algorithm].append(record.get(algorithm))
+        patient_metadata = record.get("patient_metadata")
+        columns["patient_metadata"].append(json.dumps(patient_metadata) if patient_metadata is not None else None)
+        columns["unmapped_sample_ids"].append(record.get("unmapped_sample_ids"))
+        self.count += 1
+        if len(columns["file_name"]) >= PARQUET_BATCH_SIZE:
+            self._flush()
+
+    def _flush(self):
+        if not self._columns["file_name"]:
+            return
+        batch = self._pa.RecordBatch.from_pydict(self._columns, schema=self._schema)
+        self._write(batch)
+        self._batches += 1
+        self._columns = {name: [] for name in self._schema.names}
+
+    def close(self):
+        self._flush()
+        self._writer.close()
+        self._tmp_path.replace(self.output_file)
+        if self.summary is not None:
+            write_summary_sidecar(self.output_file, self.summary)
+
+class ArrowWriter(ParquetWriter):
+    # Same columns as ParquetWriter, written as an Arrow IPC (Feather v2) file for zero-copy loading.
+    # A row group here is a record batch.
+    format_name = "arrow"
+
+    def _open_sink(self, path):
+        return self._pa.ipc.new_file(path, self._schema)
+
+    def _write(self, batch):
+        self._writer.write_batch(batch)
+
+class TeeWriter:
+    # Hands every record to several writers, e.g. the manifest writer and the HTML viewer data.
+    # count is the count of the first (manifest) writer.
+
+    def __init__(self, *writers):
+        self.writers = writers
+
+    @property
+    def count(self):
+        return self.writers[0].count
+
+    def add(self, category, record):
+        for writer in self.writers:
+            writer.add(category, record)
+
+    def close(self):
+        for writer in self.writers:
+            writer.close()
+
+# --output-format choices
+WRITERS = {
+    "json": StreamingJSONWriter,
+    "jsonl": JSONLWriter,
+    "parquet": ParquetWriter,
+    "arrow": ArrowWriter
+}
+
+def open_writer(output_format, output_file, location, categories, compact=False, summary=None, size_unit=FILE_SIZE_UNIT):
+    # Returns the writer for the requested output format. compact only affects JSON.
+    # summary is an optional SummaryStats written into (JSON) or next to (other formats) the manifest.
+    # size_unit is the unit of the records' file_size, recorded in the manifest.
+    return WRITERS[output_format](output_file, location, categories, indent=None if compact else 4, summary=summary, size_unit=size_unit)
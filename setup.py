@@ -4,9 +4,15 @@ setup(
     name="redmane-metadata-generator",
     version="0.2.0",
     packages=find_packages(),
-    install_requires=["numpy", "pandas", "rocrate"],
+    install_requires=["rocrate"],
+    extras_require={
+        "columnar": ["pyarrow"]
+    },
     entry_points={
-        "console_scripts": ["redmane-ingest=redmane.generator:main"]
+        "console_scripts": [
+            "redmane-ingest=redmane.generator:main",
+            "redmane-diff=redmane.diff:main"
+        ]
     },
     include_package_data=True,
     package_data={